@@ -0,0 +1,325 @@
+"""Benchmark do painel, da listagem de pedidos e do webhook com dados sintéticos.
+
+Gera pedidos e gastos com distribuições realistas (semente fixa) em um banco
+SQLite temporário, mede as rotas com o cliente de teste do Flask e grava um
+relatório JSON para comparar antes/depois de uma otimização::
+
+    python benchmarks/benchmark_dashboard.py --tamanho 100k --saida antes.json
+    # ... aplica a otimização ...
+    python benchmarks/benchmark_dashboard.py --tamanho 100k --saida depois.json --comparar antes.json
+
+Variáveis como ``PERFIL_ARMAZENAMENTO`` ou ``PAGINACAO_PEDIDOS`` são repassadas
+ao app; ``--banco`` aponta para outro banco (ex.: um Postgres vazio) em vez do
+SQLite temporário.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PERIODOS = ['hoje', 'ontem', 'ultimos_7_dias', 'mes_atual', 'mes_passado', 'maximo', 'personalizado']
+
+# (status, peso): distribuição aproximada da base em produção.
+DISTRIBUICAO_STATUS = [('Pago', 45), ('A Receber', 20), ('Agendado', 15), ('Frustrado', 20)]
+DISTRIBUICAO_METODOS = [('Pix', 40), ('Cartão de Crédito', 35), ('Boleto', 25)]
+CATEGORIAS_GASTO = [('Anúncios', 60), ('Ferramentas', 10), ('Software', 10), ('Operacional', 15), ('Outros', 5)]
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Rodrigues', 'Almeida', 'Nunes']
+DIAS_DE_HISTORICO = 730
+LOTE_INSERCAO = 10000
+
+
+def interpretar_tamanho(texto):
+    texto = texto.strip().lower()
+    multiplicador = {'k': 1000, 'm': 1000000}.get(texto[-1], 1)
+    return int(float(texto.rstrip('km')) * multiplicador)
+
+
+def _escolher(rng, distribuicao):
+    return rng.choices([valor for valor, _ in distribuicao], weights=[peso for _, peso in distribuicao])[0]
+
+
+def _instante(rng, agora):
+    # Mais vendas recentes que antigas: idade em dias com distribuição triangular.
+    idade = rng.triangular(0, DIAS_DE_HISTORICO, 0)
+    return agora - timedelta(days=idade, seconds=rng.randint(0, 86399))
+
+
+def gerar_pedidos(rng, quantidade, agora):
+    from meu_app.status import classificar_status_grupo
+
+    for indice in range(quantidade):
+        status = _escolher(rng, DISTRIBUICAO_STATUS)
+        data_venda = _instante(rng, agora)
+        telefone = f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+        data_vencimento = data_pagamento = None
+        if status == 'A Receber':
+            data_vencimento = data_venda + timedelta(days=30)
+        elif status == 'Pago':
+            data_pagamento = min(data_venda + timedelta(days=rng.randint(0, 35)), agora)
+        yield {
+            'braip_trans_code': f"BENCH{indice:08d}",
+            'data_venda': data_venda,
+            'cliente': f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {indice}",
+            'telefone': telefone,
+            'telefone_digitos': ''.join(caractere for caractere in telefone if caractere.isdigit()),
+            'valor': round(rng.lognormvariate(math.log(150), 0.5), 2),
+            'status': status,
+            'status_grupo': classificar_status_grupo(status),
+            'metodo_pagamento': _escolher(rng, DISTRIBUICAO_METODOS),
+            'data_vencimento': data_vencimento,
+            'data_pagamento': data_pagamento,
+        }
+
+
+def gerar_gastos(rng, quantidade, agora):
+    for _ in range(quantidade):
+        yield {
+            'valor': round(rng.lognormvariate(math.log(80), 0.8), 2),
+            'data': _instante(rng, agora),
+            'categoria': _escolher(rng, CATEGORIAS_GASTO),
+        }
+
+
+def inserir_em_lotes(db, tabela, linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= LOTE_INSERCAO:
+            db.session.execute(tabela.insert(), lote)
+            lote = []
+    if lote:
+        db.session.execute(tabela.insert(), lote)
+    db.session.commit()
+
+
+def popular_banco(app, db, quantidade_pedidos, semente):
+    from meu_app.atrasos import marcar_atrasados
+    from meu_app.models import Gasto, Pedido
+    from meu_app.resumos import reconstruir_resumos
+
+    rng = random.Random(semente)
+    agora = datetime.utcnow()
+    inicio = time.perf_counter()
+    with app.app_context():
+        inserir_em_lotes(db, Pedido.__table__, gerar_pedidos(rng, quantidade_pedidos, agora))
+        inserir_em_lotes(db, Gasto.__table__, gerar_gastos(rng, max(quantidade_pedidos // 10, 1), agora))
+        reconstruir_resumos()
+        marcar_atrasados()
+    return time.perf_counter() - inicio
+
+
+def estatisticas(tempos):
+    ordenados = sorted(tempos)
+    return {
+        'repeticoes': len(ordenados),
+        'min_ms': round(ordenados[0] * 1000, 3),
+        'mediana_ms': round(statistics.median(ordenados) * 1000, 3),
+        'p95_ms': round(ordenados[min(len(ordenados) - 1, math.ceil(len(ordenados) * 0.95) - 1)] * 1000, 3),
+        'media_ms': round(statistics.fmean(ordenados) * 1000, 3),
+    }
+
+
+def medir_get(cliente, url, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resposta = cliente.get(url)
+        tempos.append(time.perf_counter() - inicio)
+        if resposta.status_code != 200:
+            raise RuntimeError(f"{url} respondeu {resposta.status_code}")
+    return estatisticas(tempos)
+
+
+def medir_dashboard(cliente, repeticoes):
+    hoje = datetime.utcnow().date()
+    resultados = {}
+    for periodo in PERIODOS:
+        url = f"/?periodo={periodo}"
+        if periodo == 'personalizado':
+            url += f"&data_inicio={hoje - timedelta(days=90)}&data_fim={hoje}"
+        resultados[periodo] = medir_get(cliente, url, repeticoes)
+    return resultados
+
+
+def medir_pedidos(app, cliente, repeticoes):
+    from meu_app.models import Pedido
+    from meu_app.paginacao import codificar_cursor
+
+    with app.app_context():
+        total = Pedido.query.count()
+        meio = Pedido.query.order_by(Pedido.data_venda.desc(), Pedido.id.desc()).offset(total // 2).first()
+        cursor_meio = codificar_cursor(meio.data_venda, meio.id) if meio else ''
+    pagina_meio = max(total // 15 // 2, 1)
+
+    urls = {
+        'primeira_pagina': '/pedidos',
+        'filtro_pago': '/pedidos?status=Pago',
+        'filtro_atrasado': '/pedidos?status=Atrasado',
+        'busca_nome': '/pedidos?busca=Oliveira',
+        'busca_telefone': '/pedidos?busca=9876',
+        'pagina_profunda_offset': f'/pedidos?page={pagina_meio}&paginacao=offset',
+        'pagina_profunda_cursor': f'/pedidos?cursor={cursor_meio}&paginacao=cursor',
+    }
+    return {nome: medir_get(cliente, url, repeticoes) for nome, url in urls.items()}
+
+
+def eventos_webhook(rng, quantidade, prefixo):
+    """Metade dos eventos cria pedidos; a outra metade os faz avançar de status."""
+
+    criados = []
+    for indice in range(quantidade):
+        if indice % 2 == 0 or not criados:
+            codigo = f"{prefixo}{indice:08d}"
+            criados.append(codigo)
+            yield {
+                'codigo_transacao': codigo,
+                'status_compra_descricao': 'Aprovada',
+                'nome_cliente': f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}",
+                'cel_cliente': f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                'valor_total': f"{rng.uniform(50, 400):.2f}",
+                'metodo_pagamento': _escolher(rng, DISTRIBUICAO_METODOS),
+            }
+        else:
+            yield {
+                'codigo_transacao': rng.choice(criados),
+                'status_compra_descricao': rng.choice(['Entregue', 'Pagamento Confirmado', 'Cancelado']),
+            }
+
+
+def medir_webhook(app, cliente, quantidade, semente):
+    from meu_app.fila import processar_lote
+
+    resultados = {}
+    for modo in ('sincrono', 'fila'):
+        app.config['WEBHOOK_MODO'] = modo
+        rng = random.Random(semente)
+        inicio = time.perf_counter()
+        for evento in eventos_webhook(rng, quantidade, f"WH{modo[:3].upper()}"):
+            resposta = cliente.post('/webhooks/braip', json=evento)
+            if resposta.status_code not in (200, 202):
+                raise RuntimeError(f"webhook respondeu {resposta.status_code}")
+        recebimento = time.perf_counter() - inicio
+        resultado = {'eventos': quantidade, 'eventos_por_segundo': round(quantidade / recebimento, 1)}
+
+        if modo == 'fila':
+            inicio = time.perf_counter()
+            with app.app_context():
+                while processar_lote(app.config['WEBHOOK_FILA_LOTE']):
+                    pass
+            processamento = time.perf_counter() - inicio
+            resultado['processados_por_segundo'] = round(quantidade / processamento, 1) if processamento else None
+        resultados[modo] = resultado
+    app.config['WEBHOOK_MODO'] = 'sincrono'
+    return resultados
+
+
+def versao_git():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, anterior):
+    """Variação percentual da mediana de cada medição em relação ao relatório anterior."""
+
+    linhas = []
+    for grupo in ('dashboard', 'pedidos'):
+        for nome, medida in atual.get(grupo, {}).items():
+            antes = anterior.get(grupo, {}).get(nome)
+            if not antes:
+                continue
+            variacao = (medida['mediana_ms'] - antes['mediana_ms']) / antes['mediana_ms'] * 100
+            linhas.append(f"{grupo}/{nome}: {antes['mediana_ms']:.1f}ms -> {medida['mediana_ms']:.1f}ms ({variacao:+.1f}%)")
+    for modo, medida in atual.get('webhook', {}).items():
+        antes = anterior.get('webhook', {}).get(modo)
+        if antes:
+            linhas.append(
+                f"webhook/{modo}: {antes['eventos_por_segundo']:.0f} -> {medida['eventos_por_segundo']:.0f} eventos/s"
+            )
+    return linhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanho', default='10k', help='Pedidos gerados: 10k, 100k, 1M ou um número (padrão: 10k).')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=20, help='Requisições por medição (padrão: 20).')
+    parser.add_argument('--eventos-webhook', type=int, default=2000)
+    parser.add_argument('--com-cache', action='store_true', help='Mede com o cache do painel ligado.')
+    parser.add_argument('--banco', help='DATABASE_URL de um banco vazio; padrão: SQLite temporário.')
+    parser.add_argument('--saida', help='Arquivo do relatório JSON (padrão: stdout).')
+    parser.add_argument('--comparar', help='Relatório JSON anterior para comparar as medianas.')
+    args = parser.parse_args(argv)
+
+    quantidade = interpretar_tamanho(args.tamanho)
+    diretorio = tempfile.mkdtemp(prefix='bench-financas-')
+    # O app lê a configuração ao ser importado: tudo precisa estar no ambiente antes.
+    os.environ['DATABASE_URL'] = args.banco or 'sqlite:///' + os.path.join(diretorio, 'bench.db')
+    os.environ['CACHE_BACKEND'] = 'memoria' if args.com_cache else 'nenhum'
+    os.environ.setdefault('ATRASOS_AGENDADOR', '0')
+    os.environ.setdefault('WEBHOOK_FILA_TRABALHADOR', '0')
+    sys.path.insert(0, RAIZ)
+
+    from meu_app import criar_app, db
+
+    app = criar_app(migrar=True)
+
+    print(f"Gerando {quantidade} pedidos (semente {args.semente})...", file=sys.stderr)
+    geracao = popular_banco(app, db, quantidade, args.semente)
+    cliente = app.test_client()
+
+    print("Medindo o painel...", file=sys.stderr)
+    relatorio = {
+        'meta': {
+            'tamanho': quantidade,
+            'semente': args.semente,
+            'repeticoes': args.repeticoes,
+            'com_cache': args.com_cache,
+            'perfil_armazenamento': app.config['PERFIL_ARMAZENAMENTO'],
+            'banco': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+            'commit': versao_git(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'executado_em': datetime.utcnow().isoformat(timespec='seconds'),
+        },
+        'geracao_segundos': round(geracao, 2),
+        'dashboard': medir_dashboard(cliente, args.repeticoes),
+    }
+    print("Medindo a listagem de pedidos...", file=sys.stderr)
+    relatorio['pedidos'] = medir_pedidos(app, cliente, args.repeticoes)
+    print("Medindo o webhook...", file=sys.stderr)
+    relatorio['webhook'] = medir_webhook(app, cliente, args.eventos_webhook, args.semente)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto + '\n')
+        print(f"Relatório gravado em {args.saida}", file=sys.stderr)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            for linha in comparar(relatorio, json.load(arquivo)):
+                print(linha, file=sys.stderr)
+
+    shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
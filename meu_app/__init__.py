@@ -1,38 +1,109 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
 import os
 
+from meu_app.armazenamento import configurar_armazenamento
+
 base_dir = os.path.abspath(os.path.dirname(__file__))
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(base_dir, '..', 'pedidos.db')
+# PERFIL_ARMAZENAMENTO=producao liga WAL/pragmas/pool; DATABASE_URL troca o banco (ex.: Postgres)
+configurar_armazenamento(app, os.path.join(base_dir, '..', 'pedidos.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 'offset' (paginação numerada) ou 'cursor' (keyset sobre data_venda/id)
+app.config['PAGINACAO_PEDIDOS'] = os.environ.get('PAGINACAO_PEDIDOS', 'offset')
+# Segundos em que a contagem total da paginação por cursor fica em cache (0 desativa)
+app.config['PAGINACAO_CONTAGEM_TTL'] = int(os.environ.get('PAGINACAO_CONTAGEM_TTL', '60'))
+# 'sincrono' grava o pedido na própria requisição; 'fila' apenas enfileira o evento
+app.config['WEBHOOK_MODO'] = os.environ.get('WEBHOOK_MODO', 'sincrono')
+app.config['WEBHOOK_FILA_LOTE'] = int(os.environ.get('WEBHOOK_FILA_LOTE', '500'))
+app.config['WEBHOOK_FILA_INTERVALO'] = float(os.environ.get('WEBHOOK_FILA_INTERVALO', '1.0'))
+# Desative para consumir a fila apenas com `flask processar-fila --continuo`
+app.config['WEBHOOK_FILA_TRABALHADOR'] = os.environ.get('WEBHOOK_FILA_TRABALHADOR', '1') == '1'
+# Quantidade de eventos da Braip já aplicados mantidos em memória para descartar
+# reenvios sem consultar o banco
+app.config['WEBHOOK_DEDUP_CACHE'] = int(os.environ.get('WEBHOOK_DEDUP_CACHE', '10000'))
+# 'numpy' calcula KPIs e gráficos de um snapshot colunar em memória (requer numpy);
+# 'sql' usa os resumos diários. O snapshot é relido a cada ANALITICO_INTERVALO segundos
+app.config['ANALITICO_MOTOR'] = os.environ.get('ANALITICO_MOTOR', 'sql')
+app.config['ANALITICO_INTERVALO'] = float(os.environ.get('ANALITICO_INTERVALO', '2.0'))
+# Fuso dos limites dos períodos do painel ("hoje", "este mês") e do dia dos
+# resumos diários; as datas dos pedidos continuam gravadas em UTC. Mudá-lo
+# reconstrói os resumos no próximo `flask db-upgrade`.
+app.config['FUSO_HORARIO'] = os.environ.get('FUSO_HORARIO', 'UTC')
+# Arquivo SQLite para onde `flask arquivar-pedidos` move os pedidos pagos/frustrados
+# com mais de ARQUIVO_MESES meses (anexado com ATTACH só quando alguma leitura precisa dele)
+app.config['ARQUIVO_PEDIDOS'] = os.environ.get('ARQUIVO_PEDIDOS', os.path.join(base_dir, '..', 'pedidos_arquivo.db'))
+app.config['ARQUIVO_MESES'] = int(os.environ.get('ARQUIVO_MESES', '6'))
+# Cache dos KPIs/gráficos do painel: 'memoria', 'arquivo', 'redis' ou 'nenhum'
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memoria')
+app.config['CACHE_MAX_ITENS'] = int(os.environ.get('CACHE_MAX_ITENS', '256'))
+app.config['CACHE_DIRETORIO'] = os.environ.get('CACHE_DIRETORIO', os.path.join(base_dir, '..', 'cache'))
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+# Segundos que períodos que incluem hoje ficam em cache (as escritas invalidam antes disso)
+app.config['CACHE_TTL_CORRENTE'] = int(os.environ.get('CACHE_TTL_CORRENTE', '30'))
+# Segundos que períodos encerrados ficam em cache com o backend 'memoria', que não
+# vê as invalidações dos outros processos ('arquivo'/'redis' não expiram)
+app.config['CACHE_TTL_HISTORICO'] = int(os.environ.get('CACHE_TTL_HISTORICO', '300'))
+# Painel, pedidos e despesas respondem 304 (ETag/Last-Modified pela versão dos
+# dados) quando nada mudou desde o último carregamento do navegador
+app.config['HTTP_CACHE_ATIVO'] = os.environ.get('HTTP_CACHE_ATIVO', '1') == '1'
+# Compressão gzip (ou brotli, se instalado) das respostas HTML/JSON a partir de
+# COMPRESSAO_MIN_BYTES; desative se um proxy na frente já comprime
+app.config['COMPRESSAO_ATIVA'] = os.environ.get('COMPRESSAO_ATIVA', '1') == '1'
+app.config['COMPRESSAO_MIN_BYTES'] = int(os.environ.get('COMPRESSAO_MIN_BYTES', '1024'))
+# 'completo' renderiza o painel com os gráficos; 'lazy' renderiza só os KPIs e o
+# navegador busca as séries em /api/graficos/<nome> em paralelo
+app.config['DASHBOARD_CARREGAMENTO'] = os.environ.get('DASHBOARD_CARREGAMENTO', 'completo')
+# Pedidos 'A Receber' vencidos passam a 'Atrasado' nesse intervalo (segundos);
+# desative o agendador interno para rodar `flask marcar-atrasados` pelo cron
+app.config['ATRASOS_INTERVALO'] = int(os.environ.get('ATRASOS_INTERVALO', '300'))
+app.config['ATRASOS_AGENDADOR'] = os.environ.get('ATRASOS_AGENDADOR', '1') == '1'
+# Logs da hierarquia 'meu_app': nível (DEBUG, INFO, WARNING...) e formato 'texto' ou 'json'
+app.config['LOG_NIVEL'] = os.environ.get('LOG_NIVEL', 'WARNING')
+app.config['LOG_FORMATO'] = os.environ.get('LOG_FORMATO', 'texto')
+# Instrumentação por requisição (Server-Timing, /debug/perf, log de consultas lentas)
+app.config['PERF_ATIVO'] = os.environ.get('PERF_ATIVO', '0') == '1'
+app.config['PERF_LENTA_MS'] = float(os.environ.get('PERF_LENTA_MS', '100'))
+app.config['PERF_EXPLAIN'] = os.environ.get('PERF_EXPLAIN', '1') == '1'
+app.config['PERF_AMOSTRAS'] = int(os.environ.get('PERF_AMOSTRAS', '500'))
+# Atualizações ao vivo do painel por Server-Sent Events (/api/ao-vivo): as escritas
+# de AO_VIVO_INTERVALO segundos são publicadas juntas para todos os navegadores
+# conectados; cada conexão aberta ocupa uma thread do servidor
+app.config['AO_VIVO_ATIVO'] = os.environ.get('AO_VIVO_ATIVO', '1') == '1'
+app.config['AO_VIVO_INTERVALO'] = float(os.environ.get('AO_VIVO_INTERVALO', '0.5'))
+app.config['AO_VIVO_MAX_CLIENTES'] = int(os.environ.get('AO_VIVO_MAX_CLIENTES', '100'))
+# Endpoint /metrics (formato texto do Prometheus); desative se não houver coletor
+app.config['METRICAS_ATIVO'] = os.environ.get('METRICAS_ATIVO', '1') == '1'
 
 db = SQLAlchemy(app)
 
 
-def ensure_sqlite_column(table_name: str, column_name: str, column_definition: str) -> None:
-    """Ensure an SQLite column exists before running the application.
-
-    SQLite does not support `ALTER TABLE ...` operations that are automatically
-    triggered by SQLAlchemy's ``create_all`` when a column is added to an
-    existing model. When the schema changes we need to manually add the new
-    column so that queries referencing it do not fail.
-    """
-
-    with db.engine.connect() as connection:
-        existing_columns = {
-            row[1] for row in connection.execute(text(f"PRAGMA table_info({table_name})"))
-        }
+from meu_app import desempenho  # noqa: E402,F401
+from meu_app import models  # noqa: E402,F401
+from meu_app import metricas  # noqa: E402,F401
+from meu_app import eventos  # noqa: E402,F401
+from meu_app import arquivo  # noqa: E402,F401
+from meu_app import resumos  # noqa: E402,F401
+from meu_app import fila  # noqa: E402,F401
+from meu_app import importacao  # noqa: E402,F401
+from meu_app import gastos  # noqa: E402,F401
+from meu_app import atrasos  # noqa: E402,F401
+from meu_app import routes  # noqa: E402,F401
+from meu_app import ao_vivo  # noqa: E402,F401
+from meu_app import migracoes  # noqa: E402,F401
 
-        if column_name not in existing_columns:
-            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_definition}"))
 
+def criar_app(migrar=False):
+    """Retorna o app configurado, para servidores WSGI (``gunicorn 'meu_app:criar_app()'``) e ``run.py``.
 
-from meu_app import models  # noqa: E402,F401
-from meu_app import routes  # noqa: E402,F401
+    Importar ``meu_app`` não abre conexão com o banco: o esquema é criado e
+    atualizado por ``flask db-upgrade``, uma vez por deploy, e não a cada
+    worker. ``migrar=True`` aplica as migrações pendentes antes de retornar
+    (servidor de desenvolvimento).
+    """
 
-with app.app_context():
-    db.create_all()
-    ensure_sqlite_column("pedido", "metodo_pagamento", "VARCHAR(50)")
+    if migrar:
+        with app.app_context():
+            migracoes.atualizar_banco()
+    return app
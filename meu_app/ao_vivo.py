@@ -0,0 +1,257 @@
+"""Atualizações ao vivo do painel por Server-Sent Events (``/api/ao-vivo``).
+
+Cada navegador conectado tem apenas uma fila de mensagens. Um único publicador
+por processo recebe o sinal ``dados_alterados``, agrupa as escritas de
+``AO_VIVO_INTERVALO`` segundos e calcula uma vez por período assinado os KPIs e
+os gráficos (pelo cache do painel) e uma vez por lote as linhas dos pedidos
+alterados; a mesma mensagem vai para todas as filas. O custo acompanha a taxa
+de escritas, não o número de telas abertas.
+
+Mensagens (``event:``):
+
+- ``resumo``: KPIs do período que mudaram desde a última publicação;
+- ``graficos``: séries ``{'labels', 'data'}`` dos gráficos que mudaram;
+- ``pedidos``: linhas dos pedidos criados ou alterados (``pedido_para_dict``).
+
+Ao conectar, o cliente recebe o resumo e os gráficos completos do período. Os
+sinais só disparam no processo que fez a escrita: com a fila consumida por
+``flask processar-fila`` em outro processo, ou com vários workers, só os
+navegadores ligados ao mesmo processo recebem a atualização. Cada conexão ocupa
+uma thread do servidor enquanto estiver aberta.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from types import SimpleNamespace
+
+from flask import Response, abort, request
+
+from meu_app import app, db
+from meu_app.cache import obter_dados_dashboard
+from meu_app.models import Pedido
+from meu_app.periodos import resolver_periodo
+from meu_app.routes import pedido_para_dict
+from meu_app.sinais import dados_alterados
+
+logger = logging.getLogger(__name__)
+
+# Sem mensagens por esse tempo, envia um comentário para manter a conexão viva
+# através de proxies e detectar clientes que já foram embora.
+INTERVALO_PING = 15.0
+# Mensagens acumuladas por cliente; um cliente que não lê é desconectado e o
+# EventSource reconecta recebendo o estado completo.
+MENSAGENS_POR_CLIENTE = 100
+MAX_PEDIDOS_POR_MENSAGEM = 50
+RECONEXAO_MS = 5000
+
+
+def formatar_mensagem(evento, dados):
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+def chave_assinatura(args):
+    """Período assinado, como os argumentos da URL; ``None`` quando o cliente só quer pedidos."""
+
+    if args.get('resumo') == '0':
+        return None
+    periodo = args.get('periodo', 'hoje')
+    if periodo == 'personalizado':
+        return (periodo, args.get('data_inicio') or '', args.get('data_fim') or '')
+    return (periodo, '', '')
+
+
+def _periodo_da_chave(chave):
+    return resolver_periodo({'periodo': chave[0], 'data_inicio': chave[1], 'data_fim': chave[2]})
+
+
+def dados_do_periodo(chave):
+    periodo = _periodo_da_chave(chave)
+    return obter_dados_dashboard(periodo.chave, periodo.data_inicio, periodo.data_fim)
+
+
+def _alterados(atual, anterior):
+    if anterior is None:
+        return dict(atual)
+    return {nome: valor for nome, valor in atual.items() if anterior.get(nome) != valor}
+
+
+class Assinatura:
+    """Conexão de um navegador: o período assinado (``chave``) e a fila de mensagens ainda não enviadas."""
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.fila = queue.Queue(maxsize=MENSAGENS_POR_CLIENTE)
+        self.ativa = True
+
+
+class Publicador:
+    """Thread única que transforma as escritas em mensagens e as distribui aos clientes.
+
+    É iniciada sob demanda na primeira escrita do processo; cada sinal apenas
+    acumula os ids dos pedidos e acorda a thread, que espera ``intervalo`` segundos
+    para agrupar rajadas (ex.: um lote da fila) em uma publicação.
+    """
+
+    def __init__(self, intervalo, max_clientes):
+        self.intervalo = intervalo
+        self.max_clientes = max_clientes
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self._assinaturas = set()
+        self._pendente = SimpleNamespace(pedidos_ids=set(), tipos=set())
+        # Último estado publicado por período, para enviar só o que mudou.
+        self._publicados = {}
+        self.publicacoes = 0
+
+    def assinar(self, chave):
+        with self._lock:
+            if len(self._assinaturas) >= self.max_clientes:
+                return None
+            assinatura = Assinatura(chave)
+            self._assinaturas.add(assinatura)
+            return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            assinatura.ativa = False
+            self._assinaturas.discard(assinatura)
+            # Sem assinantes o período não é publicado; quem assinar de novo parte do estado completo.
+            if all(outra.chave != assinatura.chave for outra in self._assinaturas):
+                self._publicados.pop(assinatura.chave, None)
+
+    def lembrar_estado(self, chave, dados):
+        """Estado enviado a um novo cliente; vira a base da próxima comparação se o período ainda não tiver uma."""
+
+        with self._lock:
+            self._publicados.setdefault(chave, dados)
+
+    def clientes(self):
+        with self._lock:
+            return len(self._assinaturas)
+
+    def notificar(self, tipo, pedidos_ids):
+        with self._lock:
+            if not self._assinaturas:
+                return
+            self._pendente.tipos.add(tipo)
+            self._pendente.pedidos_ids.update(pedidos_ids)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name='ao-vivo', daemon=True)
+                self._thread.start()
+        self._acordar.set()
+
+    def _executar(self):
+        while True:
+            self._acordar.wait()
+            time.sleep(self.intervalo)
+            self._acordar.clear()
+            with self._lock:
+                pendente, self._pendente = self._pendente, SimpleNamespace(pedidos_ids=set(), tipos=set())
+            with app.app_context():
+                try:
+                    self.publicar(pendente)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Erro ao publicar atualizações ao vivo")
+
+    def publicar(self, pendente):
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        if not assinaturas:
+            return
+        self.publicacoes += 1
+
+        mensagens_por_chave = {}
+        for chave in {assinatura.chave for assinatura in assinaturas if assinatura.chave is not None}:
+            dados = dados_do_periodo(chave)
+            with self._lock:
+                anterior = self._publicados.get(chave) or {}
+                self._publicados[chave] = dados
+            mensagens = []
+            resumo = _alterados(dados['resumo'], anterior.get('resumo'))
+            if resumo:
+                mensagens.append(formatar_mensagem('resumo', resumo))
+            graficos = _alterados(dados['graficos'], anterior.get('graficos'))
+            if graficos:
+                mensagens.append(formatar_mensagem('graficos', graficos))
+            mensagens_por_chave[chave] = mensagens
+
+        comuns = []
+        if pendente.pedidos_ids:
+            ids = sorted(pendente.pedidos_ids)[-MAX_PEDIDOS_POR_MENSAGEM:]
+            pedidos = Pedido.query.filter(Pedido.id.in_(ids)).order_by(Pedido.id).all()
+            comuns.append(
+                formatar_mensagem(
+                    'pedidos',
+                    {
+                        'tipos': sorted(pendente.tipos),
+                        'total': len(pendente.pedidos_ids),
+                        'pedidos': [pedido_para_dict(pedido) for pedido in pedidos],
+                    },
+                )
+            )
+
+        for assinatura in assinaturas:
+            for mensagem in mensagens_por_chave.get(assinatura.chave, []) + comuns:
+                try:
+                    assinatura.fila.put_nowait(mensagem)
+                except queue.Full:
+                    # Cliente parado: encerra a conexão em vez de acumular mensagens.
+                    self.cancelar(assinatura)
+                    break
+
+
+publicador = Publicador(app.config['AO_VIVO_INTERVALO'], app.config['AO_VIVO_MAX_CLIENTES'])
+
+
+@dados_alterados.connect
+def _publicar_alteracao(sender, tipo=None, pedidos_ids=(), **extra):
+    publicador.notificar(tipo, pedidos_ids)
+
+
+def _transmitir(assinatura, iniciais):
+    try:
+        yield f"retry: {RECONEXAO_MS}\n\n"
+        yield from iniciais
+        while assinatura.ativa:
+            try:
+                yield assinatura.fila.get(timeout=INTERVALO_PING)
+            except queue.Empty:
+                yield ": ping\n\n"
+    finally:
+        publicador.cancelar(assinatura)
+
+
+@app.route('/api/ao-vivo')
+def ao_vivo():
+    if not app.config['AO_VIVO_ATIVO']:
+        abort(404)
+
+    chave = chave_assinatura(request.args)
+    assinatura = publicador.assinar(chave)
+    if assinatura is None:
+        # 503 faz o EventSource desistir; o painel continua funcionando sem atualizações.
+        abort(503)
+
+    # O estado inicial é lido depois de assinar: uma escrita no meio do caminho
+    # chega pela fila em vez de se perder.
+    iniciais = []
+    if chave is not None:
+        try:
+            dados = dados_do_periodo(chave)
+        except Exception:
+            publicador.cancelar(assinatura)
+            raise
+        publicador.lembrar_estado(chave, dados)
+        iniciais = [formatar_mensagem('resumo', dados['resumo']), formatar_mensagem('graficos', dados['graficos'])]
+
+    # O gerador não usa a requisição nem o banco: o contexto (e a conexão do
+    # pool) é liberado antes do streaming começar.
+    resposta = Response(_transmitir(assinatura, iniciais), mimetype='text/event-stream')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    resposta.headers['X-Accel-Buffering'] = 'no'
+    return resposta
@@ -0,0 +1,97 @@
+"""Perfis de armazenamento: URI do banco, pool de conexões e PRAGMAs do SQLite.
+
+O perfil é escolhido pela variável de ambiente ``PERFIL_ARMAZENAMENTO``:
+
+* ``padrao`` mantém o comportamento original (SQLite com os padrões do driver);
+* ``producao`` liga WAL, ``busy_timeout``, ``synchronous=NORMAL``, ``mmap_size`` e
+  ``cache_size`` em cada nova conexão e dimensiona o pool para workers
+  multi-thread (ex.: gunicorn com ``--threads``).
+
+``DATABASE_URL`` aponta o app para outro banco (ex.: Postgres); nesse caso os
+PRAGMAs são ignorados e só as opções de pool se aplicam.
+"""
+
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PERFIS_SQLITE = {
+    'padrao': {},
+    'producao': {
+        'journal_mode': 'WAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        'synchronous': 'NORMAL',
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        # Valores negativos são em KiB: -65536 = 64 MiB de cache por conexão.
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', '65536')),
+        'temp_store': 'MEMORY',
+    },
+}
+
+_pragmas_ativos = {}
+
+
+def uri_do_banco(caminho_sqlite_padrao):
+    uri = os.environ.get('DATABASE_URL')
+    if not uri:
+        return 'sqlite:///' + caminho_sqlite_padrao
+    # Heroku e afins ainda exportam o esquema antigo "postgres://".
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def opcoes_do_engine(uri, perfil):
+    """Opções de ``create_engine`` (``SQLALCHEMY_ENGINE_OPTIONS``) para o perfil."""
+
+    if perfil != 'producao':
+        return {}
+
+    pool = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '30')),
+    }
+    if uri.startswith('sqlite'):
+        # Conexões do pool são compartilhadas entre as threads do worker; o
+        # timeout do driver cobre o intervalo antes do PRAGMA busy_timeout.
+        pool['connect_args'] = {
+            'check_same_thread': False,
+            'timeout': PERFIS_SQLITE['producao']['busy_timeout'] / 1000,
+        }
+        return pool
+
+    pool['pool_pre_ping'] = True
+    pool['pool_recycle'] = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+    return pool
+
+
+def configurar_armazenamento(app, caminho_sqlite_padrao):
+    """Preenche a configuração do banco no ``app``; deve rodar antes de ``SQLAlchemy(app)``."""
+
+    perfil = os.environ.get('PERFIL_ARMAZENAMENTO', 'padrao')
+    if perfil not in PERFIS_SQLITE:
+        raise ValueError(f"PERFIL_ARMAZENAMENTO inválido: {perfil!r} (use {', '.join(PERFIS_SQLITE)})")
+
+    uri = uri_do_banco(caminho_sqlite_padrao)
+    app.config['PERFIL_ARMAZENAMENTO'] = perfil
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_do_engine(uri, perfil)
+
+    _pragmas_ativos.clear()
+    _pragmas_ativos.update(PERFIS_SQLITE[perfil])
+
+
+@event.listens_for(Engine, 'connect')
+def _aplicar_pragmas(dbapi_connection, connection_record):
+    if not _pragmas_ativos or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        for nome, valor in _pragmas_ativos.items():
+            cursor.execute(f"PRAGMA {nome} = {valor}")
+    finally:
+        cursor.close()
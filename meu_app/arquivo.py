@@ -0,0 +1,278 @@
+"""Arquivamento de pedidos encerrados em um segundo arquivo SQLite.
+
+Pedidos pagos ou frustrados há mais de ``ARQUIVO_MESES`` meses não mudam mais,
+mas continuam pesando em ``pedido``, varrida pelas listagens. ``flask
+arquivar-pedidos`` os move para ``ARQUIVO_PEDIDOS`` (tabela ``pedido`` com o mesmo
+esquema, anexada com ``ATTACH`` como ``arquivo``) e ``flask restaurar-pedidos``
+os traz de volta.
+
+Os resumos diários não mudam: a contribuição dos pedidos arquivados continua
+neles, então os KPIs e gráficos de qualquer período (inclusive 'maximo') não
+precisam do arquivo. Ele só é anexado e lido por quem precisa das linhas:
+exportações de períodos que alcançam os pedidos arquivados, a reconstrução dos
+resumos e a carga inicial do motor analítico. Um evento da Braip para um
+pedido arquivado (webhook, fila ou ``flask importar-braip``) o restaura antes
+de ser aplicado (``restaurar_para_eventos``): do contrário o evento entraria
+no registro sem efeito e um 'Aprovada' criaria um pedido duplicado.
+
+A listagem ``/pedidos`` e a busca só veem a tabela ativa; com uma busca, a
+página informa quantos pedidos arquivados também correspondem a ela
+(``contar_arquivados``), e a exportação os inclui.
+"""
+
+import heapq
+import os
+import threading
+
+import click
+from sqlalchemy import MetaData, delete, func, insert, or_, select, true, union_all
+
+from meu_app import app, db
+from meu_app.models import Pedido
+from meu_app.periodos import hoje_local, inicio_do_dia_utc, somar_meses
+from meu_app.sinais import notificar_alteracao
+
+ESQUEMA_ARQUIVO = 'arquivo'
+GRUPOS_ARQUIVAVEIS = ('pago', 'frustrado')
+LOTE_ARQUIVAMENTO = 5000
+
+pedido_ativo = Pedido.__table__
+pedido_arquivado = pedido_ativo.to_metadata(MetaData(), schema=ESQUEMA_ARQUIVO)
+
+
+def arquivo_disponivel():
+    return db.engine.dialect.name == 'sqlite' and bool(app.config['ARQUIVO_PEDIDOS'])
+
+
+def _anexar(conexao):
+    """Anexa o arquivo à conexão, se ainda não estiver (``ATTACH`` não roda dentro de uma escrita)."""
+
+    anexados = {linha[1] for linha in conexao.exec_driver_sql('PRAGMA database_list')}
+    if ESQUEMA_ARQUIVO not in anexados:
+        conexao.exec_driver_sql(f"ATTACH DATABASE ? AS {ESQUEMA_ARQUIVO}", (app.config['ARQUIVO_PEDIDOS'],))
+
+
+def arquivo_anexado():
+    """Anexa o arquivo à conexão da sessão quando ele existe; ``False`` se não houver arquivo.
+
+    Deve ser chamada antes de qualquer escrita da transação: ignorar o arquivo
+    em silêncio faria a reconstrução dos resumos perder os pedidos arquivados.
+    """
+
+    if not arquivo_disponivel() or not os.path.exists(app.config['ARQUIVO_PEDIDOS']):
+        return False
+    _anexar(db.session.connection())
+    return True
+
+
+def _sincronizar_colunas(conexao):
+    """Cria a tabela no arquivo e acrescenta as colunas que ``pedido`` ganhou desde então."""
+
+    pedido_arquivado.create(conexao, checkfirst=True)
+    existentes = {
+        linha[1] for linha in conexao.exec_driver_sql(f"PRAGMA {ESQUEMA_ARQUIVO}.table_info(pedido)")
+    }
+    for coluna in pedido_ativo.columns:
+        if coluna.name not in existentes:
+            tipo = coluna.type.compile(dialect=conexao.dialect)
+            conexao.exec_driver_sql(f"ALTER TABLE {ESQUEMA_ARQUIVO}.pedido ADD COLUMN {coluna.name} {tipo}")
+
+
+def pedidos_com_arquivo(*nomes):
+    """Subconsulta com as colunas ``nomes`` de ``pedido`` mais as do arquivo (``UNION ALL``), se houver."""
+
+    ativos = select(*(pedido_ativo.c[nome] for nome in nomes))
+    if not arquivo_anexado():
+        return ativos.subquery('pedidos')
+    arquivados = select(*(pedido_arquivado.c[nome] for nome in nomes))
+    return union_all(ativos, arquivados).subquery('pedidos')
+
+
+def periodo_alcanca_arquivo(data_inicio):
+    """Indica se um período que começa em ``data_inicio`` (UTC; ``None`` = todo o histórico) tem pedidos arquivados."""
+
+    if not arquivo_anexado():
+        return False
+    mais_recente = db.session.execute(select(func.max(pedido_arquivado.c.data_venda))).scalar()
+    return mais_recente is not None and (data_inicio is None or data_inicio <= mais_recente)
+
+
+class ConsultaComArquivo:
+    """Junta uma consulta de pedidos a uma consulta equivalente sobre o arquivo, mantendo a ordenação.
+
+    ``query_arquivo`` é montada sobre ``Pedido`` como qualquer outra e lida no
+    esquema do arquivo (``schema_translate_map``). Expõe só ``yield_per``, que é o
+    que as exportações usam; as duas consultas são lidas em paralelo e
+    intercaladas por ``chave`` (ordem decrescente).
+    """
+
+    def __init__(self, query, query_arquivo, chave):
+        self.query = query
+        self.query_arquivo = query_arquivo.execution_options(schema_translate_map={None: ESQUEMA_ARQUIVO})
+        self.chave = chave
+
+    def yield_per(self, quantidade):
+        return heapq.merge(
+            self.query.yield_per(quantidade), self.query_arquivo.yield_per(quantidade), key=self.chave, reverse=True
+        )
+
+
+def _preparar(conexao):
+    _anexar(conexao)
+    conexao.commit()
+    with conexao.begin():
+        _sincronizar_colunas(conexao)
+
+
+def _mover(conexao, origem, destino, condicao):
+    """Move, em lotes de uma transação cada, as linhas de ``origem`` que atendem ``condicao``."""
+
+    colunas = [coluna.name for coluna in pedido_ativo.columns]
+    total = 0
+    while True:
+        with conexao.begin():
+            ids = conexao.execute(
+                select(origem.c.id).where(condicao).order_by(origem.c.id).limit(LOTE_ARQUIVAMENTO)
+            ).scalars().all()
+            if not ids:
+                return total
+            linhas = select(*(origem.c[nome] for nome in colunas)).where(origem.c.id.in_(ids))
+            conexao.execute(insert(destino).from_select(colunas, linhas))
+            conexao.execute(delete(origem).where(origem.c.id.in_(ids)))
+        total += len(ids)
+
+
+def arquivar_pedidos(meses=None):
+    """Move para o arquivo os pedidos pagos/frustrados cujas datas são anteriores a ``meses`` meses atrás."""
+
+    if not arquivo_disponivel():
+        raise click.ClickException("O arquivamento requer SQLite e ARQUIVO_PEDIDOS configurado.")
+
+    meses = app.config['ARQUIVO_MESES'] if meses is None else meses
+    limite = somar_meses(hoje_local(), -meses)
+    corte = inicio_do_dia_utc(limite)
+    condicao = (
+        pedido_ativo.c.status_grupo.in_(GRUPOS_ARQUIVAVEIS)
+        & (pedido_ativo.c.data_venda < corte)
+        & or_(pedido_ativo.c.data_pagamento.is_(None), pedido_ativo.c.data_pagamento < corte)
+        # O maior id fica: sem AUTOINCREMENT o SQLite reutilizaria o id dele no próximo pedido.
+        & (pedido_ativo.c.id < select(func.max(pedido_ativo.c.id)).scalar_subquery())
+    )
+    with db.engine.connect() as conexao:
+        _preparar(conexao)
+        total = _mover(conexao, pedido_ativo, pedido_arquivado, condicao)
+    codigos_arquivados.invalidar()
+    if total:
+        # Os KPIs não mudam, mas as listagens sim (ex.: ETags de /pedidos).
+        notificar_alteracao('arquivo')
+    return total, limite
+
+
+def restaurar_pedidos(codigos=(), desde=None):
+    """Traz de volta os pedidos arquivados com os ``codigos`` Braip dados e/ou vendidos a partir de ``desde``."""
+
+    if not arquivo_disponivel() or not os.path.exists(app.config['ARQUIVO_PEDIDOS']):
+        return 0
+
+    condicoes = []
+    if codigos:
+        condicoes.append(pedido_arquivado.c.braip_trans_code.in_(codigos))
+    if desde is not None:
+        condicoes.append(pedido_arquivado.c.data_venda >= inicio_do_dia_utc(desde))
+    with db.engine.connect() as conexao:
+        _preparar(conexao)
+        total = _mover(conexao, pedido_arquivado, pedido_ativo, or_(*condicoes) if condicoes else true())
+    codigos_arquivados.invalidar()
+    if total:
+        notificar_alteracao('arquivo')
+    return total
+
+
+class CodigosArquivados:
+    """Códigos Braip dos pedidos arquivados, em memória.
+
+    Os eventos da Braip consultam este conjunto em vez do arquivo: no caminho
+    comum (código sem pedido arquivado) o custo é um ``os.stat``. O conjunto é
+    relido quando o arquivo muda (``mtime`` ou tamanho), inclusive por outro
+    processo. Memória: algumas dezenas de bytes por pedido arquivado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self._codigos = frozenset()
+
+    def _assinatura_atual(self):
+        if not arquivo_disponivel():
+            return None
+        try:
+            estado = os.stat(app.config['ARQUIVO_PEDIDOS'])
+        except FileNotFoundError:
+            return None
+        return app.config['ARQUIVO_PEDIDOS'], estado.st_mtime_ns, estado.st_size
+
+    def codigos(self):
+        # A assinatura é lida antes do conteúdo: uma escrita no meio força nova leitura na próxima chamada.
+        assinatura = self._assinatura_atual()
+        if assinatura is None:
+            return frozenset()
+        with self._lock:
+            if assinatura != self._assinatura:
+                with db.engine.connect() as conexao:
+                    _anexar(conexao)
+                    self._codigos = frozenset(
+                        conexao.execute(select(pedido_arquivado.c.braip_trans_code)).scalars()
+                    )
+                self._assinatura = assinatura
+            return self._codigos
+
+    def invalidar(self):
+        with self._lock:
+            self._assinatura = None
+
+
+codigos_arquivados = CodigosArquivados()
+
+
+def restaurar_para_eventos(codigos):
+    """Restaura os pedidos arquivados com os ``codigos`` Braip para que eventos possam ser aplicados a eles.
+
+    Deve ser chamada antes de qualquer escrita da transação da sessão (a
+    restauração usa outra conexão). Retorna os códigos restaurados; se houver
+    algum, os pedidos precisam ser relidos.
+    """
+
+    arquivados = codigos_arquivados.codigos().intersection(codigos)
+    if arquivados:
+        restaurar_pedidos(codigos=sorted(arquivados))
+    return arquivados
+
+
+def contar_arquivados(query):
+    """Quantas linhas de ``query`` (montada sobre ``Pedido``, sem o índice de busca) estão no arquivo."""
+
+    if not arquivo_anexado():
+        return 0
+    return query.execution_options(schema_translate_map={None: ESQUEMA_ARQUIVO}).order_by(None).count()
+
+
+@app.cli.command('arquivar-pedidos')
+@click.option('--meses', type=int, default=None, help='Idade mínima, em meses (padrão: ARQUIVO_MESES).')
+def arquivar_pedidos_command(meses):
+    """Move pedidos pagos/frustrados antigos para o arquivo (ARQUIVO_PEDIDOS)."""
+
+    total, limite = arquivar_pedidos(meses)
+    click.echo(f"{total} pedidos arquivados (anteriores a {limite:%d/%m/%Y}).")
+
+
+@app.cli.command('restaurar-pedidos')
+@click.option('--codigo', 'codigos', multiple=True, help='Código Braip (pode repetir).')
+@click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Vendas a partir desta data.')
+@click.option('--todos', is_flag=True, help='Restaura todo o arquivo.')
+def restaurar_pedidos_command(codigos, desde, todos):
+    """Traz pedidos do arquivo de volta para a tabela de pedidos."""
+
+    if not (codigos or desde or todos):
+        raise click.UsageError("Informe --codigo, --desde ou --todos.")
+    total = restaurar_pedidos(codigos, desde.date() if desde else None)
+    click.echo(f"{total} pedidos restaurados.")
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import click
+from sqlalchemy import insert, update
+
+from meu_app import app, db
+from meu_app.models import ExecucaoTarefa, Pedido
+from meu_app.resumos import aplicar_deltas_resumo, contribuicao_pedido, somar_contribuicao
+from meu_app.sinais import datas_afetadas, notificar_alteracao
+from meu_app.status import classificar_status_grupo
+
+TAREFA_ATRASOS = 'marcar-atrasados'
+
+logger = logging.getLogger(__name__)
+
+
+def registrar_execucao(nome, agora, registros_afetados):
+    resultado = db.session.execute(
+        update(ExecucaoTarefa)
+        .where(ExecucaoTarefa.nome == nome)
+        .values(executado_em=agora, registros_afetados=registros_afetados)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount == 0:
+        db.session.execute(
+            insert(ExecucaoTarefa).values(nome=nome, executado_em=agora, registros_afetados=registros_afetados)
+        )
+
+
+def ultima_execucao(nome=TAREFA_ATRASOS):
+    return db.session.query(ExecucaoTarefa).filter_by(nome=nome).first()
+
+
+def marcar_atrasados(agora=None):
+    """Passa a 'Atrasado' os pedidos 'A Receber' com vencimento anterior a ``agora``.
+
+    Um único ``UPDATE ... RETURNING`` sobre o índice ``(status_grupo,
+    data_vencimento)`` faz a transição; as linhas retornadas são exatamente as
+    alteradas por esta transação, então execuções concorrentes (threads ou
+    processos) nunca contam o mesmo pedido duas vezes no resumo diário.
+    Retorna a quantidade de pedidos alterados.
+    """
+
+    agora = agora or datetime.utcnow()
+    grupo_atrasado = classificar_status_grupo('Atrasado')
+    alterados = db.session.execute(
+        update(Pedido)
+        .where(Pedido.status_grupo == 'a_receber', Pedido.data_vencimento < agora)
+        .values(status='Atrasado', status_grupo=grupo_atrasado)
+        .returning(Pedido.id, Pedido.valor, Pedido.data_venda, Pedido.data_pagamento, Pedido.metodo_pagamento)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    deltas = {}
+    estados = []
+    for linha in alterados:
+        estado = SimpleNamespace(status_grupo='a_receber', **linha._asdict())
+        antes = contribuicao_pedido(estado)
+        estado.status_grupo = grupo_atrasado
+        somar_contribuicao(deltas, antes, contribuicao_pedido(estado))
+        estados.append(estado)
+
+    aplicar_deltas_resumo(deltas)
+    registrar_execucao(TAREFA_ATRASOS, agora, len(estados))
+    db.session.commit()
+    if estados:
+        notificar_alteracao('atrasos', datas_afetadas(deltas, estados), [estado.id for estado in estados])
+    return len(estados)
+
+
+class AgendadorAtrasos:
+    """Thread de segundo plano que roda ``marcar_atrasados`` a cada ``ATRASOS_INTERVALO`` segundos.
+
+    É iniciada na primeira requisição de cada processo (ver ``_iniciar_agendador``)
+    e faz a primeira passada logo ao iniciar, sem esperar o intervalo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._executar, name='agendador-atrasos', daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        while True:
+            with app.app_context():
+                try:
+                    marcar_atrasados()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Erro ao marcar pedidos atrasados")
+            time.sleep(app.config['ATRASOS_INTERVALO'])
+
+
+agendador_atrasos = AgendadorAtrasos()
+
+
+@app.before_request
+def _iniciar_agendador():
+    if app.config['ATRASOS_AGENDADOR']:
+        agendador_atrasos.iniciar()
+
+
+@app.cli.command('marcar-atrasados')
+def marcar_atrasados_command():
+    """Passa a 'Atrasado' os pedidos 'A Receber' vencidos (para rodar pelo cron)."""
+
+    inicio = time.perf_counter()
+    alterados = marcar_atrasados()
+    click.echo(f"{alterados} pedidos marcados como atrasados em {time.perf_counter() - inicio:.2f}s.")
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+from meu_app import db
+from meu_app.busca import somente_digitos
+from meu_app.models import Pedido
+from meu_app.resumos import contribuicao_pedido, somar_contribuicao
+from meu_app.status import aplicar_status, classificar_status_grupo
+
+STATUS_FRUSTRADOS_BRAIP = ['Estornado', 'Recusado', 'Cancelado']
+
+
+def metodo_pagamento_do_evento(dados):
+    return (
+        dados.get('metodo_pagamento')
+        or dados.get('forma_pagamento')
+        or dados.get('forma_pagamento_desc')
+    )
+
+
+# Status do pedido para cada ``status_compra_descricao`` que provoca transição.
+STATUS_DO_EVENTO_BRAIP = {
+    'Entregue': 'A Receber',
+    'Pagamento Confirmado': 'Pago',
+    **{status: 'Frustrado' for status in STATUS_FRUSTRADOS_BRAIP},
+}
+
+# Ordem do ciclo de vida por ``status_grupo``: um evento só é aplicado se levar o
+# pedido adiante. Reenvios e eventos fora de ordem (um 'Entregue' que chega depois
+# do 'Pagamento Confirmado') são ignorados. 'Atrasado' é derivado de 'A Receber' e
+# um estorno pode vir depois do pagamento, por isso 'frustrado' é o último estágio.
+ORDEM_STATUS_GRUPO = {
+    'agendado': 0,
+    'a_receber': 1,
+    'atrasado': 1,
+    'pago': 2,
+    'frustrado': 3,
+}
+
+
+def avanca_status(status_grupo_atual, novo_status):
+    """Indica se ``novo_status`` está depois do estágio atual no ciclo de vida."""
+
+    atual = ORDEM_STATUS_GRUPO.get(status_grupo_atual)
+    if atual is None:
+        # Status manual fora do ciclo conhecido: aceita o evento.
+        return True
+    return ORDEM_STATUS_GRUPO[classificar_status_grupo(novo_status)] > atual
+
+
+def transicionar_pedido(pedido, dados, agora):
+    """Aplica a transição de status de um evento a um pedido já existente.
+
+    ``pedido`` pode ser uma instância de ``Pedido`` ou qualquer objeto com os
+    mesmos atributos (a importação em massa usa estados em memória). Retorna
+    ``False``, sem alterar nada, quando o evento não faz o pedido avançar.
+    """
+
+    novo_status = STATUS_DO_EVENTO_BRAIP.get(dados.get('status_compra_descricao'))
+    if novo_status is not None:
+        if not avanca_status(pedido.status_grupo, novo_status):
+            return False
+        aplicar_status(pedido, novo_status)
+        if novo_status == 'A Receber':
+            pedido.data_vencimento = agora + timedelta(days=30)
+        elif novo_status == 'Pago':
+            pedido.data_pagamento = agora
+
+    metodo_pagamento_braip = metodo_pagamento_do_evento(dados)
+    if metodo_pagamento_braip:
+        pedido.metodo_pagamento = metodo_pagamento_braip
+    return True
+
+
+def cria_pedido(dados):
+    """Indica se o evento cria um pedido quando o código ainda não existe."""
+
+    return dados.get('status_compra_descricao') == 'Aprovada'
+
+
+# Campos do payload sem os quais um evento 'Aprovada' não forma um pedido válido.
+CAMPOS_NOVO_PEDIDO = ('codigo_transacao', 'nome_cliente', 'cel_cliente', 'valor_total')
+
+
+def dados_novo_pedido(dados, agora):
+    """Valores das colunas de um pedido criado a partir de um evento 'Aprovada'.
+
+    Levanta ``ValueError`` quando falta um dos ``CAMPOS_NOVO_PEDIDO``, antes de o
+    pedido chegar à sessão (onde falharia só no ``flush``, levando junto o lote).
+    """
+
+    ausentes = [campo for campo in CAMPOS_NOVO_PEDIDO if dados.get(campo) in (None, '')]
+    if ausentes:
+        raise ValueError(f"Campos obrigatórios ausentes: {', '.join(ausentes)}")
+
+    return {
+        'braip_trans_code': dados.get('codigo_transacao'),
+        'data_venda': agora,
+        'cliente': dados.get('nome_cliente'),
+        'telefone': dados.get('cel_cliente'),
+        'telefone_digitos': somente_digitos(dados.get('cel_cliente')),
+        'valor': float(dados.get('valor_total')),
+        'status': 'Agendado',
+        'status_grupo': classificar_status_grupo('Agendado'),
+        'metodo_pagamento': metodo_pagamento_do_evento(dados),
+        'data_vencimento': None,
+        'data_pagamento': None,
+    }
+
+
+def aplicar_evento_braip(dados, pedido_existente, deltas, agora=None):
+    """Aplica as transições de estado de um evento da Braip ao pedido.
+
+    ``pedido_existente`` é o pedido com o mesmo ``codigo_transacao`` (ou ``None``)
+    e ``deltas`` acumula as mudanças do resumo diário (ver
+    ``meu_app.resumos.somar_contribuicao``). Novos pedidos são adicionados à
+    sessão sem ``flush``. Retorna o pedido criado/alterado, ou ``None`` quando o
+    evento é ignorado (inclusive reenvios e eventos fora de ordem, ver
+    ``avanca_status``); o ``commit`` fica a cargo de quem chama.
+    """
+
+    agora = agora or datetime.utcnow()
+
+    if pedido_existente:
+        contribuicao_anterior = contribuicao_pedido(pedido_existente)
+        if not transicionar_pedido(pedido_existente, dados, agora):
+            return None
+        somar_contribuicao(deltas, contribuicao_anterior, contribuicao_pedido(pedido_existente))
+        return pedido_existente
+
+    if not cria_pedido(dados):
+        return None
+
+    pedido = Pedido(**dados_novo_pedido(dados, agora))
+    db.session.add(pedido)
+    somar_contribuicao(deltas, None, contribuicao_pedido(pedido))
+    return pedido
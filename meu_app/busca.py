@@ -0,0 +1,131 @@
+import re
+
+from sqlalchemy import bindparam, column, or_, text
+from sqlalchemy.exc import OperationalError
+
+from meu_app import db
+from meu_app.models import Pedido
+
+# O tokenizador trigram só encontra termos com pelo menos três caracteres;
+# buscas menores continuam no ``ilike`` tradicional.
+TAMANHO_MINIMO_FTS = 3
+
+# Descoberto na primeira busca do processo (ver ``fts_disponivel``).
+_estado = {'fts_disponivel': None}
+
+_TRIGGERS_BUSCA = [
+    """
+    CREATE TRIGGER IF NOT EXISTS pedido_busca_ai AFTER INSERT ON pedido BEGIN
+        INSERT INTO pedido_busca(rowid, cliente, telefone_digitos)
+        VALUES (new.id, new.cliente, new.telefone_digitos);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pedido_busca_ad AFTER DELETE ON pedido BEGIN
+        INSERT INTO pedido_busca(pedido_busca, rowid, cliente, telefone_digitos)
+        VALUES ('delete', old.id, old.cliente, old.telefone_digitos);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pedido_busca_au AFTER UPDATE OF cliente, telefone_digitos ON pedido BEGIN
+        INSERT INTO pedido_busca(pedido_busca, rowid, cliente, telefone_digitos)
+        VALUES ('delete', old.id, old.cliente, old.telefone_digitos);
+        INSERT INTO pedido_busca(rowid, cliente, telefone_digitos)
+        VALUES (new.id, new.cliente, new.telefone_digitos);
+    END
+    """,
+]
+
+
+def somente_digitos(valor):
+    return re.sub(r'\D', '', valor or '')
+
+
+def preencher_telefone_digitos():
+    """Normaliza ``telefone_digitos`` dos pedidos gravados antes da coluna existir (sem ``commit``)."""
+
+    pendentes = db.session.query(Pedido.id, Pedido.telefone).filter(Pedido.telefone_digitos.is_(None)).all()
+    if pendentes:
+        db.session.execute(
+            Pedido.__table__.update().where(Pedido.__table__.c.id == bindparam('pedido_id')),
+            [{'pedido_id': pedido_id, 'telefone_digitos': somente_digitos(telefone)} for pedido_id, telefone in pendentes],
+        )
+    return len(pendentes)
+
+
+def criar_indice_de_busca():
+    """Cria o índice FTS5 (trigram) de ``cliente``/``telefone_digitos`` e seus triggers.
+
+    O índice é uma tabela de conteúdo externo sobre ``pedido``: os triggers o
+    mantêm sincronizado em qualquer ``INSERT``/``UPDATE``/``DELETE``, seja pelo
+    webhook ou por edições manuais. Em bancos sem FTS5 com trigram (ou fora do
+    SQLite) nada é criado e a busca continua usando ``ilike``. Roda na transação
+    da sessão, sem ``commit`` (migração 3).
+    """
+
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(
+                text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS pedido_busca USING fts5("
+                    "cliente, telefone_digitos, content='pedido', content_rowid='id', tokenize='trigram')"
+                )
+            )
+    except OperationalError:
+        return False
+
+    for trigger in _TRIGGERS_BUSCA:
+        db.session.execute(text(trigger))
+    db.session.execute(text("INSERT INTO pedido_busca(pedido_busca) VALUES ('rebuild')"))
+    _estado['fts_disponivel'] = True
+    return True
+
+
+def fts_disponivel():
+    """Indica se o banco tem o índice de busca; consultado uma vez por processo."""
+
+    if _estado['fts_disponivel'] is None:
+        _estado['fts_disponivel'] = (
+            db.engine.dialect.name == 'sqlite'
+            and db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pedido_busca'")
+            ).first()
+            is not None
+        )
+    return _estado['fts_disponivel']
+
+
+def _frase_fts(valor):
+    return '"' + valor.replace('"', '""') + '"'
+
+
+def filtrar_por_busca(query, termo_busca, usar_indice=True):
+    """Filtra pedidos por nome do cliente ou telefone.
+
+    Com o índice FTS disponível e termos de três ou mais caracteres a busca é um
+    ``MATCH`` no índice trigram (o telefone é comparado só pelos dígitos); caso
+    contrário usa ``ilike('%termo%')`` como antes. ``usar_indice=False`` força o
+    ``ilike`` (ex.: pedidos arquivados, que não estão no índice).
+    """
+
+    termo = (termo_busca or '').strip()
+    if not termo:
+        return query
+
+    digitos = somente_digitos(termo)
+    if usar_indice and len(termo) >= TAMANHO_MINIMO_FTS and fts_disponivel():
+        expressoes = [f"cliente : {_frase_fts(termo)}"]
+        if len(digitos) >= TAMANHO_MINIMO_FTS:
+            expressoes.append(f"telefone_digitos : {_frase_fts(digitos)}")
+        ids_encontrados = text(
+            "SELECT rowid FROM pedido_busca WHERE pedido_busca MATCH :expressao"
+        ).bindparams(expressao=' OR '.join(expressoes)).columns(column('rowid'))
+        return query.filter(Pedido.id.in_(ids_encontrados))
+
+    condicoes = [Pedido.cliente.ilike(f'%{termo}%'), Pedido.telefone.ilike(f'%{termo}%')]
+    if digitos:
+        condicoes.append(Pedido.telefone_digitos.like(f'%{digitos}%'))
+    return query.filter(or_(*condicoes))
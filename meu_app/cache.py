@@ -0,0 +1,263 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from meu_app import app
+from meu_app.analitico import motor_analitico
+from meu_app.graficos import GRAFICOS, serie_temporal
+from meu_app.kpis import calcular_agendado_total, calcular_resumo
+from meu_app.periodos import hoje_local
+from meu_app.sinais import dados_alterados
+
+
+class CacheMemoria:
+    """LRU em memória do processo, com TTL opcional por item."""
+
+    def __init__(self, max_itens=256):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em is not None and expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl=None):
+        expira_em = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._itens[chave] = (expira_em, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def incr(self, chave):
+        with self._lock:
+            _, valor = self._itens.get(chave, (None, 0))
+            self._itens[chave] = (None, valor + 1)
+            return valor + 1
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class CacheArquivo:
+    """Cache em arquivos (pickle) compartilhável entre processos da mesma máquina."""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, hashlib.sha1(chave.encode()).hexdigest())
+
+    def get(self, chave):
+        try:
+            with open(self._caminho(chave), 'rb') as arquivo:
+                expira_em, valor = pickle.load(arquivo)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expira_em is not None and expira_em < time.time():
+            return None
+        return valor
+
+    def set(self, chave, valor, ttl=None):
+        expira_em = time.time() + ttl if ttl else None
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio)
+        with os.fdopen(descritor, 'wb') as arquivo:
+            pickle.dump((expira_em, valor), arquivo)
+        os.replace(temporario, self._caminho(chave))
+
+    def incr(self, chave):
+        with self._lock:
+            valor = (self.get(chave) or 0) + 1
+            self.set(chave, valor)
+            return valor
+
+    def __len__(self):
+        return len(os.listdir(self.diretorio))
+
+
+class CacheRedis:
+    """Cache em um servidor compatível com Redis (requer o pacote ``redis``)."""
+
+    def __init__(self, url):
+        import redis
+
+        self._cliente = redis.Redis.from_url(url)
+
+    def get(self, chave):
+        valor = self._cliente.get(chave)
+        return pickle.loads(valor) if valor is not None else None
+
+    def set(self, chave, valor, ttl=None):
+        self._cliente.set(chave, pickle.dumps(valor), ex=int(ttl) if ttl else None)
+
+    def incr(self, chave):
+        return self._cliente.incr(chave)
+
+    def __len__(self):
+        return self._cliente.dbsize()
+
+
+def criar_backend(config):
+    backend = config['CACHE_BACKEND']
+    if backend == 'nenhum':
+        return None
+    if backend == 'arquivo':
+        return CacheArquivo(config['CACHE_DIRETORIO'])
+    if backend == 'redis':
+        return CacheRedis(config['CACHE_REDIS_URL'])
+    return CacheMemoria(config['CACHE_MAX_ITENS'])
+
+
+class CacheDashboard:
+    """Cache dos KPIs e gráficos do painel por ``(periodo, data_inicio, data_fim)``.
+
+    Períodos que incluem hoje expiram após ``CACHE_TTL_CORRENTE`` segundos. As
+    escritas invalidam as entradas incrementando um contador de geração que faz
+    parte da chave: o dos períodos correntes sobe a cada escrita, e o dos
+    históricos só quando a escrita toca um dia anterior a hoje (ex.: pedido
+    antigo frustrado).
+
+    Com um backend compartilhado (arquivo, Redis) os contadores valem para todos
+    os processos e os períodos encerrados ficam em cache sem expiração. Na
+    memória do processo uma escrita feita em outro worker não invalida nada, então
+    eles expiram após ``CACHE_TTL_HISTORICO`` segundos.
+    """
+
+    def __init__(self, backend, ttl_corrente, ttl_historico):
+        self.backend = backend
+        self.ttl_corrente = ttl_corrente
+        self.ttl_historico = None if isinstance(backend, (CacheArquivo, CacheRedis)) else ttl_historico
+        # Os contadores são atualizados por várias threads (requisições, fila, ao vivo)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    def _geracao(self, escopo):
+        return self.backend.get(f'dashboard:geracao:{escopo}') or 0
+
+    def obter(self, periodo, data_inicio, data_fim, calcular):
+        if self.backend is None:
+            return calcular()
+
+        hoje = hoje_local()
+        historico = data_fim is not None and data_fim.date() < hoje
+        escopo = 'historico' if historico else 'corrente'
+        chave = (
+            f"dashboard:{escopo}:{self._geracao(escopo)}:{hoje.isoformat()}:{periodo}:"
+            f"{data_inicio.isoformat() if data_inicio else ''}:{data_fim.isoformat() if data_fim else ''}"
+        )
+
+        valor = self.backend.get(chave)
+        if valor is not None:
+            with self._lock:
+                self.hits += 1
+            return valor
+
+        with self._lock:
+            self.misses += 1
+        valor = calcular()
+        self.backend.set(chave, valor, ttl=self.ttl_historico if historico else self.ttl_corrente)
+        return valor
+
+    def invalidar(self, datas=()):
+        if self.backend is None:
+            return
+        with self._lock:
+            self.invalidacoes += 1
+        self.backend.incr('dashboard:geracao:corrente')
+        hoje = hoje_local()
+        if any(dia < hoje for dia in datas):
+            self.backend.incr('dashboard:geracao:historico')
+
+    def estatisticas(self):
+        with self._lock:
+            hits, misses, invalidacoes = self.hits, self.misses, self.invalidacoes
+        consultas = hits + misses
+        return {
+            'backend': app.config['CACHE_BACKEND'],
+            'hits': hits,
+            'misses': misses,
+            'taxa_acerto': (hits / consultas) if consultas else 0.0,
+            'invalidacoes': invalidacoes,
+            'itens': len(self.backend) if self.backend is not None else 0,
+        }
+
+
+cache_dashboard = CacheDashboard(
+    criar_backend(app.config), app.config['CACHE_TTL_CORRENTE'], app.config['CACHE_TTL_HISTORICO']
+)
+
+
+@dados_alterados.connect
+def _invalidar_cache(sender, datas=(), **extra):
+    cache_dashboard.invalidar(datas)
+
+
+def obter_resumo(periodo, data_inicio, data_fim):
+    """KPIs do período, via cache (e do motor analítico em NumPy, se ativo).
+
+    ``agendado_total`` não depende do período e é guardado em uma entrada própria,
+    sempre corrente, para que períodos históricos em cache não o congelem.
+    """
+
+    calcular = motor_analitico.resumo if motor_analitico else calcular_resumo
+    resumo = cache_dashboard.obter(f'resumo:{periodo}', data_inicio, data_fim, lambda: calcular(data_inicio, data_fim))
+    agendado_total = cache_dashboard.obter(
+        'agendado_total', None, None, motor_analitico.agendado_total if motor_analitico else calcular_agendado_total
+    )
+    return dict(
+        resumo,
+        agendado_total=agendado_total,
+        projecao=resumo['faturamento_liquido'] + resumo['falta_receber'] + agendado_total,
+    )
+
+
+def _calcular_grafico(nome, data_inicio, data_fim):
+    if motor_analitico:
+        return motor_analitico.grafico(nome, data_inicio, data_fim)
+    return GRAFICOS[nome](data_inicio, data_fim)
+
+
+def obter_grafico(nome, periodo, data_inicio, data_fim):
+    """Série ``{'labels', 'data'}`` de um gráfico de ``GRAFICOS``, via cache."""
+
+    labels, data = cache_dashboard.obter(
+        f'grafico:{nome}:{periodo}', data_inicio, data_fim, lambda: _calcular_grafico(nome, data_inicio, data_fim)
+    )
+    return {'labels': labels, 'data': data}
+
+
+def obter_dados_dashboard(periodo, data_inicio, data_fim):
+    """KPIs (``resumo``) e séries de todos os gráficos (``graficos``) do período."""
+
+    return {
+        'resumo': obter_resumo(periodo, data_inicio, data_fim),
+        'graficos': {nome: obter_grafico(nome, periodo, data_inicio, data_fim) for nome in GRAFICOS},
+    }
+
+
+def obter_serie(periodo, granularidade, comparar):
+    """Série temporal do ``Periodo`` (ver ``meu_app.graficos.serie_temporal``), via cache."""
+
+    return cache_dashboard.obter(
+        f'serie:{granularidade}:{int(comparar)}:{periodo.chave}',
+        periodo.data_inicio,
+        periodo.data_fim,
+        lambda: serie_temporal(periodo, granularidade, comparar),
+    )
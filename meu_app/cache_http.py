@@ -0,0 +1,189 @@
+"""Cache HTTP condicional das páginas e compressão das respostas.
+
+As páginas marcadas com ``@condicional`` (painel, pedidos, despesas) recebem um
+``ETag`` forte e ``Last-Modified`` derivados da versão dos dados, da URL com os
+argumentos, do dia local e da versão dos templates. A versão dos dados é um
+token trocado a cada sinal ``dados_alterados``; uma requisição repetida sem
+escrita no meio (ex.: as telas de acompanhamento recarregando) recebe ``304``
+sem renderizar o template nem consultar o banco.
+
+A versão fica no backend de ``CACHE_BACKEND``. Com 'arquivo' ou 'redis' ela é
+compartilhada entre processos; com 'memoria' (ou 'nenhum') cada processo tem a
+sua e escritas de outros processos (``flask processar-fila`` separado, vários
+workers) só mudam o ETag quando ele vira, a cada ``CACHE_TTL_CORRENTE``
+segundos. A página renderizada então reflete o cache do painel, que nesse caso
+também só enxerga essas escritas quando as entradas expiram:
+``CACHE_TTL_CORRENTE`` para períodos que incluem hoje e ``CACHE_TTL_HISTORICO``
+para os encerrados (ver ``CacheDashboard``).
+
+Respostas HTML e JSON acima de ``COMPRESSAO_MIN_BYTES`` são comprimidas com
+brotli (se o pacote ``brotli`` estiver instalado) ou gzip, conforme o
+``Accept-Encoding``; o ETag leva a codificação como sufixo.
+"""
+
+import functools
+import gzip
+import hashlib
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import make_response, request
+
+from meu_app import app
+from meu_app.cache import CacheArquivo, CacheMemoria, CacheRedis, cache_dashboard
+from meu_app.periodos import hoje_local, inicio_do_dia_utc
+from meu_app.sinais import dados_alterados
+
+CHAVE_VERSAO = 'http:versao-dados'
+TIPOS_COMPRIMIVEIS = {'text/html', 'application/json'}
+NIVEL_GZIP = 6
+QUALIDADE_BROTLI = 5
+
+_backend = cache_dashboard.backend if cache_dashboard.backend is not None else CacheMemoria(1)
+# Sem backend compartilhado, o ETag muda a cada janela para limitar o atraso (ver acima).
+_janela = 0 if isinstance(_backend, (CacheArquivo, CacheRedis)) else app.config['CACHE_TTL_CORRENTE']
+
+
+def brotli_disponivel():
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _versao_templates():
+    """Instante da última alteração de um template: um deploy com templates novos invalida os ETags."""
+
+    pasta = os.path.join(app.root_path, app.template_folder)
+    return max((os.path.getmtime(os.path.join(pasta, nome)) for nome in os.listdir(pasta)), default=0)
+
+
+_versao_dos_templates = _versao_templates()
+_codificacoes = ['br', 'gzip'] if brotli_disponivel() else ['gzip']
+
+
+def _agora_utc():
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def nova_versao_dados():
+    _backend.set(CHAVE_VERSAO, (uuid.uuid4().hex, _agora_utc()))
+
+
+def versao_dados():
+    """``(token, alterado_em)`` da última escrita; criada na primeira leitura do processo/backend."""
+
+    versao = _backend.get(CHAVE_VERSAO)
+    if versao is None:
+        nova_versao_dados()
+        versao = _backend.get(CHAVE_VERSAO)
+    return versao
+
+
+@dados_alterados.connect
+def _trocar_versao(sender, **extra):
+    nova_versao_dados()
+
+
+def codificacao_aceita():
+    """Codificação que será usada na resposta (``'br'``, ``'gzip'`` ou ``None``)."""
+
+    if not app.config['COMPRESSAO_ATIVA']:
+        return None
+    return request.accept_encodings.best_match(_codificacoes)
+
+
+def _validadores():
+    """ETag (sem a codificação) e ``Last-Modified`` da página pedida."""
+
+    token, alterado_em = versao_dados()
+    hoje = hoje_local()
+    janela = int(time.time() // _janela) if _janela else 0
+    argumentos = sorted(request.args.items(multi=True))
+    conteudo = f"{token}|{request.path}|{argumentos}|{hoje.isoformat()}|{janela}|{_versao_dos_templates}"
+
+    # If-Modified-Since sozinho não enxerga a virada do dia nem a da janela.
+    ultima_mudanca = max(alterado_em, inicio_do_dia_utc(hoje).replace(tzinfo=timezone.utc))
+    if _janela:
+        ultima_mudanca = max(ultima_mudanca, datetime.fromtimestamp(janela * _janela, timezone.utc))
+    return hashlib.sha1(conteudo.encode()).hexdigest(), ultima_mudanca
+
+
+def _etag_do_cliente(etag):
+    """ETag que o cliente já tem (com ou sem o sufixo da codificação), ou ``None``."""
+
+    codificacao = codificacao_aceita()
+    for candidato in (f"{etag}-{codificacao}" if codificacao else None, etag):
+        if candidato and request.if_none_match.contains(candidato):
+            return candidato
+    return None
+
+
+def _marcar(resposta, etag, ultima_mudanca):
+    resposta.set_etag(etag)
+    resposta.last_modified = ultima_mudanca
+    # O navegador pode guardar a página, mas revalida a cada carregamento.
+    resposta.headers['Cache-Control'] = 'no-cache'
+    resposta.vary.add('Accept-Encoding')
+    return resposta
+
+
+def condicional(view):
+    """Responde ``304`` quando a página que o cliente tem ainda vale; senão marca a resposta nova."""
+
+    @functools.wraps(view)
+    def envolvida(*args, **kwargs):
+        if not app.config['HTTP_CACHE_ATIVO']:
+            return view(*args, **kwargs)
+
+        etag, ultima_mudanca = _validadores()
+        if request.if_none_match:
+            etag_valido = _etag_do_cliente(etag)
+            if etag_valido:
+                return _marcar(make_response('', 304), etag_valido, ultima_mudanca)
+        elif request.if_modified_since and ultima_mudanca <= request.if_modified_since:
+            return _marcar(make_response('', 304), etag, ultima_mudanca)
+
+        resposta = make_response(view(*args, **kwargs))
+        if resposta.status_code == 200:
+            # O sufixo da codificação é acrescentado por ``comprimir_resposta``.
+            _marcar(resposta, etag, ultima_mudanca)
+        return resposta
+
+    return envolvida
+
+
+def _comprimir(dados, codificacao):
+    if codificacao == 'br':
+        import brotli
+
+        return brotli.compress(dados, quality=QUALIDADE_BROTLI)
+    return gzip.compress(dados, compresslevel=NIVEL_GZIP)
+
+
+@app.after_request
+def comprimir_resposta(resposta):
+    if (
+        resposta.status_code != 200
+        or resposta.direct_passthrough
+        or resposta.is_streamed
+        or resposta.mimetype not in TIPOS_COMPRIMIVEIS
+        or 'Content-Encoding' in resposta.headers
+    ):
+        return resposta
+
+    codificacao = codificacao_aceita()
+    resposta.vary.add('Accept-Encoding')
+    dados = resposta.get_data()
+    if codificacao is None or len(dados) < app.config['COMPRESSAO_MIN_BYTES']:
+        return resposta
+
+    resposta.set_data(_comprimir(dados, codificacao))
+    resposta.headers['Content-Encoding'] = codificacao
+    etag, fraco = resposta.get_etag()
+    if etag:
+        resposta.set_etag(f"{etag}-{codificacao}", weak=fraco)
+    return resposta
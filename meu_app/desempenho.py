@@ -0,0 +1,213 @@
+"""Instrumentação opcional de desempenho e configuração de logs do app.
+
+Com ``PERF_ATIVO=1`` cada requisição registra, via eventos do SQLAlchemy, a
+quantidade de consultas, o tempo total no banco e as consultas mais lentas;
+a resposta ganha o cabeçalho ``Server-Timing`` e ``/debug/perf`` mostra p50/p95
+por rota. Consultas acima de ``PERF_LENTA_MS`` vão para o log
+``meu_app.desempenho`` com o plano de execução (``EXPLAIN QUERY PLAN`` no
+SQLite). Desligado, os eventos retornam na primeira linha.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+
+from flask import abort, g, has_request_context, render_template, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from meu_app import app
+
+logger = logging.getLogger(__name__)
+
+CONSULTAS_LENTAS_POR_REQUISICAO = 3
+CONSULTAS_LENTAS_GUARDADAS = 50
+
+
+class FormatadorJson(logging.Formatter):
+    """Uma linha JSON por registro, incluindo os campos passados em ``extra``."""
+
+    CAMPOS_PADRAO = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+    def format(self, registro):
+        dados = {
+            'instante': self.formatTime(registro),
+            'nivel': registro.levelname,
+            'logger': registro.name,
+            'mensagem': registro.getMessage(),
+        }
+        dados.update({chave: valor for chave, valor in vars(registro).items() if chave not in self.CAMPOS_PADRAO})
+        if registro.exc_info:
+            dados['excecao'] = self.formatException(registro.exc_info)
+        return json.dumps(dados, default=str, ensure_ascii=False)
+
+
+def configurar_logs(config):
+    """Liga os logs da hierarquia ``meu_app`` no nível ``LOG_NIVEL`` (texto ou JSON)."""
+
+    raiz = logging.getLogger('meu_app')
+    raiz.setLevel(config['LOG_NIVEL'].upper())
+    if raiz.handlers:
+        return
+    saida = logging.StreamHandler()
+    if config['LOG_FORMATO'] == 'json':
+        saida.setFormatter(FormatadorJson())
+    else:
+        saida.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    raiz.addHandler(saida)
+
+
+class EstatisticasRotas:
+    """Últimas ``PERF_AMOSTRAS`` durações de cada rota e as consultas lentas recentes."""
+
+    def __init__(self, amostras):
+        self._lock = threading.Lock()
+        self._amostras = amostras
+        self._rotas = defaultdict(lambda: deque(maxlen=self._amostras))
+        self.consultas_lentas = deque(maxlen=CONSULTAS_LENTAS_GUARDADAS)
+
+    def registrar(self, rota, duracao_ms, consultas, tempo_db_ms):
+        with self._lock:
+            self._rotas[rota].append((duracao_ms, consultas, tempo_db_ms))
+
+    def registrar_lenta(self, consulta):
+        with self._lock:
+            self.consultas_lentas.appendleft(consulta)
+
+    def resumo(self):
+        with self._lock:
+            rotas = {rota: list(amostras) for rota, amostras in self._rotas.items()}
+        linhas = []
+        for rota, amostras in sorted(rotas.items()):
+            duracoes = sorted(duracao for duracao, _, _ in amostras)
+            linhas.append(
+                {
+                    'rota': rota,
+                    'requisicoes': len(amostras),
+                    'p50_ms': _percentil(duracoes, 0.50),
+                    'p95_ms': _percentil(duracoes, 0.95),
+                    'max_ms': duracoes[-1],
+                    'consultas_media': sum(consultas for _, consultas, _ in amostras) / len(amostras),
+                    'db_media_ms': sum(tempo_db for _, _, tempo_db in amostras) / len(amostras),
+                }
+            )
+        return linhas
+
+
+def _percentil(ordenados, fracao):
+    return ordenados[min(len(ordenados) - 1, int(round(fracao * (len(ordenados) - 1))))]
+
+
+configurar_logs(app.config)
+estatisticas_rotas = EstatisticasRotas(app.config['PERF_AMOSTRAS'])
+
+
+def _estado_da_requisicao():
+    if not app.config['PERF_ATIVO'] or not has_request_context():
+        return None
+    return g.get('_perf')
+
+
+def _plano_de_execucao(conn, statement, parameters):
+    prefixo = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    # Cursor próprio: o da consulta original ainda tem linhas a serem lidas.
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefixo + statement, parameters)
+        return [' '.join(str(coluna) for coluna in linha) for linha in cursor.fetchall()]
+    except Exception as erro:  # o plano é só diagnóstico
+        return [f"plano indisponível: {erro}"]
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    if _estado_da_requisicao() is None or context is None:
+        return
+    # No contexto da execução, não em ``conn.info``: uma consulta que falha não
+    # deixa um início órfão na conexão do pool para a próxima.
+    context._perf_inicio = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    estado = _estado_da_requisicao()
+    inicio = getattr(context, '_perf_inicio', None)
+    if estado is None or inicio is None:
+        return
+
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    estado.consultas += 1
+    estado.tempo_db_ms += duracao_ms
+    estado.mais_lentas.append((duracao_ms, statement))
+    estado.mais_lentas.sort(key=lambda item: item[0], reverse=True)
+    del estado.mais_lentas[CONSULTAS_LENTAS_POR_REQUISICAO:]
+
+    if duracao_ms < app.config['PERF_LENTA_MS']:
+        return
+    plano = None
+    if app.config['PERF_EXPLAIN'] and not executemany and statement.lstrip().upper().startswith('SELECT'):
+        plano = _plano_de_execucao(conn, statement, parameters)
+    consulta = {
+        'rota': request.endpoint,
+        'duracao_ms': round(duracao_ms, 2),
+        'sql': statement,
+        'plano': plano,
+    }
+    estatisticas_rotas.registrar_lenta(consulta)
+    logger.warning("Consulta lenta (%.1f ms) em %s", duracao_ms, request.endpoint, extra=consulta)
+
+
+@app.before_request
+def _iniciar_medicao():
+    if app.config['PERF_ATIVO']:
+        g._perf = SimpleNamespace(inicio=time.perf_counter(), consultas=0, tempo_db_ms=0.0, mais_lentas=[])
+
+
+@app.after_request
+def _registrar_medicao(resposta):
+    estado = _estado_da_requisicao()
+    if estado is None:
+        return resposta
+
+    duracao_ms = (time.perf_counter() - estado.inicio) * 1000
+    rota = request.url_rule.rule if request.url_rule else request.path
+    estatisticas_rotas.registrar(rota, duracao_ms, estado.consultas, estado.tempo_db_ms)
+    resposta.headers.add(
+        'Server-Timing',
+        f'db;dur={estado.tempo_db_ms:.2f};desc="{estado.consultas} consultas", '
+        f'app;dur={duracao_ms - estado.tempo_db_ms:.2f}, total;dur={duracao_ms:.2f}',
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "%s %s: %.1f ms, %d consultas (%.1f ms no banco)",
+            request.method,
+            rota,
+            duracao_ms,
+            estado.consultas,
+            estado.tempo_db_ms,
+            extra={
+                'rota': rota,
+                'duracao_ms': round(duracao_ms, 2),
+                'consultas': estado.consultas,
+                'db_ms': round(estado.tempo_db_ms, 2),
+                'mais_lentas': [(round(duracao, 2), sql) for duracao, sql in estado.mais_lentas],
+            },
+        )
+    return resposta
+
+
+@app.route('/debug/perf')
+def debug_perf():
+    if not app.config['PERF_ATIVO']:
+        abort(404)
+    return render_template(
+        'debug_perf.html',
+        rotas=estatisticas_rotas.resumo(),
+        consultas_lentas=list(estatisticas_rotas.consultas_lentas),
+        limite_ms=app.config['PERF_LENTA_MS'],
+    )
@@ -0,0 +1,71 @@
+"""Deduplicação dos eventos do webhook da Braip.
+
+Cada evento aplicado fica registrado em ``EventoBraip`` pela sua chave (hash de
+código, status e data do evento). Um LRU em memória com as chaves mais recentes
+responde aos reenvios sem ir ao banco; só chaves já confirmadas no banco entram
+no LRU, então um acerto é sempre um evento repetido.
+"""
+
+import hashlib
+
+from sqlalchemy import insert
+
+from meu_app import app, db
+from meu_app.cache import CacheMemoria
+from meu_app.models import EventoBraip
+
+eventos_recentes = CacheMemoria(app.config['WEBHOOK_DEDUP_CACHE'])
+
+
+def chave_evento(dados):
+    """Hash de (codigo_transacao, status_compra_descricao, data_evento) do payload."""
+
+    partes = (
+        dados.get('codigo_transacao'),
+        dados.get('status_compra_descricao'),
+        dados.get('data_evento'),
+    )
+    texto = '|'.join('' if parte is None else str(parte) for parte in partes)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def lembrar_eventos(chaves):
+    for chave in chaves:
+        eventos_recentes.set(chave, True)
+
+
+def chaves_registradas(chaves):
+    """Subconjunto de ``chaves`` já aplicado; consulta o banco só para as que não estão no LRU."""
+
+    repetidas = {chave for chave in chaves if eventos_recentes.get(chave) is not None}
+    desconhecidas = set(chaves) - repetidas
+    if desconhecidas:
+        no_banco = {
+            chave
+            for (chave,) in db.session.query(EventoBraip.chave).filter(EventoBraip.chave.in_(desconhecidas))
+        }
+        lembrar_eventos(no_banco)
+        repetidas |= no_banco
+    return repetidas
+
+
+def evento_repetido(chave):
+    return chave in chaves_registradas([chave])
+
+
+def registrar_eventos(eventos):
+    """Adiciona ``(chave, dados)`` ao registro na transação corrente (sem ``commit``)."""
+
+    if not eventos:
+        return
+    db.session.execute(
+        insert(EventoBraip),
+        [
+            {
+                'chave': chave,
+                'codigo_transacao': dados.get('codigo_transacao'),
+                'status': dados.get('status_compra_descricao'),
+            }
+            for chave, dados in eventos
+        ],
+    )
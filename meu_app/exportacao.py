@@ -0,0 +1,120 @@
+import csv
+import io
+import tempfile
+
+from meu_app.gastos import filtrar_gastos
+from meu_app.models import Gasto, Pedido
+
+TAMANHO_LOTE_EXPORTACAO = 1000
+TAMANHO_BLOCO_ARQUIVO = 64 * 1024
+
+COLUNAS_PEDIDOS = (
+    ('id', 'ID'),
+    ('braip_trans_code', 'Código Braip'),
+    ('data_venda', 'Data Venda'),
+    ('cliente', 'Cliente'),
+    ('telefone', 'Telefone'),
+    ('valor', 'Valor'),
+    ('status', 'Status'),
+    ('metodo_pagamento', 'Método de Pagamento'),
+    ('data_vencimento', 'Vencimento'),
+    ('data_pagamento', 'Data Pagamento'),
+    ('observacao', 'Observação'),
+)
+COLUNAS_GASTOS = (
+    ('id', 'ID'),
+    ('data', 'Data'),
+    ('valor', 'Valor'),
+    ('categoria', 'Categoria'),
+)
+
+
+def _valor_celula(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'strftime'):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    return valor
+
+
+def _linhas(query, colunas):
+    """Gera as linhas de ``query`` em lotes de ``TAMANHO_LOTE_EXPORTACAO``.
+
+    ``yield_per`` lê o resultado por um cursor do servidor e descarta cada lote
+    depois de usado, então a memória não cresce com o tamanho da tabela.
+    """
+
+    atributos = [atributo for atributo, _ in colunas]
+    for registro in query.yield_per(TAMANHO_LOTE_EXPORTACAO):
+        yield [_valor_celula(getattr(registro, atributo)) for atributo in atributos]
+
+
+def gerar_csv(query, colunas):
+    """Gera o CSV de ``query`` em blocos de texto, um lote de linhas por vez."""
+
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    # BOM para o Excel reconhecer o arquivo como UTF-8 (acentos dos nomes).
+    buffer.write('\ufeff')
+    escritor.writerow([titulo for _, titulo in colunas])
+
+    for numero, linha in enumerate(_linhas(query, colunas), start=1):
+        escritor.writerow(linha)
+        if numero % TAMANHO_LOTE_EXPORTACAO == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gerar_xlsx(query, colunas, titulo_planilha):
+    """Gera o XLSX de ``query`` em blocos de bytes (requer ``openpyxl``).
+
+    A planilha é montada em modo ``write_only`` num arquivo temporário, que é
+    então enviado em blocos; nenhuma das etapas mantém a tabela inteira em memória.
+    """
+
+    from openpyxl import Workbook
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet(titulo_planilha)
+    aba.append([titulo for _, titulo in colunas])
+    for linha in _linhas(query, colunas):
+        aba.append(linha)
+
+    with tempfile.TemporaryFile() as arquivo:
+        planilha.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(TAMANHO_BLOCO_ARQUIVO)
+            if not bloco:
+                break
+            yield bloco
+
+
+def xlsx_disponivel():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _colunas_do_modelo(modelo, colunas):
+    # Só as colunas exportadas, como tuplas: evita montar um objeto ORM por linha.
+    return [getattr(modelo, atributo) for atributo, _ in colunas]
+
+
+def query_exportacao_pedidos(query, data_inicio=None, data_fim=None):
+    if data_inicio and data_fim:
+        query = query.filter(Pedido.data_venda.between(data_inicio, data_fim))
+    return query.with_entities(*_colunas_do_modelo(Pedido, COLUNAS_PEDIDOS)).order_by(
+        Pedido.data_venda.desc(), Pedido.id.desc()
+    )
+
+
+def query_exportacao_gastos(query, data_inicio=None, data_fim=None, categoria=None):
+    query = filtrar_gastos(query, data_inicio, data_fim, categoria)
+    return query.with_entities(*_colunas_do_modelo(Gasto, COLUNAS_GASTOS)).order_by(
+        Gasto.data.desc(), Gasto.id.desc()
+    )
@@ -0,0 +1,239 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from meu_app import app, db, metricas
+from meu_app.arquivo import restaurar_para_eventos
+from meu_app.braip import aplicar_evento_braip
+from meu_app.eventos import chave_evento, chaves_registradas, lembrar_eventos, registrar_eventos
+from meu_app.models import FilaWebhook, Pedido
+from meu_app.resumos import aplicar_deltas_resumo
+from meu_app.sinais import datas_afetadas, notificar_alteracao
+
+# Reservas mais antigas que isso são consideradas abandonadas (worker encerrado
+# no meio de um lote) e voltam a ficar disponíveis.
+EXPIRACAO_RESERVA = timedelta(minutes=5)
+
+logger = logging.getLogger(__name__)
+
+
+def enfileirar_evento(dados):
+    """Grava o payload do webhook no diário da fila e acorda o worker interno."""
+
+    db.session.add(FilaWebhook(payload=json.dumps(dados)))
+    db.session.commit()
+    if app.config['WEBHOOK_FILA_TRABALHADOR']:
+        trabalhador_fila.iniciar()
+        trabalhador_fila.acordar()
+
+
+def _reservar_lote(tamanho, token, agora):
+    """Marca até ``tamanho`` eventos pendentes com ``token`` e os retorna em ordem de chegada.
+
+    A reserva é um único ``UPDATE`` confirmado antes do processamento, o que
+    impede que dois workers (threads ou processos) peguem o mesmo evento.
+    """
+
+    pendentes = (
+        select(FilaWebhook.id)
+        .where(
+            FilaWebhook.processado_em.is_(None),
+            or_(FilaWebhook.reservado_por.is_(None), FilaWebhook.reservado_em < agora - EXPIRACAO_RESERVA),
+        )
+        .order_by(FilaWebhook.id)
+        .limit(tamanho)
+    )
+    db.session.execute(
+        update(FilaWebhook)
+        .where(FilaWebhook.id.in_(pendentes))
+        .values(reservado_por=token, reservado_em=agora)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return (
+        FilaWebhook.query.filter_by(reservado_por=token, processado_em=None)
+        .order_by(FilaWebhook.id)
+        .all()
+    )
+
+
+def _carregar_pedidos(codigos):
+    return {
+        pedido.braip_trans_code: pedido
+        for pedido in Pedido.query.filter(Pedido.braip_trans_code.in_(codigos))
+    }
+
+
+def _aplicar_entradas(entradas, agora):
+    """Aplica os eventos de ``entradas`` e confirma a transação; retorna quantos eram repetidos."""
+
+    eventos = []
+    invalidos = []
+    for entrada in entradas:
+        try:
+            eventos.append((entrada, json.loads(entrada.payload)))
+        except ValueError as erro:
+            invalidos.append((entrada, erro))
+
+    codigos = {dados.get('codigo_transacao') for _, dados in eventos}
+    pedidos = _carregar_pedidos(codigos)
+    # Antes de qualquer escrita do lote: a restauração anexa o arquivo.
+    if restaurar_para_eventos(codigos - pedidos.keys() - {None}):
+        pedidos = _carregar_pedidos(codigos)
+    for entrada in entradas:
+        entrada.processado_em = agora
+    for entrada, erro in invalidos:
+        entrada.erro = f"Payload inválido: {erro}"[:300]
+
+    chaves = [chave_evento(dados) for _, dados in eventos]
+    vistas = chaves_registradas(chaves)
+    deltas = {}
+    alterados = {}
+    aplicados = []
+    duplicados = 0
+    for chave, (entrada, dados) in zip(chaves, eventos):
+        if chave in vistas:
+            duplicados += 1
+            continue
+        codigo = dados.get('codigo_transacao')
+        existente = pedidos.get(codigo)
+        try:
+            pedido = aplicar_evento_braip(dados, existente, deltas, agora=agora)
+        except (TypeError, ValueError) as erro:
+            entrada.erro = f"Evento inválido: {erro}"[:300]
+            continue
+        if existente is None and pedido is None:
+            # Sem pedido para o código: fora do registro, como em ``webhook_braip``.
+            continue
+        vistas.add(chave)
+        aplicados.append((chave, dados))
+        if pedido is not None:
+            pedidos[codigo] = alterados[codigo] = pedido
+
+    aplicar_deltas_resumo(deltas)
+    registrar_eventos(aplicados)
+    db.session.commit()
+    lembrar_eventos(chave for chave, _ in aplicados)
+    if alterados:
+        notificar_alteracao(
+            'webhook',
+            datas_afetadas(deltas, alterados.values()),
+            [pedido.id for pedido in alterados.values()],
+        )
+    return duplicados
+
+
+def processar_lote(tamanho=None):
+    """Processa um lote da fila em uma única transação e retorna quantos eventos consumiu.
+
+    Os pedidos do lote são carregados de uma vez por ``braip_trans_code`` e os
+    eventos são aplicados em ordem de chegada sobre esse mapa, de modo que vários
+    eventos do mesmo código no lote resultam em um único pedido (upsert
+    idempotente). Eventos com payload inválido são marcados com ``erro`` sem
+    interromper o restante do lote. Se ainda assim o banco recusar o lote, os
+    eventos são reaplicados um a um e só os recusados ficam com ``erro``; do
+    contrário o lote voltaria à fila a cada ``EXPIRACAO_RESERVA`` e falharia
+    para sempre.
+    """
+
+    tamanho = tamanho or app.config['WEBHOOK_FILA_LOTE']
+    inicio = time.perf_counter()
+    agora = datetime.utcnow()
+    entradas = _reservar_lote(tamanho, uuid.uuid4().hex, agora)
+    if not entradas:
+        return 0
+
+    try:
+        duplicados = _aplicar_entradas(entradas, agora)
+    except SQLAlchemyError:
+        db.session.rollback()
+        logger.warning("Lote da fila recusado pelo banco; reaplicando os eventos um a um", exc_info=True)
+        duplicados = 0
+        for entrada in entradas:
+            try:
+                duplicados += _aplicar_entradas([entrada], agora)
+            except SQLAlchemyError as erro:
+                db.session.rollback()
+                entrada.processado_em = agora
+                entrada.erro = f"Evento recusado pelo banco: {erro}"[:300]
+                db.session.commit()
+
+    metricas.webhook_duplicados_total.incrementar(quantidade=duplicados)
+    for entrada in entradas:
+        metricas.fila_espera_segundos.observar((agora - entrada.recebido_em).total_seconds())
+        if entrada.erro:
+            metricas.webhook_erros_total.incrementar()
+    metricas.fila_lote_segundos.observar(time.perf_counter() - inicio)
+    return len(entradas)
+
+
+def contar_pendentes():
+    return FilaWebhook.query.filter(FilaWebhook.processado_em.is_(None)).count()
+
+
+class TrabalhadorFila:
+    """Thread de segundo plano que esvazia a fila em lotes.
+
+    É iniciada sob demanda no primeiro evento enfileirado de cada processo e
+    acordada a cada novo evento; sem eventos, verifica a fila a cada
+    ``WEBHOOK_FILA_INTERVALO`` segundos.
+    """
+
+    def __init__(self):
+        self._acordar = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._executar, name='fila-webhook', daemon=True)
+            self._thread.start()
+
+    def acordar(self):
+        self._acordar.set()
+
+    def _executar(self):
+        while True:
+            self._acordar.wait(timeout=app.config['WEBHOOK_FILA_INTERVALO'])
+            self._acordar.clear()
+            with app.app_context():
+                try:
+                    while processar_lote():
+                        pass
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Erro ao processar a fila do webhook")
+
+
+trabalhador_fila = TrabalhadorFila()
+
+
+@app.cli.command('processar-fila')
+@click.option('--continuo', is_flag=True, help='Continua aguardando novos eventos após esvaziar a fila.')
+@click.option('--lote', type=int, default=None, help='Quantidade máxima de eventos por transação.')
+def processar_fila_command(continuo, lote):
+    """Processa os eventos pendentes da fila do webhook da Braip."""
+
+    total = 0
+    inicio = time.perf_counter()
+    while True:
+        processados = processar_lote(lote)
+        total += processados
+        if processados:
+            continue
+        if not continuo:
+            break
+        time.sleep(app.config['WEBHOOK_FILA_INTERVALO'])
+
+    duracao = time.perf_counter() - inicio
+    taxa = total / duracao if duracao > 0 else 0.0
+    click.echo(f"{total} eventos processados em {duracao:.2f}s ({taxa:.0f} eventos/s).")
@@ -0,0 +1,240 @@
+import csv
+import itertools
+import math
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+
+import click
+from sqlalchemy import func, insert, or_
+
+from meu_app import app, db
+from meu_app.models import Gasto, ResumoDiarioGasto
+from meu_app.resumos import CATEGORIA_PADRAO, registrar_gastos_no_resumo
+from meu_app.sinais import notificar_alteracao
+
+MAX_ERROS_RELATADOS = 50
+
+
+def normalizar_valor(valor):
+    """Converte o valor digitado/exportado em ``float``.
+
+    O separador decimal é o último entre "," e "." ("12,50", "1.234,56" e
+    "1,234.56"); o outro, se houver, é o de milhar e precisa agrupar de três em
+    três. Um separador que se repete sozinho é de milhar ("1.234.567"). Aceita
+    o prefixo "R$"; valores ambíguos ("1,234,5") ou que não são números finitos
+    levantam ``ValueError``.
+    """
+
+    texto = str(valor).replace('R$', '').replace(' ', '').strip()
+    decimal = ',' if texto.rfind(',') > texto.rfind('.') else '.'
+    milhar = '.' if decimal == ',' else ','
+    if texto.count(decimal) > 1 and milhar not in texto:
+        decimal, milhar = None, decimal
+    inteiro, _, fracao = texto.rpartition(decimal) if decimal and decimal in texto else (texto, '', '')
+    numero = math.nan
+    if milhar not in inteiro or re.fullmatch(rf'[-+]?\d{{1,3}}(?:{re.escape(milhar)}\d{{3}})+', inteiro):
+        try:
+            numero = float(f"{inteiro.replace(milhar, '')}.{fracao}" if fracao else inteiro.replace(milhar, ''))
+        except ValueError:
+            pass
+    if not math.isfinite(numero):
+        raise ValueError(f"valor inválido: {valor!r}")
+    return numero
+
+
+def interpretar_data(valor):
+    """Lê datas ISO ("2024-05-31", "2024-05-31 14:00") ou brasileiras ("31/05/2024 14:00")."""
+
+    texto = (valor or '').strip()
+    try:
+        if '/' not in texto:
+            return datetime.fromisoformat(texto)
+        dia, _, hora = texto.partition(' ')
+        dia, mes, ano = (int(parte) for parte in dia.split('/'))
+        horario = [int(parte) for parte in hora.split(':')] if hora else []
+        if len(horario) > 3:
+            raise ValueError(hora)
+        return datetime(ano, mes, dia, *horario)
+    except (TypeError, ValueError):
+        raise ValueError(f"data inválida: {valor!r}") from None
+
+
+def filtrar_gastos(query, data_inicio=None, data_fim=None, categoria=None):
+    """Aplica os filtros de período e categoria da listagem/exportação de despesas.
+
+    ``CATEGORIA_PADRAO`` seleciona os gastos sem categoria (e os gravados com esse
+    nome), como no resumo diário e em ``totais_gastos``.
+    """
+
+    if data_inicio and data_fim:
+        query = query.filter(Gasto.data.between(data_inicio, data_fim))
+    if categoria == CATEGORIA_PADRAO:
+        # O mesmo critério do resumo diário (``coalesce(categoria, CATEGORIA_PADRAO)``)
+        query = query.filter(or_(Gasto.categoria.is_(None), Gasto.categoria == CATEGORIA_PADRAO))
+    elif categoria:
+        query = query.filter(Gasto.categoria == categoria)
+    return query
+
+
+def totais_gastos(data_inicio=None, data_fim=None, categoria=None):
+    """Quantidade e valor dos gastos do filtro, somados a partir do resumo diário.
+
+    Os filtros de período são por dia inteiro, então o resumo responde sem ler a
+    tabela ``gasto``: o custo depende do número de dias, não de lançamentos.
+    """
+
+    query = db.session.query(
+        func.coalesce(func.sum(ResumoDiarioGasto.quantidade), 0),
+        func.coalesce(func.sum(ResumoDiarioGasto.valor_total), 0.0),
+    )
+    if data_inicio and data_fim:
+        query = query.filter(ResumoDiarioGasto.dia.between(data_inicio.date(), data_fim.date()))
+    if categoria:
+        query = query.filter(ResumoDiarioGasto.categoria == categoria)
+    quantidade, valor = query.one()
+    return int(quantidade), float(valor)
+
+
+def subtotal_gastos(gastos):
+    """Soma, no banco, o valor dos gastos de uma página."""
+
+    ids = [gasto.id for gasto in gastos]
+    if not ids:
+        return 0.0
+    total = db.session.query(func.coalesce(func.sum(Gasto.valor), 0.0)).filter(Gasto.id.in_(ids)).scalar()
+    return float(total)
+
+
+def categorias_de_gastos():
+    """Categorias já usadas, lidas do resumo diário (uma linha por dia/categoria)."""
+
+    return [
+        categoria
+        for (categoria,) in db.session.query(ResumoDiarioGasto.categoria)
+        .distinct()
+        .order_by(ResumoDiarioGasto.categoria)
+    ]
+
+
+def ler_gastos_csv(arquivo):
+    """Gera ``(numero_da_linha, linha)`` de um CSV de gastos aberto em modo texto.
+
+    O separador (``;`` ou ``,``) é detectado pelo cabeçalho, que precisa ter as
+    colunas ``data`` e ``valor`` (``categoria`` é opcional).
+    """
+
+    cabecalho = arquivo.readline()
+    separador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    leitor = csv.DictReader(itertools.chain([cabecalho], arquivo), delimiter=separador)
+    colunas = [(nome or '').strip().lower() for nome in (leitor.fieldnames or [])]
+    faltando = {'data', 'valor'} - set(colunas)
+    if faltando:
+        raise ValueError(f"cabeçalho sem as colunas: {', '.join(sorted(faltando))}")
+    leitor.fieldnames = colunas
+
+    for linha in leitor:
+        yield leitor.line_num, linha
+
+
+def normalizar_categoria(categoria):
+    """Categoria em branco vira ``None`` (exibida como ``CATEGORIA_PADRAO``)."""
+
+    return (categoria or '').strip() or None
+
+
+def gasto_da_linha(linha):
+    if not (linha.get('valor') or '').strip():
+        raise ValueError("valor ausente")
+    return SimpleNamespace(
+        data=interpretar_data(linha.get('data')),
+        valor=normalizar_valor(linha['valor']),
+        categoria=normalizar_categoria(linha.get('categoria')),
+    )
+
+
+def chave_natural(data, valor, categoria):
+    """Um lançamento é repetido quando data, valor (em centavos) e categoria coincidem."""
+
+    return data, round(valor * 100), categoria
+
+
+def importar_gastos(arquivo):
+    """Valida e importa um CSV de gastos em uma única transação.
+
+    Linhas iguais a lançamentos já gravados (pela chave natural) são ignoradas
+    e contadas em ``duplicados``: cada lançamento gravado cobre uma linha, então
+    reimportar o mesmo arquivo não duplica nada, mas linhas idênticas dentro de
+    um arquivo novo são todas gravadas. Se alguma linha for inválida nada é
+    gravado. Retorna o relatório com as contagens, os erros por linha e a taxa
+    em linhas por segundo.
+    """
+
+    inicio = time.perf_counter()
+    relatorio = SimpleNamespace(linhas=0, inseridos=0, duplicados=0, erros=[], segundos=0.0, linhas_por_segundo=0.0)
+    novos = []
+
+    try:
+        for numero, linha in ler_gastos_csv(arquivo):
+            relatorio.linhas += 1
+            try:
+                novos.append(gasto_da_linha(linha))
+            except ValueError as erro:
+                relatorio.erros.append(f"Linha {numero}: {erro}")
+    except (ValueError, csv.Error, UnicodeDecodeError) as erro:
+        relatorio.erros.append(f"Arquivo inválido: {erro}")
+
+    if not relatorio.erros and novos:
+        datas = [gasto.data for gasto in novos]
+        existentes = Counter(
+            chave_natural(data, valor, categoria)
+            for data, valor, categoria in db.session.query(Gasto.data, Gasto.valor, Gasto.categoria).filter(
+                Gasto.data.between(min(datas), max(datas))
+            )
+        )
+        pendentes = []
+        for gasto in novos:
+            chave = chave_natural(gasto.data, gasto.valor, gasto.categoria)
+            if existentes[chave]:
+                existentes[chave] -= 1
+                relatorio.duplicados += 1
+            else:
+                pendentes.append(gasto)
+        novos = pendentes
+
+    if not relatorio.erros and novos:
+        try:
+            db.session.execute(insert(Gasto), [vars(gasto) for gasto in novos])
+            registrar_gastos_no_resumo(novos)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        relatorio.inseridos = len(novos)
+        notificar_alteracao('gasto', sorted({gasto.data.date() for gasto in novos}))
+
+    relatorio.segundos = time.perf_counter() - inicio
+    relatorio.linhas_por_segundo = relatorio.linhas / relatorio.segundos if relatorio.segundos > 0 else 0.0
+    return relatorio
+
+
+@app.cli.command('import-gastos')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+def importar_gastos_command(arquivo):
+    """Importa um CSV de gastos (colunas data;valor;categoria) de uma só vez."""
+
+    with open(arquivo, newline='', encoding='utf-8-sig') as entrada:
+        relatorio = importar_gastos(entrada)
+
+    for erro in relatorio.erros[:MAX_ERROS_RELATADOS]:
+        click.echo(erro, err=True)
+    if relatorio.erros:
+        raise click.ClickException(
+            f"{len(relatorio.erros)} linha(s) inválida(s) em {relatorio.linhas}; nenhum gasto foi gravado."
+        )
+    click.echo(
+        f"{relatorio.linhas} linhas em {relatorio.segundos:.2f}s ({relatorio.linhas_por_segundo:.0f} linhas/s): "
+        f"{relatorio.inseridos} gastos importados, {relatorio.duplicados} repetidos ignorados."
+    )
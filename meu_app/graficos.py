@@ -0,0 +1,213 @@
+from sqlalchemy import case, func, literal, select, union_all
+
+from meu_app import db
+from meu_app.models import ResumoDiarioGasto, ResumoDiarioPedido
+from meu_app.periodos import buckets_entre, expressao_bucket, granularidade_padrao, rotulo_bucket
+
+METRICAS_SERIE = ('faturamento', 'vendas', 'gasto', 'lucro', 'frustrado', 'a_receber', 'atrasado')
+
+
+def _filtrar_dias(query, coluna, data_inicio, data_fim):
+    if data_inicio and data_fim:
+        return query.filter(coluna.between(data_inicio.date(), data_fim.date()))
+    return query
+
+
+def _granularidade(coluna, data_inicio, data_fim):
+    """Granularidade do gráfico: pelo tamanho do período ou, no histórico inteiro, dos dados."""
+
+    if data_inicio and data_fim:
+        return granularidade_padrao((data_fim.date() - data_inicio.date()).days + 1)
+    primeiro, ultimo = db.session.query(func.min(coluna), func.max(coluna)).one()
+    if primeiro is None:
+        return 'dia'
+    return granularidade_padrao((ultimo - primeiro).days + 1)
+
+
+def grafico_faturamento(data_inicio=None, data_fim=None):
+    """Faturamento (pedidos pagos) por dia de pagamento; semanas ou meses em períodos longos."""
+
+    granularidade = _granularidade(ResumoDiarioPedido.dia, data_inicio, data_fim)
+    bucket = expressao_bucket(ResumoDiarioPedido.dia, granularidade)
+    query = _filtrar_dias(
+        db.session.query(bucket, func.sum(ResumoDiarioPedido.valor_total))
+        .filter(ResumoDiarioPedido.status_grupo == 'pago'),
+        ResumoDiarioPedido.dia,
+        data_inicio,
+        data_fim,
+    )
+    resultado = query.group_by(bucket).order_by(bucket).all()
+    return [rotulo_bucket(dia, granularidade) for dia, _ in resultado], [float(total) for _, total in resultado]
+
+
+def grafico_gastos(data_inicio=None, data_fim=None):
+    """Gastos por dia; semanas ou meses em períodos longos."""
+
+    granularidade = _granularidade(ResumoDiarioGasto.dia, data_inicio, data_fim)
+    bucket = expressao_bucket(ResumoDiarioGasto.dia, granularidade)
+    query = _filtrar_dias(
+        db.session.query(bucket, func.sum(ResumoDiarioGasto.valor_total)),
+        ResumoDiarioGasto.dia,
+        data_inicio,
+        data_fim,
+    )
+    resultado = query.group_by(bucket).order_by(bucket).all()
+    return [rotulo_bucket(dia, granularidade) for dia, _ in resultado], [float(total) for _, total in resultado]
+
+
+def grafico_categorias(data_inicio=None, data_fim=None):
+    """Gastos por categoria."""
+
+    query = _filtrar_dias(
+        db.session.query(ResumoDiarioGasto.categoria, func.sum(ResumoDiarioGasto.valor_total)),
+        ResumoDiarioGasto.dia,
+        data_inicio,
+        data_fim,
+    )
+    resultado = query.group_by(ResumoDiarioGasto.categoria).order_by(ResumoDiarioGasto.categoria).all()
+    return [categoria for categoria, _ in resultado], [float(total) for _, total in resultado]
+
+
+def grafico_pagamentos(data_inicio=None, data_fim=None):
+    """Faturamento por método de pagamento."""
+
+    query = _filtrar_dias(
+        db.session.query(ResumoDiarioPedido.metodo_pagamento, func.sum(ResumoDiarioPedido.valor_total))
+        .filter(ResumoDiarioPedido.status_grupo == 'pago'),
+        ResumoDiarioPedido.dia,
+        data_inicio,
+        data_fim,
+    )
+    resultado = (
+        query.group_by(ResumoDiarioPedido.metodo_pagamento).order_by(ResumoDiarioPedido.metodo_pagamento).all()
+    )
+    return [metodo for metodo, _ in resultado], [float(total) for _, total in resultado]
+
+
+GRAFICOS = {
+    'faturamento': grafico_faturamento,
+    'gastos': grafico_gastos,
+    'categorias': grafico_categorias,
+    'pagamentos': grafico_pagamentos,
+}
+
+
+def calcular_graficos(data_inicio=None, data_fim=None):
+    """Calcula todas as séries dos gráficos do painel a partir dos resumos diários."""
+
+    graficos = {}
+    for nome, funcao in GRAFICOS.items():
+        labels, data = funcao(data_inicio, data_fim)
+        graficos[nome] = {'labels': labels, 'data': data}
+    return graficos
+
+
+def _totais_por_bucket(inicio, fim, granularidade, corte=None):
+    """Soma as métricas de ``METRICAS_SERIE`` por bucket em uma única consulta agrupada.
+
+    Os resumos de pedidos e de gastos são agregados por bucket e unidos com
+    ``UNION ALL``. Com ``corte`` cada linha também é separada em 'anterior'
+    (dias antes de ``corte``) e 'atual', para a comparação de períodos sair da
+    mesma consulta. Retorna ``{(lado, bucket): {metrica: valor}}``.
+    """
+
+    pedido, gasto = ResumoDiarioPedido, ResumoDiarioGasto
+
+    def _lado(coluna):
+        return case((coluna >= corte, 'atual'), else_='anterior') if corte else literal('atual')
+
+    def _soma(grupo, valor=pedido.valor_total):
+        return func.sum(case((pedido.status_grupo == grupo, valor), else_=0))
+
+    bucket_pedido, lado_pedido = expressao_bucket(pedido.dia, granularidade), _lado(pedido.dia)
+    selecao_pedidos = select(
+        lado_pedido.label('lado'),
+        bucket_pedido.label('bucket'),
+        _soma('pago').label('faturamento'),
+        _soma('pago', pedido.quantidade).label('vendas'),
+        literal(0.0).label('gasto'),
+        _soma('frustrado').label('frustrado'),
+        _soma('a_receber').label('a_receber'),
+        _soma('atrasado').label('atrasado'),
+    ).group_by(lado_pedido, bucket_pedido)
+
+    bucket_gasto, lado_gasto = expressao_bucket(gasto.dia, granularidade), _lado(gasto.dia)
+    selecao_gastos = select(
+        lado_gasto.label('lado'),
+        bucket_gasto.label('bucket'),
+        literal(0.0).label('faturamento'),
+        literal(0).label('vendas'),
+        func.sum(gasto.valor_total).label('gasto'),
+        literal(0.0).label('frustrado'),
+        literal(0.0).label('a_receber'),
+        literal(0.0).label('atrasado'),
+    ).group_by(lado_gasto, bucket_gasto)
+
+    if inicio and fim:
+        selecao_pedidos = selecao_pedidos.where(pedido.dia.between(inicio, fim))
+        selecao_gastos = selecao_gastos.where(gasto.dia.between(inicio, fim))
+
+    uniao = union_all(selecao_pedidos, selecao_gastos).subquery()
+    metricas = [metrica for metrica in METRICAS_SERIE if metrica != 'lucro']
+    consulta = select(
+        uniao.c.lado, uniao.c.bucket, *(func.sum(uniao.c[metrica]).label(metrica) for metrica in metricas)
+    ).group_by(uniao.c.lado, uniao.c.bucket)
+
+    totais = {}
+    for linha in db.session.execute(consulta):
+        valores = {metrica: float(getattr(linha, metrica) or 0.0) for metrica in metricas}
+        valores['vendas'] = int(valores['vendas'])
+        valores['lucro'] = valores['faturamento'] - valores['gasto']
+        totais[(linha.lado, linha.bucket)] = valores
+    return totais
+
+
+def _montar_serie(totais, lado, buckets, granularidade):
+    vazio = dict.fromkeys(METRICAS_SERIE, 0.0)
+    linhas = [totais.get((lado, bucket), vazio) for bucket in buckets]
+    series = {metrica: [linha[metrica] for linha in linhas] for metrica in METRICAS_SERIE}
+    series['vendas'] = [int(valor) for valor in series['vendas']]
+    return {
+        'labels': [rotulo_bucket(bucket, granularidade) for bucket in buckets],
+        'buckets': [bucket.isoformat() for bucket in buckets],
+        'series': series,
+        'totais': {metrica: sum(valores) for metrica, valores in series.items()},
+    }
+
+
+def serie_temporal(periodo, granularidade=None, comparar=False):
+    """Séries de ``METRICAS_SERIE`` do ``periodo`` por bucket, com o período anterior opcional.
+
+    Sem ``granularidade`` usa ``granularidade_padrao``. Os buckets vazios entram
+    com zero, então a série atual e a anterior ficam alinhadas por posição.
+    """
+
+    anterior = periodo.anterior() if comparar else None
+    if granularidade is None:
+        granularidade = _granularidade(ResumoDiarioPedido.dia, periodo.data_inicio, periodo.data_fim)
+    totais = _totais_por_bucket(
+        anterior.inicio if anterior else periodo.inicio,
+        periodo.fim,
+        granularidade,
+        corte=periodo.inicio if anterior else None,
+    )
+
+    if periodo.inicio:
+        buckets = buckets_entre(periodo.inicio, periodo.fim, granularidade)
+    else:
+        buckets = sorted(bucket for _, bucket in totais)
+    dados = {'granularidade': granularidade, **_montar_serie(totais, 'atual', buckets, granularidade)}
+    if anterior is None:
+        return dados
+
+    buckets_anteriores = buckets_entre(anterior.inicio, anterior.fim, granularidade)
+    dados['anterior'] = {**anterior.para_dict(), **_montar_serie(totais, 'anterior', buckets_anteriores, granularidade)}
+    totais_anteriores = dados['anterior']['totais']
+    # Variação relativa ao período anterior (0.25 = +25%); None quando o anterior é zero.
+    dados['variacao'] = {
+        metrica: (total - totais_anteriores[metrica]) / abs(totais_anteriores[metrica])
+        if totais_anteriores[metrica]
+        else None
+        for metrica, total in dados['totais'].items()
+    }
+    return dados
@@ -0,0 +1,221 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import click
+from sqlalchemy import insert, select, update
+
+from meu_app import app, db
+from meu_app.arquivo import arquivo_anexado, pedido_arquivado, pedido_ativo, restaurar_pedidos
+from meu_app.braip import cria_pedido, dados_novo_pedido, transicionar_pedido
+from meu_app.gastos import MAX_ERROS_RELATADOS
+from meu_app.models import Pedido
+from meu_app.resumos import aplicar_deltas_resumo, contribuicao_pedido, somar_contribuicao
+from meu_app.sinais import datas_afetadas, notificar_alteracao
+
+COLUNAS_ESTADO = (
+    'id',
+    'braip_trans_code',
+    'status',
+    'status_grupo',
+    'valor',
+    'data_venda',
+    'data_vencimento',
+    'data_pagamento',
+    'metodo_pagamento',
+)
+COLUNAS_ATUALIZAVEIS = ('status', 'status_grupo', 'data_vencimento', 'data_pagamento', 'metodo_pagamento')
+
+
+def ler_eventos(caminho, formato=None):
+    """Gera os eventos de um export da Braip (JSONL ou CSV) sem carregar o arquivo inteiro."""
+
+    formato = formato or ('csv' if caminho.lower().endswith('.csv') else 'jsonl')
+    with open(caminho, newline='', encoding='utf-8') as arquivo:
+        if formato == 'csv':
+            for linha in csv.DictReader(arquivo):
+                yield {chave: (valor if valor != '' else None) for chave, valor in linha.items()}
+        else:
+            for linha in arquivo:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    yield json.loads(linha)
+                except ValueError:
+                    # Linha corrompida: contabilizada como evento inválido.
+                    yield {}
+
+
+def data_do_evento(dados, padrao):
+    """Usa ``data_evento`` (ISO 8601) do export como instante da transição, se houver.
+
+    Datas com fuso são convertidas para UTC ingênuo, como as demais colunas;
+    datas sem fuso já são tratadas como UTC.
+    """
+
+    valor = dados.get('data_evento')
+    if not valor:
+        return padrao
+    instante = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+    if instante.tzinfo is not None:
+        instante = instante.astimezone(timezone.utc).replace(tzinfo=None)
+    return instante
+
+
+def carregar_mapa_pedidos(tabela=pedido_ativo):
+    """Carrega ``braip_trans_code`` → estado de todos os pedidos de ``tabela`` (a ativa ou a do arquivo)."""
+
+    consulta = select(*(tabela.c[coluna] for coluna in COLUNAS_ESTADO)).execution_options(yield_per=10000)
+    return {linha.braip_trans_code: SimpleNamespace(**linha._asdict()) for linha in db.session.execute(consulta)}
+
+
+class ImportadorBraip:
+    """Reaplica eventos da Braip em lotes, com a mesma lógica de ``webhook_braip``.
+
+    O estado de cada pedido fica em memória (mapa ``braip_trans_code`` → estado);
+    ao fim de cada lote os pedidos novos são gravados com um ``INSERT`` em massa
+    (executemany), os alterados com um ``UPDATE`` em massa por chave primária, e
+    os deltas do resumo diário na mesma transação.
+
+    Cada evento é validado antes de mudar o estado em memória: um evento
+    inválido (sem código, data ilegível, 'Aprovada' sem os campos do pedido) é
+    pulado e contado em ``total_invalidos``, e os primeiros vão para ``erros``,
+    sem deixar o lote pela metade.
+
+    Pedidos arquivados também entram no mapa (códigos em ``arquivados``), para
+    que um 'Aprovada' reenviado não os duplique; os que um evento altera são
+    restaurados no início do ``gravar_lote`` seguinte.
+    """
+
+    def __init__(self, tamanho_lote=5000):
+        self.tamanho_lote = tamanho_lote
+        self.pedidos = carregar_mapa_pedidos()
+        self.arquivados = set()
+        if arquivo_anexado():
+            arquivados = carregar_mapa_pedidos(pedido_arquivado)
+            self.arquivados = arquivados.keys() - self.pedidos.keys()
+            self.pedidos = {**arquivados, **self.pedidos}
+        self.novos = {}
+        self.alterados = {}
+        self.deltas = {}
+        self.total_eventos = 0
+        self.total_ignorados = 0
+        self.total_invalidos = 0
+        self.total_inseridos = 0
+        self.total_atualizados = 0
+        self.erros = []
+
+    def aplicar(self, dados):
+        codigo = dados.get('codigo_transacao')
+        if not codigo:
+            raise ValueError("codigo_transacao ausente")
+
+        agora = data_do_evento(dados, datetime.utcnow())
+        estado = self.pedidos.get(codigo)
+        if estado is None:
+            if not cria_pedido(dados):
+                self.total_ignorados += 1
+                return
+            estado = SimpleNamespace(id=None, **dados_novo_pedido(dados, agora))
+            self.pedidos[codigo] = estado
+            self.novos[codigo] = estado
+            somar_contribuicao(self.deltas, None, contribuicao_pedido(estado))
+            return
+
+        contribuicao_anterior = contribuicao_pedido(estado)
+        if not transicionar_pedido(estado, dados, agora):
+            self.total_ignorados += 1
+            return
+        somar_contribuicao(self.deltas, contribuicao_anterior, contribuicao_pedido(estado))
+        if estado.id is not None:
+            self.alterados[codigo] = estado
+
+    def gravar_lote(self):
+        restaurar = self.arquivados & self.alterados.keys()
+        if restaurar:
+            # Antes das escritas do lote: a restauração usa outra conexão.
+            restaurar_pedidos(codigos=sorted(restaurar))
+            self.arquivados -= restaurar
+        if self.novos:
+            linhas = [
+                {coluna: valor for coluna, valor in vars(estado).items() if coluna != 'id'}
+                for estado in self.novos.values()
+            ]
+            resultado = db.session.execute(
+                insert(Pedido).returning(Pedido.id, Pedido.braip_trans_code, sort_by_parameter_order=True),
+                linhas,
+            )
+            for pedido_id, codigo in resultado:
+                self.pedidos[codigo].id = pedido_id
+        if self.alterados:
+            db.session.execute(
+                update(Pedido),
+                [
+                    {'id': estado.id, **{coluna: getattr(estado, coluna) for coluna in COLUNAS_ATUALIZAVEIS}}
+                    for estado in self.alterados.values()
+                ],
+            )
+        aplicar_deltas_resumo(self.deltas)
+        db.session.commit()
+        gravados = list(self.novos.values()) + list(self.alterados.values())
+        if gravados:
+            notificar_alteracao(
+                'importacao', datas_afetadas(self.deltas, gravados), [estado.id for estado in gravados]
+            )
+
+        self.total_inseridos += len(self.novos)
+        self.total_atualizados += len(self.alterados)
+        self.novos, self.alterados, self.deltas = {}, {}, {}
+
+    def importar(self, eventos, ao_gravar_lote=None):
+        no_lote = 0
+        for dados in eventos:
+            self.total_eventos += 1
+            try:
+                self.aplicar(dados)
+            except (TypeError, ValueError) as erro:
+                self.total_invalidos += 1
+                if len(self.erros) < MAX_ERROS_RELATADOS:
+                    self.erros.append(f"Evento {self.total_eventos}: {erro}")
+            no_lote += 1
+            if no_lote >= self.tamanho_lote:
+                self.gravar_lote()
+                no_lote = 0
+                if ao_gravar_lote:
+                    ao_gravar_lote(self)
+        self.gravar_lote()
+        if ao_gravar_lote:
+            ao_gravar_lote(self)
+
+
+@app.cli.command('importar-braip')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['jsonl', 'csv']), default=None, help='Padrão: pela extensão do arquivo.')
+@click.option('--lote', type=int, default=5000, show_default=True, help='Eventos por transação.')
+def importar_braip_command(arquivo, formato, lote):
+    """Importa um export de eventos da Braip (JSONL ou CSV) em lotes."""
+
+    inicio = time.perf_counter()
+    importador = ImportadorBraip(tamanho_lote=lote)
+    click.echo(f"{len(importador.pedidos)} pedidos existentes carregados em {time.perf_counter() - inicio:.2f}s.")
+
+    def _progresso(importador):
+        decorrido = time.perf_counter() - inicio
+        taxa = importador.total_eventos / decorrido if decorrido > 0 else 0.0
+        click.echo(f"{importador.total_eventos} eventos ({taxa:.0f} eventos/s)")
+
+    importador.importar(ler_eventos(arquivo, formato), ao_gravar_lote=_progresso)
+
+    decorrido = time.perf_counter() - inicio
+    taxa = importador.total_eventos / decorrido if decorrido > 0 else 0.0
+    click.echo(
+        f"Importação de {os.path.basename(arquivo)} concluída em {decorrido:.2f}s ({taxa:.0f} eventos/s): "
+        f"{importador.total_inseridos} pedidos criados, {importador.total_atualizados} atualizados, "
+        f"{importador.total_ignorados} ignorados, {importador.total_invalidos} inválidos."
+    )
+    for erro in importador.erros:
+        click.echo(erro, err=True)
@@ -0,0 +1,71 @@
+from sqlalchemy import and_, case, func
+
+from meu_app import db
+from meu_app.models import Pedido, ResumoDiarioGasto, ResumoDiarioPedido
+
+
+def _soma_condicional(condicoes, valor=Pedido.valor):
+    """Monta um ``SUM(CASE WHEN ... THEN valor ELSE 0 END)`` para a lista de condições."""
+
+    condicoes = [condicao for condicao in condicoes if condicao is not None]
+    return func.coalesce(func.sum(case((and_(*condicoes), valor), else_=0)), 0)
+
+
+def calcular_agendado_total():
+    """Total agendado de todo o histórico (o único KPI que não depende do período)."""
+
+    total = db.session.query(func.coalesce(func.sum(ResumoDiarioPedido.valor_total), 0)).filter(
+        ResumoDiarioPedido.status_grupo == 'agendado'
+    )
+    return float(total.scalar() or 0.0)
+
+
+def calcular_resumo(data_inicio=None, data_fim=None):
+    """Calcula o dicionário ``resumo`` do painel.
+
+    Todos os KPIs de pedidos saem dos resumos diários (``ResumoDiarioPedido``) em
+    uma única consulta, e o gasto de ``ResumoDiarioGasto``. Atrasados são os
+    pedidos no grupo 'atrasado', mantido por ``meu_app.atrasos.marcar_atrasados``.
+    Sem ``data_inicio``/``data_fim`` o período é o histórico completo.
+    """
+
+    dia_no_periodo = None
+    if data_inicio and data_fim:
+        dia_no_periodo = ResumoDiarioPedido.dia.between(data_inicio.date(), data_fim.date())
+
+    def _soma_do_grupo(grupo, valor=ResumoDiarioPedido.valor_total, no_periodo=True):
+        return _soma_condicional(
+            [ResumoDiarioPedido.status_grupo == grupo, dia_no_periodo if no_periodo else None], valor
+        )
+
+    linha_resumo = db.session.query(
+        _soma_do_grupo('agendado', no_periodo=False).label("agendado"),
+        _soma_do_grupo('pago').label("pago"),
+        _soma_do_grupo('pago', ResumoDiarioPedido.quantidade).label("quantidade_vendas"),
+        _soma_do_grupo('frustrado').label("frustrado"),
+        _soma_do_grupo('a_receber').label("a_receber"),
+        _soma_do_grupo('atrasado').label("atrasado"),
+    ).one()
+
+    gasto_query = db.session.query(func.coalesce(func.sum(ResumoDiarioGasto.valor_total), 0))
+    if data_inicio and data_fim:
+        gasto_query = gasto_query.filter(ResumoDiarioGasto.dia.between(data_inicio.date(), data_fim.date()))
+    total_gasto = float(gasto_query.scalar() or 0.0)
+
+    total_agendado = float(linha_resumo.agendado or 0.0)
+    total_pago = float(linha_resumo.pago or 0.0)
+    total_a_receber = float(linha_resumo.a_receber or 0.0)
+    lucro = total_pago - total_gasto
+
+    return {
+        'agendado_total': total_agendado,
+        'faturamento_liquido': total_pago,
+        'gasto': total_gasto,
+        'lucro': lucro,
+        'roi': (lucro / total_gasto) if total_gasto > 0 else 0,
+        'falta_receber': total_a_receber,
+        'frutado': float(linha_resumo.frustrado or 0.0),
+        'quantidade_vendas': int(linha_resumo.quantidade_vendas or 0),
+        'atrasados': float(linha_resumo.atrasado or 0.0),
+        'projecao': total_pago + total_a_receber + total_agendado,
+    }
@@ -0,0 +1,272 @@
+"""Métricas do app no formato texto do Prometheus, expostas em ``/metrics``.
+
+A agregação é feita em memória, por processo: histogramas de latência por rota,
+contadores de eventos do webhook por ``status_compra_descricao`` e de respostas
+por código, tempo de ``commit`` e, na hora da coleta, o backlog da fila e o uso
+do pool de conexões. Com vários workers (gunicorn), cada processo tem seus
+próprios números e o Prometheus deve coletar cada um deles.
+"""
+
+import bisect
+import threading
+import time
+from datetime import datetime
+
+from flask import Response, abort, g, request
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from meu_app import app, db
+from meu_app.braip import STATUS_FRUSTRADOS_BRAIP
+from meu_app.models import FilaWebhook
+
+# Limites (em segundos) dos buckets; o último bucket (+Inf) é implícito.
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rótulos fora desta lista viram 'outro', para que um payload qualquer não crie séries novas.
+STATUS_WEBHOOK_CONHECIDOS = {'Aprovada', 'Entregue', 'Pagamento Confirmado', *STATUS_FRUSTRADOS_BRAIP}
+
+ROTAS_IGNORADAS = {'metricas', 'static'}
+
+
+def _rotulos(nomes, valores):
+    if not nomes:
+        return ''
+    pares = []
+    for nome, valor in zip(nomes, valores):
+        texto = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nome}="{texto}"')
+    return '{' + ','.join(pares) + '}'
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monotônico com rótulos (``_total`` no nome, como manda o formato)."""
+
+    tipo = 'counter'
+
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._valores = {} if self.rotulos else {(): 0}
+
+    def incrementar(self, *valores, quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def amostras(self):
+        with self._lock:
+            valores = dict(self._valores)
+        for chave, valor in sorted(valores.items()):
+            yield self.nome + _rotulos(self.rotulos, chave), valor
+
+
+class Medidor:
+    """Valor instantâneo que pode subir e descer (ex.: commits em andamento)."""
+
+    tipo = 'gauge'
+
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._valores = {} if self.rotulos else {(): 0}
+
+    def somar(self, quantidade, *valores):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def definir(self, valor, *valores):
+        with self._lock:
+            self._valores[valores] = valor
+
+    def amostras(self):
+        with self._lock:
+            valores = dict(self._valores)
+        for chave, valor in sorted(valores.items()):
+            yield self.nome + _rotulos(self.rotulos, chave), valor
+
+
+class Histograma:
+    """Histograma de durações com buckets fixos; cada observação é um ``bisect`` sob lock."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, descricao, rotulos=(), buckets=BUCKETS_PADRAO):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observar(self, valor, *valores):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def amostras(self):
+        with self._lock:
+            series = {chave: (list(contagens), soma) for chave, (contagens, soma) in self._series.items()}
+        nomes_bucket = self.rotulos + ('le',)
+        for chave, (contagens, soma) in sorted(series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float('inf'),), contagens):
+                acumulado += contagem
+                yield self.nome + '_bucket' + _rotulos(nomes_bucket, chave + (_numero(limite),)), acumulado
+            yield self.nome + '_sum' + _rotulos(self.rotulos, chave), soma
+            yield self.nome + '_count' + _rotulos(self.rotulos, chave), acumulado
+
+
+requisicoes_segundos = Histograma(
+    'meu_app_requisicao_segundos', 'Duração das requisições HTTP por rota.', ('rota',)
+)
+respostas_total = Contador(
+    'meu_app_respostas_total', 'Respostas HTTP por rota e código de status.', ('rota', 'codigo')
+)
+webhook_eventos_total = Contador(
+    'meu_app_webhook_eventos_total', 'Eventos recebidos da Braip por status_compra_descricao.', ('status',)
+)
+webhook_duplicados_total = Contador(
+    'meu_app_webhook_duplicados_total', 'Eventos da Braip descartados por já terem sido aplicados (reenvios).'
+)
+webhook_erros_total = Contador(
+    'meu_app_webhook_erros_total', 'Eventos da fila descartados por payload ou dados inválidos.'
+)
+fila_lote_segundos = Histograma(
+    'meu_app_fila_lote_segundos', 'Duração do processamento de cada lote da fila do webhook.'
+)
+fila_espera_segundos = Histograma(
+    'meu_app_fila_espera_segundos',
+    'Tempo entre o recebimento de um evento e seu processamento pela fila.',
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+commit_segundos = Histograma('meu_app_db_commit_segundos', 'Duração dos commits da sessão do SQLAlchemy.')
+commits_em_andamento = Medidor(
+    'meu_app_db_commits_em_andamento', 'Commits iniciados e ainda não concluídos (espera pelo lock de escrita).'
+)
+bloqueios_total = Contador(
+    'meu_app_db_bloqueios_total', 'Operações que falharam com o banco bloqueado ("database is locked").'
+)
+fila_pendentes = Medidor('meu_app_fila_pendentes', 'Eventos do webhook aguardando processamento.')
+fila_idade_segundos = Medidor(
+    'meu_app_fila_mais_antigo_segundos', 'Idade do evento pendente mais antigo da fila (0 se vazia).'
+)
+conexoes = Medidor('meu_app_db_conexoes', 'Conexões do pool do SQLAlchemy por estado.', ('estado',))
+
+METRICAS = [
+    requisicoes_segundos,
+    respostas_total,
+    webhook_eventos_total,
+    webhook_duplicados_total,
+    webhook_erros_total,
+    fila_lote_segundos,
+    fila_espera_segundos,
+    commit_segundos,
+    commits_em_andamento,
+    bloqueios_total,
+    fila_pendentes,
+    fila_idade_segundos,
+    conexoes,
+]
+
+
+def registrar_evento_webhook(dados):
+    status = dados.get('status_compra_descricao')
+    webhook_eventos_total.incrementar(status if status in STATUS_WEBHOOK_CONHECIDOS else 'outro')
+
+
+def atualizar_fila():
+    """Lê o backlog da fila pelo índice ``(processado_em, id)``."""
+
+    pendentes = FilaWebhook.query.filter(FilaWebhook.processado_em.is_(None))
+    fila_pendentes.definir(pendentes.with_entities(func.count(FilaWebhook.id)).scalar())
+    mais_antigo = pendentes.with_entities(FilaWebhook.recebido_em).order_by(FilaWebhook.id).limit(1).scalar()
+    fila_idade_segundos.definir(
+        max(0.0, (datetime.utcnow() - mais_antigo).total_seconds()) if mais_antigo else 0.0
+    )
+
+
+def atualizar_pool():
+    pool = db.engine.pool
+    for estado in ('checkedout', 'checkedin', 'size'):
+        leitura = getattr(pool, estado, None)
+        if callable(leitura):
+            conexoes.definir(leitura(), estado)
+
+
+def exposicao():
+    linhas = []
+    for metrica in METRICAS:
+        linhas.append(f'# HELP {metrica.nome} {metrica.descricao}')
+        linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+        linhas.extend(f'{nome} {_numero(valor)}' for nome, valor in metrica.amostras())
+    return '\n'.join(linhas) + '\n'
+
+
+@event.listens_for(Session, 'before_commit')
+def _antes_do_commit(sessao):
+    # Também dispara ao liberar um SAVEPOINT (``begin_nested``), que não termina
+    # a transação e por isso nunca seria descontado em ``_fim_da_transacao``.
+    if sessao.in_nested_transaction():
+        return
+    sessao.info['_metricas_commit'] = time.perf_counter()
+    commits_em_andamento.somar(1)
+
+
+@event.listens_for(Session, 'after_commit')
+def _depois_do_commit(sessao):
+    inicio = sessao.info.get('_metricas_commit')
+    if inicio is not None:
+        commit_segundos.observar(time.perf_counter() - inicio)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _fim_da_transacao(sessao, transacao):
+    # Dispara também em commits que falharam (no rollback/close seguinte);
+    # as subtransações do flush têm ``parent`` e são ignoradas.
+    if transacao.parent is None and sessao.info.pop('_metricas_commit', None) is not None:
+        commits_em_andamento.somar(-1)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _erro_do_banco(contexto):
+    if 'locked' in str(contexto.original_exception).lower():
+        bloqueios_total.incrementar()
+
+
+@app.before_request
+def _iniciar_cronometro():
+    g._metricas_inicio = time.perf_counter()
+
+
+@app.after_request
+def _registrar_requisicao(resposta):
+    inicio = g.pop('_metricas_inicio', None)
+    rota = request.endpoint or 'nao_encontrada'
+    if inicio is not None and rota not in ROTAS_IGNORADAS:
+        requisicoes_segundos.observar(time.perf_counter() - inicio, rota)
+        respostas_total.incrementar(rota, resposta.status_code)
+    return resposta
+
+
+@app.route('/metrics')
+def metricas():
+    if not app.config['METRICAS_ATIVO']:
+        abort(404)
+    atualizar_fila()
+    atualizar_pool()
+    return Response(exposicao(), content_type='text/plain; version=0.0.4; charset=utf-8')
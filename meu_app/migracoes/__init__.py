@@ -0,0 +1,148 @@
+"""Migrações versionadas do esquema, aplicadas por ``flask db-upgrade``.
+
+Cada módulo ``mNNNN_descricao.py`` deste pacote é uma migração: ``NNNN`` é a
+versão e ``aplicar()`` altera o banco pela ``db.session``, sem ``commit``. A
+tabela ``schema_version`` registra as versões aplicadas e ``aplicar_migracoes``
+roda as pendentes em ordem, uma transação por migração.
+
+Cada transação começa tomando o lock de escrita do banco (``BEGIN IMMEDIATE``
+no SQLite, advisory lock no Postgres) e só então relê a versão: com vários
+workers rodando o upgrade ao mesmo tempo, um aplica a migração e os outros
+esperam e a encontram registrada.
+
+A migração inicial cria as tabelas com ``create_all`` a partir dos modelos
+atuais, então as seguintes devem tolerar que a coluna ou o índice já exista
+(``adicionar_coluna`` e ``criar_indice`` já fazem isso).
+"""
+
+import importlib
+import logging
+import pkgutil
+import re
+import time
+from types import SimpleNamespace
+
+import click
+from sqlalchemy import func, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateTable
+
+from meu_app import app, db
+from meu_app.models import VersaoEsquema
+from meu_app.resumos import garantir_resumos
+
+logger = logging.getLogger(__name__)
+
+# Chave do advisory lock do Postgres; qualquer inteiro fixo, igual em todos os processos.
+CHAVE_LOCK_POSTGRES = 240_001
+# Quanto um processo espera o lock do SQLite enquanto outro aplica uma migração
+# longa (ex.: a reconstrução do índice de busca) antes de desistir.
+ESPERA_LOCK_SEGUNDOS = 300
+
+
+def listar_migracoes():
+    """Migrações do pacote em ordem de versão (``versao``, ``nome``, ``modulo``)."""
+
+    migracoes = []
+    for modulo in pkgutil.iter_modules(__path__):
+        encontrado = re.fullmatch(r'm(\d{4})_(\w+)', modulo.name)
+        if encontrado:
+            migracoes.append(
+                SimpleNamespace(
+                    versao=int(encontrado.group(1)), nome=encontrado.group(2), modulo=f'{__name__}.{modulo.name}'
+                )
+            )
+    return sorted(migracoes, key=lambda migracao: migracao.versao)
+
+
+def versao_atual():
+    """Última versão aplicada; 0 em um banco vazio ou anterior às migrações."""
+
+    if not inspect(db.session.connection()).has_table(VersaoEsquema.__tablename__):
+        return 0
+    return db.session.query(func.coalesce(func.max(VersaoEsquema.versao), 0)).scalar()
+
+
+def adicionar_coluna(tabela, coluna, definicao):
+    """``ALTER TABLE ... ADD COLUMN`` se a coluna ainda não existir."""
+
+    conexao = db.session.connection()
+    if coluna not in {existente['name'] for existente in inspect(conexao).get_columns(tabela)}:
+        conexao.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}"))
+
+
+def criar_indice(nome, tabela, colunas):
+    db.session.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})"))
+
+
+def _bloquear_escrita():
+    """Abre a transação já com o lock de escrita, serializando os processos que migram."""
+
+    conexao = db.session.connection()
+    if conexao.dialect.name == 'sqlite':
+        conexao.exec_driver_sql('BEGIN IMMEDIATE')
+    elif conexao.dialect.name == 'postgresql':
+        conexao.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {'chave': CHAVE_LOCK_POSTGRES})
+    conexao.execute(CreateTable(VersaoEsquema.__table__, if_not_exists=True))
+
+
+def _aplicar(migracao):
+    """Aplica ``migracao`` se outro processo ainda não a aplicou; ``True`` se foi este."""
+
+    limite = time.monotonic() + ESPERA_LOCK_SEGUNDOS
+    while True:
+        try:
+            _bloquear_escrita()
+            break
+        except OperationalError as erro:
+            db.session.rollback()
+            if 'locked' not in str(erro).lower() or time.monotonic() > limite:
+                raise
+            logger.info("Aguardando outro processo terminar a migração %04d", migracao.versao)
+
+    try:
+        if versao_atual() >= migracao.versao:
+            db.session.rollback()
+            return False
+        inicio = time.perf_counter()
+        importlib.import_module(migracao.modulo).aplicar()
+        db.session.add(VersaoEsquema(versao=migracao.versao, nome=migracao.nome))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info("Migração %04d_%s aplicada em %.2fs", migracao.versao, migracao.nome, time.perf_counter() - inicio)
+    return True
+
+
+def aplicar_migracoes(ate=None):
+    """Aplica em ordem as migrações pendentes (até a versão ``ate``); retorna as aplicadas por este processo."""
+
+    pendentes = [migracao for migracao in listar_migracoes() if ate is None or migracao.versao <= ate]
+    # Caminho comum: banco em dia, sem tomar lock nenhum.
+    atual = versao_atual()
+    db.session.rollback()
+    return [migracao for migracao in pendentes if migracao.versao > atual and _aplicar(migracao)]
+
+
+def atualizar_banco(ate=None):
+    """Aplica as migrações e, com o esquema completo, reconstrói os resumos se for preciso.
+
+    A reconstrução acontece na primeira execução e quando ``FUSO_HORARIO`` mudou
+    (ver ``garantir_resumos``).
+    """
+
+    aplicadas = aplicar_migracoes(ate)
+    if ate is None:
+        garantir_resumos()
+    return aplicadas
+
+
+@app.cli.command('db-upgrade')
+@click.option('--ate', type=int, default=None, help='Para nesta versão (padrão: a mais recente).')
+def db_upgrade_command(ate):
+    """Aplica as migrações pendentes do esquema do banco."""
+
+    for migracao in atualizar_banco(ate):
+        click.echo(f"Aplicada {migracao.versao:04d}_{migracao.nome}")
+    click.echo(f"Esquema na versão {versao_atual()}.")
@@ -0,0 +1,26 @@
+"""Tabelas dos modelos e as colunas/índices acrescentados a bancos antigos.
+
+Antes das migrações isso rodava a cada importação do app; bancos criados por
+essas versões já têm quase tudo e só recebem o que faltar. ``braip_trans_code``
+usa o índice da restrição ``UNIQUE``; ``data_venda``, ``data_vencimento`` (junto
+de ``status_grupo``) e ``gasto.data`` são cobertos pelos índices compostos abaixo.
+"""
+
+from meu_app import db
+from meu_app.migracoes import adicionar_coluna, criar_indice
+
+
+def aplicar():
+    db.metadata.create_all(db.session.connection())
+
+    adicionar_coluna('pedido', 'metodo_pagamento', 'VARCHAR(50)')
+    adicionar_coluna('pedido', 'status_grupo', 'VARCHAR(20)')
+    adicionar_coluna('pedido', 'telefone_digitos', 'VARCHAR(20)')
+    adicionar_coluna('pedido', 'atualizado_em', 'DATETIME')
+
+    criar_indice('ix_pedido_status_grupo', 'pedido', 'status_grupo')
+    criar_indice('ix_pedido_data_venda_id', 'pedido', 'data_venda, id')
+    criar_indice('ix_pedido_status_grupo_vencimento', 'pedido', 'status_grupo, data_vencimento')
+    criar_indice('ix_pedido_atualizado_em', 'pedido', 'atualizado_em')
+    criar_indice('ix_gasto_data_id', 'gasto', 'data, id')
+    criar_indice('ix_gasto_categoria_data_id', 'gasto', 'categoria, data, id')
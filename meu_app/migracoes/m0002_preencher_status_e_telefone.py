@@ -0,0 +1,9 @@
+"""Classifica ``status_grupo`` e normaliza ``telefone_digitos`` dos pedidos gravados antes dessas colunas."""
+
+from meu_app.busca import preencher_telefone_digitos
+from meu_app.status import preencher_status_grupo
+
+
+def aplicar():
+    preencher_status_grupo()
+    preencher_telefone_digitos()
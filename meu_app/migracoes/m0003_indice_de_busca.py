@@ -0,0 +1,7 @@
+"""Índice FTS5 (trigram) da busca de pedidos por cliente/telefone; só no SQLite."""
+
+from meu_app.busca import criar_indice_de_busca
+
+
+def aplicar():
+    criar_indice_de_busca()
@@ -1,8 +1,23 @@
+import re
 from datetime import datetime
 
+from sqlalchemy.orm import validates
+
 from meu_app import db
 
 
+def _status_grupo_padrao(context):
+    from meu_app.status import classificar_status_grupo
+
+    return classificar_status_grupo(context.get_current_parameters().get('status') or 'Agendado')
+
+
+def _agora_local():
+    from meu_app.periodos import agora_local
+
+    return agora_local()
+
+
 class Pedido(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     braip_trans_code = db.Column(db.String(50), unique=True, nullable=False)
@@ -15,10 +30,114 @@ class Pedido(db.Model):
     data_pagamento = db.Column(db.DateTime, nullable=True)
     observacao = db.Column(db.String(300), nullable=True)
     metodo_pagamento = db.Column(db.String(50), nullable=True)
+    status_grupo = db.Column(db.String(20), nullable=True, default=_status_grupo_padrao, index=True)
+    telefone_digitos = db.Column(db.String(20), nullable=True)
+    # Marca d'água da atualização incremental do motor analítico (meu_app/analitico.py)
+    atualizado_em = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_pedido_data_venda_id', 'data_venda', 'id'),
+        db.Index('ix_pedido_status_grupo_vencimento', 'status_grupo', 'data_vencimento'),
+        db.Index('ix_pedido_atualizado_em', 'atualizado_em'),
+    )
+
+    @validates('telefone')
+    def _normalizar_telefone(self, key, telefone):
+        self.telefone_digitos = re.sub(r'\D', '', telefone or '')
+        return telefone
 
 
 class Gasto(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     valor = db.Column(db.Float, nullable=False)
-    data = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Gastos ficam no horário local (ver meu_app/periodos.py), não em UTC
+    data = db.Column(db.DateTime, nullable=False, default=_agora_local)
     categoria = db.Column(db.String(80), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_gasto_data_id', 'data', 'id'),
+        db.Index('ix_gasto_categoria_data_id', 'categoria', 'data', 'id'),
+    )
+
+
+class ResumoDiarioPedido(db.Model):
+    """Totais diários de pedidos por grupo de status e método de pagamento.
+
+    O dia de referência é ``data_pagamento`` para pedidos pagos e ``data_venda``
+    para os demais, os mesmos campos usados pelos KPIs do painel.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False)
+    status_grupo = db.Column(db.String(20), nullable=False)
+    metodo_pagamento = db.Column(db.String(50), nullable=False)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    valor_total = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.UniqueConstraint('dia', 'status_grupo', 'metodo_pagamento', name='uq_resumo_diario_pedido'),
+    )
+
+
+class ResumoDiarioGasto(db.Model):
+    """Totais diários de gastos por categoria."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False)
+    categoria = db.Column(db.String(80), nullable=False)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    valor_total = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.UniqueConstraint('dia', 'categoria', name='uq_resumo_diario_gasto'),
+    )
+
+
+class FilaWebhook(db.Model):
+    """Diário append-only dos eventos recebidos em ``/webhooks/braip`` no modo fila."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    recebido_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    reservado_por = db.Column(db.String(32), nullable=True)
+    reservado_em = db.Column(db.DateTime, nullable=True)
+    processado_em = db.Column(db.DateTime, nullable=True)
+    erro = db.Column(db.String(300), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_fila_webhook_pendentes', 'processado_em', 'id'),
+    )
+
+
+class EventoBraip(db.Model):
+    """Registro dos eventos da Braip já aplicados, para descartar reenvios.
+
+    ``chave`` é o hash de (codigo_transacao, status, data do evento); o índice
+    único garante que o mesmo evento seja aplicado uma única vez, mesmo com
+    vários processos recebendo o webhook.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    chave = db.Column(db.String(64), unique=True, nullable=False)
+    codigo_transacao = db.Column(db.String(50), nullable=True)
+    status = db.Column(db.String(50), nullable=True)
+    recebido_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ExecucaoTarefa(db.Model):
+    """Última execução de cada tarefa periódica (ex.: ``marcar-atrasados``)."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(50), unique=True, nullable=False)
+    executado_em = db.Column(db.DateTime, nullable=False)
+    registros_afetados = db.Column(db.Integer, nullable=False, default=0)
+
+
+class VersaoEsquema(db.Model):
+    """Migrações do esquema já aplicadas ao banco (ver ``meu_app/migracoes``)."""
+
+    __tablename__ = 'schema_version'
+
+    versao = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    nome = db.Column(db.String(100), nullable=False)
+    aplicada_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,109 @@
+import base64
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from meu_app.cache import CacheMemoria
+
+# As chaves incluem o termo de busca digitado, então o cache tem tamanho máximo (LRU).
+MAX_CONTAGENS_EM_CACHE = 1024
+
+
+class PaginaCursor:
+    """Página obtida por paginação por cursor (keyset) sobre ``(data, id)`` decrescente.
+
+    Expõe ``items``, ``has_next``/``has_prev`` e os cursores das páginas vizinhas;
+    ``total`` é a contagem aproximada (em cache) ou ``None`` quando desativada.
+    """
+
+    modo = 'cursor'
+
+    def __init__(self, items, per_page, has_next, has_prev, next_cursor, prev_cursor, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+
+def codificar_cursor(data, registro_id):
+    valor = f"{data.isoformat()}|{registro_id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Converte o cursor da URL em ``(data, id)``; cursores inválidos retornam ``None``."""
+
+    if not cursor:
+        return None
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        data_str, registro_id = base64.urlsafe_b64decode(cursor + preenchimento).decode().rsplit('|', 1)
+        return datetime.fromisoformat(data_str), int(registro_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def paginar_por_cursor(query, coluna_data, coluna_id, cursor=None, direcao='proxima', per_page=15, total=None):
+    """Pagina ``query`` em ordem decrescente de ``(coluna_data, coluna_id)`` sem ``OFFSET``.
+
+    Cada página é um ``WHERE (data, id) < (:data, :id) ORDER BY data DESC, id DESC
+    LIMIT n``, que percorre o índice composto a partir do cursor; por isso o custo
+    de uma página profunda é o mesmo da primeira.
+    """
+
+    posicao = decodificar_cursor(cursor)
+    chave = tuple_(coluna_data, coluna_id)
+    voltando = posicao is not None and direcao == 'anterior'
+
+    if posicao is None:
+        query = query.order_by(coluna_data.desc(), coluna_id.desc())
+    elif voltando:
+        query = query.filter(chave > tuple_(*posicao)).order_by(coluna_data.asc(), coluna_id.asc())
+    else:
+        query = query.filter(chave < tuple_(*posicao)).order_by(coluna_data.desc(), coluna_id.desc())
+
+    items = query.limit(per_page + 1).all()
+    tem_mais = len(items) > per_page
+    items = items[:per_page]
+
+    if voltando:
+        items.reverse()
+        has_prev, has_next = tem_mais, True
+    else:
+        has_prev, has_next = posicao is not None, tem_mais
+
+    def _cursor_de(item):
+        return codificar_cursor(getattr(item, coluna_data.key), getattr(item, coluna_id.key))
+
+    return PaginaCursor(
+        items,
+        per_page,
+        has_next=has_next and bool(items),
+        has_prev=has_prev and bool(items),
+        next_cursor=_cursor_de(items[-1]) if items else None,
+        prev_cursor=_cursor_de(items[0]) if items else None,
+        total=total,
+    )
+
+
+_contagens = CacheMemoria(MAX_CONTAGENS_EM_CACHE)
+
+
+def contar_com_cache(query, chave, ttl):
+    """Conta as linhas de ``query`` reaproveitando o resultado por ``ttl`` segundos.
+
+    O valor é aproximado: escritas feitas dentro da janela não aparecem até a
+    contagem expirar. ``ttl`` igual a zero desativa a contagem.
+    """
+
+    if not ttl:
+        return None
+
+    total = _contagens.get(chave)
+    if total is None:
+        total = query.order_by(None).count()
+        _contagens.set(chave, total, ttl=ttl)
+    return total
@@ -0,0 +1,236 @@
+"""Períodos do painel e agrupamento de dias em buckets (dia, semana, mês).
+
+As datas de pedidos são gravadas em UTC (``datetime.utcnow``); "hoje", os
+limites dos períodos e o dia de referência dos resumos diários são calculados
+no fuso ``FUSO_HORARIO``. Os gastos ficam no horário local: os importados trazem
+a data digitada pelo usuário e os lançados pelo painel recebem ``agora_local()``.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Date, cast, func
+
+from meu_app import app, db
+
+GRANULARIDADES = ('dia', 'semana', 'mes')
+
+# Acima destes tamanhos (em dias) os gráficos passam a agrupar por semana/mês.
+MAX_DIAS_POR_DIA = 31
+MAX_DIAS_POR_SEMANA = 180
+
+
+@lru_cache(maxsize=None)
+def _zona(nome):
+    return timezone.utc if nome.upper() == 'UTC' else ZoneInfo(nome)
+
+
+def fuso_horario():
+    return _zona(app.config['FUSO_HORARIO'])
+
+
+# Falha já na inicialização se FUSO_HORARIO não for um fuso conhecido.
+fuso_horario()
+
+
+def agora_local():
+    return datetime.now(fuso_horario()).replace(tzinfo=None)
+
+
+def hoje_local():
+    return agora_local().date()
+
+
+def dia_local(instante):
+    """Dia, no fuso do app, de um ``datetime`` ingênuo gravado em UTC."""
+
+    zona = fuso_horario()
+    if zona is timezone.utc:
+        return instante.date()
+    return instante.replace(tzinfo=timezone.utc).astimezone(zona).date()
+
+
+def inicio_do_dia_utc(dia):
+    """Meia-noite local de ``dia`` convertida para UTC ingênuo (para filtrar colunas gravadas em UTC)."""
+
+    inicio = datetime.combine(dia, time.min, tzinfo=fuso_horario())
+    return inicio.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def somar_meses(dia, meses):
+    """Primeiro dia do mês ``meses`` depois (ou antes) do mês de ``dia``."""
+
+    indice = dia.year * 12 + dia.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+class Periodo:
+    """Intervalo de dias locais, ``inicio`` a ``fim`` inclusive; ambos ``None`` no período total."""
+
+    def __init__(self, chave, titulo, inicio=None, fim=None):
+        self.chave = chave
+        self.titulo = titulo
+        self.inicio = inicio
+        self.fim = fim
+
+    @property
+    def data_inicio(self):
+        return datetime.combine(self.inicio, time.min) if self.inicio else None
+
+    @property
+    def data_fim(self):
+        return datetime.combine(self.fim, time.max) if self.fim else None
+
+    @property
+    def dias(self):
+        return (self.fim - self.inicio).days + 1 if self.inicio else None
+
+    def intervalo_utc(self):
+        """Limites em UTC ingênuo para filtrar colunas de pedidos (``data_venda`` etc.)."""
+
+        if not self.inicio:
+            return None, None
+        return inicio_do_dia_utc(self.inicio), inicio_do_dia_utc(self.fim + timedelta(days=1)) - timedelta(
+            microseconds=1
+        )
+
+    def _meses_inteiros(self):
+        return self.inicio.day == 1 and (self.fim + timedelta(days=1)).day == 1
+
+    def anterior(self):
+        """Período imediatamente anterior e comparável; ``None`` para o período total.
+
+        Meses inteiros comparam com os meses anteriores, o mês corrente com os
+        mesmos dias do mês passado e os demais com o mesmo número de dias antes.
+        """
+
+        if not self.inicio:
+            return None
+        if self._meses_inteiros():
+            meses = (self.fim.year - self.inicio.year) * 12 + self.fim.month - self.inicio.month + 1
+            inicio = somar_meses(self.inicio, -meses)
+            fim = self.inicio - timedelta(days=1)
+        elif self.chave == 'mes_atual':
+            inicio = somar_meses(self.inicio, -1)
+            fim = min(inicio + timedelta(days=self.fim.day - 1), self.inicio - timedelta(days=1))
+        else:
+            fim = self.inicio - timedelta(days=1)
+            inicio = fim - timedelta(days=self.dias - 1)
+        return Periodo('anterior', f"{inicio.strftime('%d/%m/%Y')} - {fim.strftime('%d/%m/%Y')}", inicio, fim)
+
+    def para_dict(self):
+        return {
+            "periodo": self.chave,
+            "titulo_periodo": self.titulo,
+            "data_inicio": self.data_inicio.isoformat() if self.data_inicio else None,
+            "data_fim": self.data_fim.isoformat() if self.data_fim else None,
+        }
+
+
+def _periodo_hoje(hoje):
+    return Periodo('hoje', "Hoje", hoje, hoje)
+
+
+def _periodo_ontem(hoje):
+    ontem = hoje - timedelta(days=1)
+    return Periodo('ontem', "Ontem", ontem, ontem)
+
+
+def _periodo_ultimos_7_dias(hoje):
+    return Periodo('ultimos_7_dias', "Últimos 7 dias", hoje - timedelta(days=6), hoje)
+
+
+def _periodo_mes_atual(hoje):
+    return Periodo('mes_atual', "Este Mês", hoje.replace(day=1), hoje)
+
+
+def _periodo_mes_passado(hoje):
+    primeiro_dia_mes_atual = hoje.replace(day=1)
+    return Periodo(
+        'mes_passado', "Mês Passado", somar_meses(hoje, -1), primeiro_dia_mes_atual - timedelta(days=1)
+    )
+
+
+def _periodo_maximo(hoje):
+    return Periodo('maximo', "Período Total")
+
+
+PERIODOS = {
+    'hoje': _periodo_hoje,
+    'ontem': _periodo_ontem,
+    'ultimos_7_dias': _periodo_ultimos_7_dias,
+    'mes_atual': _periodo_mes_atual,
+    'mes_passado': _periodo_mes_passado,
+    'maximo': _periodo_maximo,
+}
+
+
+def resolver_periodo(args, hoje=None):
+    """Interpreta ``periodo``/``data_inicio``/``data_fim`` da requisição e retorna o ``Periodo``.
+
+    Períodos desconhecidos ou datas personalizadas inválidas caem em 'hoje'.
+    """
+
+    hoje = hoje or hoje_local()
+    chave = args.get('periodo', 'hoje')
+    if chave == 'personalizado':
+        try:
+            inicio = date.fromisoformat(args.get('data_inicio') or '')
+            fim = date.fromisoformat(args.get('data_fim') or '')
+        except ValueError:
+            return _periodo_hoje(hoje)
+        if fim < inicio:
+            inicio, fim = fim, inicio
+        return Periodo('personalizado', f"{inicio.strftime('%d/%m')} - {fim.strftime('%d/%m')}", inicio, fim)
+    return PERIODOS.get(chave, _periodo_hoje)(hoje)
+
+
+def granularidade_padrao(dias):
+    """Granularidade dos gráficos para um intervalo de ``dias`` (``None``: histórico inteiro)."""
+
+    if dias is None or dias > MAX_DIAS_POR_SEMANA:
+        return 'mes'
+    if dias > MAX_DIAS_POR_DIA:
+        return 'semana'
+    return 'dia'
+
+
+def inicio_do_bucket(dia, granularidade):
+    if granularidade == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    if granularidade == 'mes':
+        return dia.replace(day=1)
+    return dia
+
+
+def buckets_entre(inicio, fim, granularidade):
+    """Início de cada bucket que cobre ``inicio``..``fim``, em ordem."""
+
+    bucket = inicio_do_bucket(inicio, granularidade)
+    buckets = []
+    while bucket <= fim:
+        buckets.append(bucket)
+        if granularidade == 'semana':
+            bucket += timedelta(days=7)
+        elif granularidade == 'mes':
+            bucket = somar_meses(bucket, 1)
+        else:
+            bucket += timedelta(days=1)
+    return buckets
+
+
+def rotulo_bucket(dia, granularidade):
+    return dia.strftime('%m/%Y') if granularidade == 'mes' else dia.strftime('%d/%m')
+
+
+def expressao_bucket(coluna, granularidade):
+    """Expressão SQL com o primeiro dia do bucket de uma coluna ``Date`` (semanas começam na segunda)."""
+
+    if granularidade == 'dia':
+        return coluna
+    if db.engine.dialect.name == 'sqlite':
+        if granularidade == 'semana':
+            return func.date(coluna, 'weekday 0', '-6 days', type_=Date)
+        return func.date(coluna, 'start of month', type_=Date)
+    return cast(func.date_trunc('week' if granularidade == 'semana' else 'month', coluna), Date)
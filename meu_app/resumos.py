@@ -0,0 +1,212 @@
+from datetime import datetime
+
+import click
+from sqlalchemy import case, func, insert, select, update
+
+from meu_app import app, db
+from meu_app.arquivo import pedidos_com_arquivo
+from meu_app.models import ExecucaoTarefa, Gasto, Pedido, ResumoDiarioGasto, ResumoDiarioPedido
+from meu_app.periodos import dia_local
+
+METODO_NAO_INFORMADO = 'Não informado'
+CATEGORIA_PADRAO = 'Sem categoria'
+# Marca, em ``ExecucaoTarefa``, o fuso com que os resumos foram montados ('resumos-fuso:<fuso>').
+TAREFA_RESUMOS = 'resumos-fuso'
+
+
+def contribuicao_pedido(pedido):
+    """Retorna a chave ``(dia, status_grupo, metodo)`` e o valor com que o pedido entra no resumo.
+
+    ``dia`` é o dia local (``FUSO_HORARIO``) da data de referência, gravada em UTC.
+
+    Pedidos sem grupo de status ou pagos sem ``data_pagamento`` não entram em
+    nenhum KPI e por isso retornam ``None``.
+    """
+
+    if not pedido.status_grupo:
+        return None
+
+    if pedido.status_grupo == 'pago':
+        referencia = pedido.data_pagamento
+    else:
+        referencia = pedido.data_venda
+    if referencia is None:
+        return None
+
+    chave = (dia_local(referencia), pedido.status_grupo, pedido.metodo_pagamento or METODO_NAO_INFORMADO)
+    return chave, float(pedido.valor or 0.0)
+
+
+def _acumular(model, chave, quantidade, valor):
+    """Soma ``quantidade``/``valor`` à linha do resumo, criando-a se necessário."""
+
+    condicoes = [getattr(model, coluna) == valor_chave for coluna, valor_chave in chave.items()]
+    resultado = db.session.execute(
+        update(model)
+        .where(*condicoes)
+        .values(quantidade=model.quantidade + quantidade, valor_total=model.valor_total + valor)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount == 0:
+        db.session.execute(insert(model).values(quantidade=quantidade, valor_total=valor, **chave))
+
+
+def somar_contribuicao(deltas, antes, depois):
+    """Acumula em ``deltas`` a diferença entre duas contribuições de um pedido.
+
+    Permite que um lote de alterações atualize cada linha do resumo uma única
+    vez, via ``aplicar_deltas_resumo``.
+    """
+
+    if antes == depois:
+        return
+
+    for contribuicao, sinal in ((antes, -1), (depois, 1)):
+        if contribuicao is None:
+            continue
+        chave, valor = contribuicao
+        acumulado = deltas.setdefault(chave, [0, 0.0])
+        acumulado[0] += sinal
+        acumulado[1] += sinal * valor
+
+
+def aplicar_deltas_resumo(deltas):
+    """Grava no resumo diário os deltas acumulados por ``somar_contribuicao``."""
+
+    for (dia, grupo, metodo), (quantidade, valor) in deltas.items():
+        if quantidade or valor:
+            _acumular(
+                ResumoDiarioPedido,
+                {'dia': dia, 'status_grupo': grupo, 'metodo_pagamento': metodo},
+                quantidade,
+                valor,
+            )
+
+
+def registrar_gasto_no_resumo(gasto):
+    """Soma um gasto recém-criado ao resumo diário de gastos."""
+
+    registrar_gastos_no_resumo([gasto])
+
+
+def registrar_gastos_no_resumo(gastos):
+    """Soma gastos recém-criados ao resumo, atualizando cada linha ``(dia, categoria)`` uma vez.
+
+    A data do gasto já está no horário local, então o dia é a própria data.
+    """
+
+    deltas = {}
+    for gasto in gastos:
+        acumulado = deltas.setdefault((gasto.data.date(), gasto.categoria or CATEGORIA_PADRAO), [0, 0.0])
+        acumulado[0] += 1
+        acumulado[1] += float(gasto.valor or 0.0)
+    for (dia, categoria), (quantidade, valor) in deltas.items():
+        _acumular(ResumoDiarioGasto, {'dia': dia, 'categoria': categoria}, quantidade, valor)
+
+
+# Colunas de ``pedido`` (e do arquivo) lidas na reconstrução dos resumos.
+COLUNAS_RESUMO = ('id', 'status_grupo', 'data_pagamento', 'data_venda', 'metodo_pagamento', 'valor')
+
+
+def _selecao_pedidos_utc(pedidos):
+    dia_pedido = case(
+        (pedidos.c.status_grupo == 'pago', func.date(pedidos.c.data_pagamento)),
+        else_=func.date(pedidos.c.data_venda),
+    )
+    metodo = func.coalesce(pedidos.c.metodo_pagamento, METODO_NAO_INFORMADO)
+    return (
+        select(
+            dia_pedido.label('dia'),
+            pedidos.c.status_grupo,
+            metodo.label('metodo_pagamento'),
+            func.count(pedidos.c.id),
+            func.sum(pedidos.c.valor),
+        )
+        .where(pedidos.c.status_grupo.isnot(None), dia_pedido.isnot(None))
+        .group_by(dia_pedido, pedidos.c.status_grupo, metodo)
+    )
+
+
+def _linhas_pedidos_no_fuso(pedidos):
+    """Agrega os pedidos em Python, convertendo cada data para o dia local."""
+
+    deltas = {}
+    consulta = select(pedidos).where(pedidos.c.status_grupo.isnot(None)).execution_options(yield_per=10000)
+    for linha in db.session.execute(consulta):
+        somar_contribuicao(deltas, None, contribuicao_pedido(linha))
+    return [
+        {'dia': dia, 'status_grupo': grupo, 'metodo_pagamento': metodo, 'quantidade': quantidade, 'valor_total': valor}
+        for (dia, grupo, metodo), (quantidade, valor) in deltas.items()
+    ]
+
+
+def fuso_dos_resumos():
+    """Fuso com que os resumos atuais foram montados (antes da marca, sempre UTC)."""
+
+    marca = (
+        db.session.query(ExecucaoTarefa.nome).filter(ExecucaoTarefa.nome.like(f'{TAREFA_RESUMOS}:%')).scalar()
+    )
+    return marca.split(':', 1)[1] if marca else 'UTC'
+
+
+def reconstruir_resumos():
+    """Recalcula as tabelas de resumo a partir de ``pedido`` (mais os pedidos arquivados) e ``gasto``.
+
+    Em UTC o agrupamento por dia é feito no banco; em outro fuso os pedidos são
+    somados em Python com ``contribuicao_pedido``, que converte cada data.
+    """
+
+    fuso = app.config['FUSO_HORARIO']
+    # Anexa o arquivo antes das escritas abaixo (ATTACH não roda no meio de uma transação de escrita).
+    pedidos = pedidos_com_arquivo(*COLUNAS_RESUMO)
+    categoria = func.coalesce(Gasto.categoria, CATEGORIA_PADRAO)
+    selecao_gastos = (
+        select(func.date(Gasto.data).label('dia'), categoria.label('categoria'), func.count(Gasto.id), func.sum(Gasto.valor))
+        .group_by(func.date(Gasto.data), categoria)
+    )
+
+    db.session.query(ResumoDiarioPedido).delete()
+    db.session.query(ResumoDiarioGasto).delete()
+    if fuso.upper() == 'UTC':
+        db.session.execute(
+            insert(ResumoDiarioPedido).from_select(
+                ['dia', 'status_grupo', 'metodo_pagamento', 'quantidade', 'valor_total'], _selecao_pedidos_utc(pedidos)
+            )
+        )
+    else:
+        linhas = _linhas_pedidos_no_fuso(pedidos)
+        if linhas:
+            db.session.execute(insert(ResumoDiarioPedido), linhas)
+    db.session.execute(
+        insert(ResumoDiarioGasto).from_select(['dia', 'categoria', 'quantidade', 'valor_total'], selecao_gastos)
+    )
+    db.session.query(ExecucaoTarefa).filter(ExecucaoTarefa.nome.like(f'{TAREFA_RESUMOS}:%')).delete(
+        synchronize_session=False
+    )
+    db.session.add(ExecucaoTarefa(nome=f'{TAREFA_RESUMOS}:{fuso}', executado_em=datetime.utcnow()))
+    db.session.commit()
+
+
+def garantir_resumos():
+    """Reconstrói os resumos na primeira execução ou quando ``FUSO_HORARIO`` mudou."""
+
+    resumos_vazios = (
+        db.session.query(ResumoDiarioPedido.id).first() is None
+        and db.session.query(ResumoDiarioGasto.id).first() is None
+    )
+    existem_dados = (
+        db.session.query(Pedido.id).first() is not None
+        or db.session.query(Gasto.id).first() is not None
+    )
+    if existem_dados and (resumos_vazios or fuso_dos_resumos() != app.config['FUSO_HORARIO']):
+        reconstruir_resumos()
+
+
+@app.cli.command('reconstruir-resumos')
+def reconstruir_resumos_command():
+    """Recalcula do zero as tabelas de resumo diário."""
+
+    reconstruir_resumos()
+    total_pedidos = db.session.query(func.count(ResumoDiarioPedido.id)).scalar()
+    total_gastos = db.session.query(func.count(ResumoDiarioGasto.id)).scalar()
+    click.echo(f"Resumos reconstruídos: {total_pedidos} linhas de pedidos, {total_gastos} linhas de gastos.")
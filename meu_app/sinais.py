@@ -0,0 +1,23 @@
+from blinker import Namespace
+
+from meu_app import app
+from meu_app.periodos import dia_local
+
+_sinais = Namespace()
+
+# Enviado depois do commit de qualquer escrita que altere pedidos ou gastos.
+# Argumentos: ``tipo`` (origem da escrita), ``datas`` (dias cujos KPIs podem ter
+# mudado) e ``pedidos_ids`` (pedidos criados ou alterados).
+dados_alterados = _sinais.signal('dados-alterados')
+
+
+def datas_afetadas(deltas, pedidos=()):
+    """Dias afetados por uma escrita: os dias do resumo tocados e a ``data_venda`` dos pedidos."""
+
+    datas = {dia for (dia, _, _) in deltas}
+    datas.update(dia_local(pedido.data_venda) for pedido in pedidos if pedido.data_venda is not None)
+    return datas
+
+
+def notificar_alteracao(tipo, datas=(), pedidos_ids=()):
+    dados_alterados.send(app, tipo=tipo, datas=set(datas), pedidos_ids=list(pedidos_ids))
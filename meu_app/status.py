@@ -0,0 +1,200 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import case, func, or_, update
+
+from meu_app import db
+from meu_app.models import Pedido
+from meu_app.resumos import aplicar_deltas_resumo, contribuicao_pedido, somar_contribuicao
+
+
+STATUS_EQUIVALENTS = {
+    "agendado": {"agendado", "aguardando pagamento"},
+    "pago": {"pago", "pago manual", "pagamento confirmado", "pagamento aprovado"},
+    "a_receber": {"a receber"},
+    "atrasado": {"atrasado"},
+    "frustrado": {"frustrado", "cancelado", "estornado", "recusado", "expirado"},
+}
+
+STATUS_PREFIX_EQUIVALENTS = {
+    "agendado": ["agendado", "aguardando pagamento"],
+    "pago": ["pagamento aprovado", "pagamento confirmado", "pago ", "pago-"],
+    "a_receber": ["a receber"],
+    "atrasado": ["atrasado"],
+    "frustrado": ["frustrado", "cancelado", "estornado", "recusado", "expirado"],
+}
+
+STATUS_LABEL_TO_GROUP = {
+    "Agendado": "agendado",
+    "Pago": "pago",
+    "Frustrado": "frustrado",
+    "A Receber": "a_receber",
+    "Atrasado": "atrasado",
+}
+
+
+def classificar_status_grupo(status):
+    """Classifica um status bruto em um dos grupos de ``STATUS_EQUIVALENTS``."""
+
+    if not status:
+        return None
+
+    status_normalizado = status.strip().lower()
+    for group_name, values in STATUS_EQUIVALENTS.items():
+        if status_normalizado in values:
+            return group_name
+
+    for group_name, prefixes in STATUS_PREFIX_EQUIVALENTS.items():
+        if any(status_normalizado.startswith(prefix) for prefix in prefixes):
+            return group_name
+
+    return None
+
+
+def aplicar_status(pedido, novo_status):
+    """Atualiza o status do pedido mantendo ``status_grupo`` sincronizado."""
+
+    pedido.status = novo_status
+    pedido.status_grupo = classificar_status_grupo(novo_status)
+
+
+def build_status_condition(group_name):
+    """Retorna uma expressão SQLAlchemy que filtra pelo grupo de status persistido."""
+
+    if group_name not in STATUS_EQUIVALENTS:
+        return None
+
+    return Pedido.status_grupo == group_name
+
+
+def filtrar_por_status(query, status_filtro):
+    """Aplica o filtro de status das tabelas de pedidos (rótulos da interface)."""
+
+    if not status_filtro:
+        return query
+
+    group_name = STATUS_LABEL_TO_GROUP.get(status_filtro)
+    if group_name:
+        return query.filter(build_status_condition(group_name))
+
+    return query.filter(Pedido.status == status_filtro)
+
+
+def _condicao_textual(group_name):
+    """Condição por texto (``lower(status) LIKE ...``) usada apenas no backfill."""
+
+    status_column = func.lower(Pedido.status)
+    conditions = [status_column == value for value in STATUS_EQUIVALENTS.get(group_name, set())]
+    conditions.extend(status_column.like(f"{prefix}%") for prefix in STATUS_PREFIX_EQUIVALENTS.get(group_name, []))
+    return or_(*conditions)
+
+
+def preencher_status_grupo():
+    """Preenche ``status_grupo`` dos pedidos antigos que ainda não foram classificados.
+
+    Usa as mesmas tabelas de equivalência de ``classificar_status_grupo`` em um único
+    ``UPDATE ... CASE``; é idempotente, só toca linhas com o grupo nulo e não faz
+    ``commit`` (roda na migração 2).
+    """
+
+    grupo = case(
+        *[(_condicao_textual(group_name), group_name) for group_name in STATUS_EQUIVALENTS],
+        else_=None,
+    )
+    resultado = db.session.execute(
+        update(Pedido)
+        .where(Pedido.status_grupo.is_(None))
+        .values(status_grupo=grupo)
+        .execution_options(synchronize_session=False)
+    )
+    return resultado.rowcount
+
+
+def nova_data_pagamento(pedido, novo_status, agora):
+    """``data_pagamento`` do pedido depois de passar a ``novo_status``.
+
+    Marcar como 'Pago' um pedido que já estava pago não muda o dia em que ele
+    entrou no faturamento.
+    """
+
+    if novo_status != 'Pago':
+        return None
+    if pedido.status_grupo == 'pago' and pedido.data_pagamento is not None:
+        return pedido.data_pagamento
+    return agora
+
+
+def atualizar_status_em_lote(query, novo_status, agora=None):
+    """Aplica ``novo_status`` a todos os pedidos de ``query`` com um único ``UPDATE``.
+
+    O estado anterior dos pedidos é lido em uma consulta só de colunas, usada
+    para acumular os deltas do resumo diário, gravados na mesma transação.
+    ``data_pagamento`` passa a ser ``agora`` para 'Pago' (pedidos que já estavam
+    pagos mantêm a data original) e é limpa nos demais status, como em
+    ``atualizar_status``. Retorna os estados anteriores e os deltas; o
+    ``commit`` fica a cargo de quem chama.
+    """
+
+    agora = agora or datetime.utcnow()
+    novo_grupo = classificar_status_grupo(novo_status)
+
+    colunas = (
+        Pedido.id,
+        Pedido.status,
+        Pedido.status_grupo,
+        Pedido.valor,
+        Pedido.data_venda,
+        Pedido.data_pagamento,
+        Pedido.metodo_pagamento,
+    )
+    estados = [SimpleNamespace(**linha._asdict()) for linha in query.with_entities(*colunas).order_by(None)]
+
+    deltas = {}
+    for estado in estados:
+        depois = SimpleNamespace(
+            **dict(vars(estado), status_grupo=novo_grupo, data_pagamento=nova_data_pagamento(estado, novo_status, agora))
+        )
+        somar_contribuicao(deltas, contribuicao_pedido(estado), contribuicao_pedido(depois))
+
+    if novo_status == 'Pago':
+        # Mesma regra de ``nova_data_pagamento``, avaliada sobre os valores anteriores da linha.
+        data_pagamento = func.coalesce(case((Pedido.status_grupo == 'pago', Pedido.data_pagamento)), agora)
+    else:
+        data_pagamento = None
+    if estados:
+        db.session.execute(
+            update(Pedido)
+            .where(Pedido.id.in_([estado.id for estado in estados]))
+            .values(status=novo_status, status_grupo=novo_grupo, data_pagamento=data_pagamento)
+            .execution_options(synchronize_session=False)
+        )
+        aplicar_deltas_resumo(deltas)
+    return estados, deltas
+
+
+def normalizar_status_para_dashboard(status_bruto):
+    """Normaliza diferentes descrições de status para categorias principais do painel."""
+
+    if not status_bruto:
+        return None
+
+    status = status_bruto.strip().lower()
+
+    if (
+        status.startswith("pagamento aprovado")
+        or status.startswith("pagamento confirm")
+        or status == "pago"
+        or status.startswith("pago ")
+        or status.startswith("pago-")
+    ):
+        return "Pago"
+
+    if status.startswith("frust") or status.startswith("cancel") or status.startswith("recus") or status.startswith(
+        "estorn"
+    ) or status.startswith("expir"):
+        return "Frustrado"
+
+    if status.startswith("atras"):
+        return "Atrasado"
+
+    return None
@@ -1,4 +1,6 @@
-from meu_app import app
+from meu_app import criar_app
+
+app = criar_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    criar_app(migrar=True).run(debug=True)
@@ -0,0 +1,181 @@
+"""Fixtures da suíte: um banco SQLite temporário por sessão, esvaziado a cada teste.
+
+O app lê a configuração ao ser importado, então o ambiente é preparado antes do
+``import meu_app``. O esquema é criado uma vez com as migrações (``atualizar_banco``).
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+
+import pytest
+
+DIRETORIO = tempfile.mkdtemp(prefix='testes-financas-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(DIRETORIO, 'testes.db')
+os.environ['ARQUIVO_PEDIDOS'] = os.path.join(DIRETORIO, 'arquivo.db')
+os.environ['CACHE_BACKEND'] = 'memoria'
+os.environ['CACHE_DIRETORIO'] = os.path.join(DIRETORIO, 'cache')
+os.environ['ATRASOS_AGENDADOR'] = '0'
+os.environ['WEBHOOK_FILA_TRABALHADOR'] = '0'
+os.environ.pop('PERFIL_ARMAZENAMENTO', None)
+os.environ.pop('FUSO_HORARIO', None)
+
+from sqlalchemy import select  # noqa: E402
+
+from meu_app import app as _app, db  # noqa: E402
+from meu_app import cache, eventos, paginacao  # noqa: E402
+from meu_app.migracoes import atualizar_banco  # noqa: E402
+from meu_app.periodos import agora_local  # noqa: E402
+from meu_app.models import Gasto, Pedido, ResumoDiarioGasto, ResumoDiarioPedido, VersaoEsquema  # noqa: E402
+from meu_app.resumos import (  # noqa: E402
+    aplicar_deltas_resumo,
+    contribuicao_pedido,
+    reconstruir_resumos,
+    registrar_gasto_no_resumo,
+    somar_contribuicao,
+)
+from meu_app.status import classificar_status_grupo  # noqa: E402
+
+
+def _esvaziar(memoria):
+    if memoria is not None:
+        getattr(memoria, '_itens', memoria).clear()
+
+
+def _limpar_banco():
+    db.session.rollback()
+    with db.engine.begin() as conexao:
+        for tabela in reversed(db.metadata.sorted_tables):
+            # As versões do esquema não são dados: ficam para os testes de migração.
+            if tabela.name != VersaoEsquema.__tablename__:
+                conexao.execute(tabela.delete())
+    if os.path.exists(_app.config['ARQUIVO_PEDIDOS']):
+        with sqlite3.connect(_app.config['ARQUIVO_PEDIDOS']) as arquivo:
+            arquivo.execute('DELETE FROM pedido')
+    _esvaziar(cache.cache_dashboard.backend)
+    _esvaziar(eventos.eventos_recentes)
+    _esvaziar(paginacao._contagens)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _esquema():
+    with _app.app_context():
+        atualizar_banco()
+    yield
+    shutil.rmtree(DIRETORIO, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def app(_esquema):
+    with _app.app_context():
+        yield _app
+        _limpar_banco()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def criar_pedido():
+    """Grava um pedido e sua contribuição no resumo, como as rotas de escrita fazem."""
+
+    contador = iter(range(1, 1_000_000))
+
+    def criar(status='Agendado', valor=100.0, **campos):
+        campos.setdefault('braip_trans_code', f'TESTE-{next(contador)}')
+        campos.setdefault('cliente', 'Cliente de Teste')
+        campos.setdefault('telefone', '(11) 91234-5678')
+        campos.setdefault('data_venda', datetime.utcnow())
+        if status == 'Pago':
+            campos.setdefault('data_pagamento', datetime.utcnow())
+        pedido = Pedido(status=status, status_grupo=classificar_status_grupo(status), valor=valor, **campos)
+        db.session.add(pedido)
+        db.session.flush()
+        deltas = {}
+        somar_contribuicao(deltas, None, contribuicao_pedido(pedido))
+        aplicar_deltas_resumo(deltas)
+        db.session.commit()
+        return pedido
+
+    return criar
+
+
+@pytest.fixture
+def criar_gasto():
+    def criar(valor=10.0, categoria='Anúncios', data=None):
+        gasto = Gasto(valor=valor, categoria=categoria, data=data or agora_local())
+        db.session.add(gasto)
+        db.session.flush()
+        registrar_gasto_no_resumo(gasto)
+        db.session.commit()
+        return gasto
+
+    return criar
+
+
+@pytest.fixture
+def evento_braip():
+    """Payload do webhook da Braip para ``codigo`` e ``status_compra_descricao``."""
+
+    def evento(codigo, status, **extra):
+        dados = {
+            'codigo_transacao': codigo,
+            'status_compra_descricao': status,
+            'nome_cliente': 'Maria Oliveira',
+            'cel_cliente': '(11) 98765-4321',
+            'valor_total': '150.00',
+            'data_evento': '2024-01-01T10:00:00+00:00',
+        }
+        dados.update(extra)
+        return dados
+
+    return evento
+
+
+def linhas_dos_resumos():
+    """Resumos diários como ``{chave: (quantidade, valor)}``, sem as linhas zeradas."""
+
+    pedidos = {
+        (dia, grupo, metodo): (quantidade, round(valor, 2))
+        for dia, grupo, metodo, quantidade, valor in db.session.execute(
+            select(
+                ResumoDiarioPedido.dia,
+                ResumoDiarioPedido.status_grupo,
+                ResumoDiarioPedido.metodo_pagamento,
+                ResumoDiarioPedido.quantidade,
+                ResumoDiarioPedido.valor_total,
+            )
+        )
+        if quantidade or round(valor, 2)
+    }
+    gastos = {
+        (dia, categoria): (quantidade, round(valor, 2))
+        for dia, categoria, quantidade, valor in db.session.execute(
+            select(
+                ResumoDiarioGasto.dia,
+                ResumoDiarioGasto.categoria,
+                ResumoDiarioGasto.quantidade,
+                ResumoDiarioGasto.valor_total,
+            )
+        )
+        if quantidade or round(valor, 2)
+    }
+    return pedidos, gastos
+
+
+@pytest.fixture
+def conferir_resumos():
+    """Confere que os resumos mantidos pelas escritas são iguais a uma reconstrução do zero."""
+
+    def conferir():
+        db.session.rollback()
+        incrementais = linhas_dos_resumos()
+        reconstruir_resumos()
+        assert linhas_dos_resumos() == incrementais
+        return incrementais
+
+    return conferir
@@ -0,0 +1,88 @@
+import logging
+from datetime import datetime
+
+import pytest
+
+from meu_app import analitico
+from meu_app.graficos import GRAFICOS
+from meu_app.kpis import calcular_resumo
+from meu_app.models import Pedido
+
+INICIO = datetime(2024, 5, 1)
+FIM = datetime(2024, 5, 31, 23, 59, 59)
+
+
+@pytest.fixture
+def motor():
+    pytest.importorskip('numpy')
+    return analitico.MotorAnalitico(intervalo=60)
+
+
+def _popular(criar_pedido, criar_gasto):
+    criar_pedido('Pago', 200.0, data_venda=datetime(2024, 5, 2), data_pagamento=datetime(2024, 5, 3), metodo_pagamento='Pix')
+    criar_pedido('Pago', 80.0, data_venda=datetime(2024, 4, 2), data_pagamento=datetime(2024, 4, 3), metodo_pagamento='Cartão')
+    criar_pedido('A Receber', 50.0, data_venda=datetime(2024, 5, 10))
+    criar_pedido('Frustrado', 30.0, data_venda=datetime(2024, 5, 11))
+    criar_pedido('Agendado', 100.0, data_venda=datetime(2024, 3, 1))
+    criar_gasto(40.0, 'Anúncios', datetime(2024, 5, 5, 9))
+    criar_gasto(12.5, None, datetime(2024, 4, 20, 9))
+
+
+def _conferir_com_os_resumos(motor):
+    for data_inicio, data_fim in ((None, None), (INICIO, FIM)):
+        assert motor.resumo(data_inicio, data_fim) == calcular_resumo(data_inicio, data_fim)
+        for nome, grafico in GRAFICOS.items():
+            assert motor.grafico(nome, data_inicio, data_fim) == tuple(grafico(data_inicio, data_fim))
+
+
+def test_motor_sql_e_o_padrao():
+    assert analitico._criar_motor({'ANALITICO_MOTOR': 'sql', 'ANALITICO_INTERVALO': 1.0}) is None
+
+
+def test_sem_numpy_cai_nos_resumos_diarios(monkeypatch, caplog):
+    monkeypatch.setattr(analitico, 'numpy_disponivel', lambda: False)
+
+    with caplog.at_level(logging.WARNING, logger='meu_app.analitico'):
+        motor = analitico._criar_motor({'ANALITICO_MOTOR': 'numpy', 'ANALITICO_INTERVALO': 1.0})
+
+    assert motor is None
+    assert 'numpy não está instalado' in caplog.text
+
+
+def test_snapshot_bate_com_os_resumos(motor, criar_pedido, criar_gasto, conferir_resumos):
+    _popular(criar_pedido, criar_gasto)
+
+    _conferir_com_os_resumos(motor)
+    conferir_resumos()
+
+
+def test_snapshot_bate_com_os_resumos_em_outro_fuso(app, motor, monkeypatch, criar_pedido, criar_gasto, conferir_resumos):
+    monkeypatch.setitem(app.config, 'FUSO_HORARIO', 'America/Sao_Paulo')
+    # 01h UTC do dia 3 ainda é dia 2 em São Paulo.
+    criar_pedido('Pago', 60.0, data_venda=datetime(2024, 5, 2), data_pagamento=datetime(2024, 5, 3, 1))
+    _popular(criar_pedido, criar_gasto)
+
+    _conferir_com_os_resumos(motor)
+    conferir_resumos()
+
+
+def test_atualizacao_incremental(motor, cliente, criar_pedido, criar_gasto, conferir_resumos):
+    _popular(criar_pedido, criar_gasto)
+    motor.atualizar()
+    pedido = Pedido.query.filter_by(status='A Receber').one()
+
+    cliente.post(f'/atualizar_status/{pedido.id}', json={'status': 'Pago'})
+    criar_gasto(7.0, 'Frete', datetime(2024, 5, 20, 9))
+
+    # Sem o sinal de escrita e dentro do intervalo, o snapshot ainda é o antigo.
+    assert motor.resumo()['faturamento_liquido'] == 280.0
+
+    motor.sujo = True
+    _conferir_com_os_resumos(motor)
+    assert motor.resumo()['faturamento_liquido'] == 330.0
+    conferir_resumos()
+
+
+def test_grafico_desconhecido(motor):
+    with pytest.raises(KeyError):
+        motor.grafico('inexistente')
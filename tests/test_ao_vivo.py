@@ -0,0 +1,109 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from meu_app import ao_vivo
+from meu_app.ao_vivo import Publicador, chave_assinatura, formatar_mensagem
+
+HOJE = ('hoje', '', '')
+
+
+@pytest.fixture
+def publicador(monkeypatch):
+    publicador = Publicador(intervalo=0, max_clientes=2)
+    monkeypatch.setattr(ao_vivo, 'publicador', publicador)
+    return publicador
+
+
+def _ler(mensagem):
+    evento, dados = mensagem.strip().split('\n')
+    return evento.removeprefix('event: '), json.loads(dados.removeprefix('data: '))
+
+
+def _mensagens(assinatura):
+    mensagens = []
+    while not assinatura.fila.empty():
+        mensagens.append(_ler(assinatura.fila.get_nowait()))
+    return mensagens
+
+
+def _pendente(*pedidos_ids, tipo='pedido'):
+    return SimpleNamespace(pedidos_ids=set(pedidos_ids), tipos={tipo})
+
+
+def test_formatar_mensagem_e_chave():
+    assert formatar_mensagem('resumo', {'gasto': 1}) == 'event: resumo\ndata: {"gasto": 1}\n\n'
+    assert chave_assinatura({}) == HOJE
+    assert chave_assinatura({'resumo': '0'}) is None
+    assert chave_assinatura({'periodo': 'personalizado', 'data_inicio': '2024-01-01'}) == (
+        'personalizado', '2024-01-01', ''
+    )
+
+
+def test_sem_clientes_nao_inicia_o_publicador(publicador, criar_gasto):
+    criar_gasto(10.0)
+
+    assert publicador._thread is None
+    assert publicador.publicacoes == 0
+
+
+def test_publica_so_o_que_mudou(publicador, cliente, criar_pedido):
+    painel = publicador.assinar(HOJE)
+    pedidos = publicador.assinar(None)
+    pedido = criar_pedido('Pago', 100.0)
+
+    publicador.publicar(_pendente(pedido.id))
+    assert [evento for evento, _ in _mensagens(painel)] == ['resumo', 'graficos', 'pedidos']
+    ((evento, dados),) = _mensagens(pedidos)
+    assert evento == 'pedidos'
+    assert [linha['id'] for linha in dados['pedidos']] == [pedido.id]
+
+    # A escrita pelo painel acorda a thread do publicador.
+    cliente.post('/adicionar_gasto', data={'valor_gasto': '40', 'categoria': 'Anúncios'})
+
+    evento, resumo = _ler(painel.fila.get(timeout=5))
+    _, graficos = _ler(painel.fila.get(timeout=5))
+    assert evento == 'resumo'
+    assert resumo == {'gasto': 40.0, 'lucro': 60.0, 'roi': 1.5}
+    assert set(graficos) == {'gastos', 'categorias'}
+    assert _mensagens(pedidos) == []
+
+
+def test_cliente_parado_e_desconectado(publicador, monkeypatch, criar_pedido):
+    monkeypatch.setattr(ao_vivo, 'MENSAGENS_POR_CLIENTE', 1)
+    assinatura = publicador.assinar(None)
+    pedido = criar_pedido('Pago', 100.0)
+
+    publicador.publicar(_pendente(pedido.id))
+    publicador.publicar(_pendente(pedido.id))
+
+    assert not assinatura.ativa
+    assert publicador.clientes() == 0
+
+
+def test_rota_envia_o_estado_inicial_e_libera_a_vaga(cliente, publicador):
+    resposta = cliente.get('/api/ao-vivo?periodo=ontem')
+
+    assert resposta.mimetype == 'text/event-stream'
+    partes = iter(resposta.response)
+    assert next(partes).startswith(b'retry:')
+    assert next(partes).startswith(b'event: resumo')
+    assert next(partes).startswith(b'event: graficos')
+    assert publicador.clientes() == 1
+
+    resposta.close()
+    assert publicador.clientes() == 0
+
+
+def test_rota_recusa_alem_do_limite(cliente, publicador):
+    publicador.assinar(None)
+    publicador.assinar(None)
+
+    assert cliente.get('/api/ao-vivo').status_code == 503
+
+
+def test_rota_desligada(app, cliente, monkeypatch):
+    monkeypatch.setitem(app.config, 'AO_VIVO_ATIVO', False)
+
+    assert cliente.get('/api/ao-vivo').status_code == 404
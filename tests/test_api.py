@@ -0,0 +1,62 @@
+import pytest
+
+from meu_app.graficos import GRAFICOS
+
+
+@pytest.fixture
+def vendas(criar_pedido, criar_gasto):
+    criar_pedido('Pago', 120.0, metodo_pagamento='Pix')
+    criar_pedido('Pago', 30.0, metodo_pagamento='Cartão')
+    criar_pedido('Agendado', 45.0)
+    criar_gasto(20.0, 'Anúncios')
+
+
+def test_api_resumo_traz_o_periodo(cliente, vendas):
+    dados = cliente.get('/api/resumo').get_json()
+
+    assert dados['periodo'] == 'hoje'
+    assert dados['resumo']['faturamento_liquido'] == 150.0
+    assert dados['resumo']['projecao'] == 195.0
+
+
+@pytest.mark.parametrize('nome', sorted(GRAFICOS))
+def test_api_graficos(cliente, vendas, nome):
+    dados = cliente.get(f'/api/graficos/{nome}?periodo=maximo').get_json()
+
+    assert len(dados['labels']) == len(dados['data'])
+    assert dados['periodo'] == 'maximo'
+
+
+def test_api_grafico_de_pagamentos(cliente, vendas):
+    dados = cliente.get('/api/graficos/pagamentos').get_json()
+
+    assert dict(zip(dados['labels'], dados['data'])) == {'Cartão': 30.0, 'Pix': 120.0}
+
+
+def test_api_grafico_desconhecido(cliente):
+    resposta = cliente.get('/api/graficos/pizza')
+
+    assert resposta.status_code == 404
+    assert resposta.get_json()['status'] == 'erro'
+
+
+def test_api_pedidos_por_offset_e_cursor(cliente, criar_pedido):
+    for _ in range(5):
+        criar_pedido()
+
+    offset = cliente.get('/api/pedidos?per_page=2&page=2').get_json()
+    assert offset['paginacao']['modo'] == 'offset'
+    assert offset['paginacao']['total'] == 5
+    assert len(offset['pedidos']) == 2
+
+    cursor = cliente.get('/api/pedidos?per_page=2&paginacao=cursor').get_json()
+    assert cursor['paginacao']['modo'] == 'cursor'
+    seguinte = cliente.get(f"/api/pedidos?per_page=2&cursor={cursor['paginacao']['next_cursor']}").get_json()
+    assert {pedido['id'] for pedido in seguinte['pedidos']}.isdisjoint(pedido['id'] for pedido in cursor['pedidos'])
+
+
+def test_api_pedidos_limita_per_page(cliente, criar_pedido):
+    criar_pedido()
+
+    assert cliente.get('/api/pedidos?per_page=5000').get_json()['paginacao']['per_page'] == 100
+    assert cliente.get('/api/pedidos?per_page=0').get_json()['paginacao']['per_page'] == 1
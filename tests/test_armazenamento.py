@@ -0,0 +1,66 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine
+
+from meu_app import armazenamento
+from meu_app.armazenamento import configurar_armazenamento, opcoes_do_engine, uri_do_banco
+
+
+@pytest.fixture
+def perfil(monkeypatch):
+    """Configura um app descartável com ``PERFIL_ARMAZENAMENTO``, restaurando os PRAGMAs depois."""
+
+    anteriores = dict(armazenamento._pragmas_ativos)
+
+    def configurar(nome, database_url=None):
+        monkeypatch.setenv('PERFIL_ARMAZENAMENTO', nome)
+        if database_url:
+            monkeypatch.setenv('DATABASE_URL', database_url)
+        else:
+            monkeypatch.delenv('DATABASE_URL', raising=False)
+        app = Flask('teste')
+        configurar_armazenamento(app, '/tmp/teste.db')
+        return app
+
+    yield configurar
+    armazenamento._pragmas_ativos.clear()
+    armazenamento._pragmas_ativos.update(anteriores)
+
+
+def test_uri_do_banco(monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    assert uri_do_banco('/dados/pedidos.db') == 'sqlite:////dados/pedidos.db'
+
+    monkeypatch.setenv('DATABASE_URL', 'postgres://u:s@host/banco')
+    assert uri_do_banco('/dados/pedidos.db') == 'postgresql://u:s@host/banco'
+
+
+def test_perfil_padrao_nao_muda_nada(perfil):
+    app = perfil('padrao')
+
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == {}
+    assert armazenamento._pragmas_ativos == {}
+
+
+def test_perfil_producao_liga_os_pragmas_do_sqlite(perfil, tmp_path):
+    app = perfil('producao')
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args']['check_same_thread'] is False
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'producao.db'}")
+    with engine.connect() as conexao:
+        assert conexao.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert conexao.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+        assert conexao.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+    engine.dispose()
+
+
+def test_perfil_producao_no_postgres_so_ajusta_o_pool():
+    opcoes = opcoes_do_engine('postgresql://u:s@host/banco', 'producao')
+
+    assert opcoes['pool_pre_ping'] is True
+    assert 'connect_args' not in opcoes
+
+
+def test_perfil_desconhecido_falha(perfil):
+    with pytest.raises(ValueError, match='PERFIL_ARMAZENAMENTO'):
+        perfil('turbo')
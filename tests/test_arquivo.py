@@ -0,0 +1,136 @@
+from datetime import datetime
+
+import click
+import pytest
+from sqlalchemy import select
+
+from meu_app import arquivo, db
+from meu_app.arquivo import (
+    arquivar_pedidos,
+    arquivo_anexado,
+    codigos_arquivados,
+    pedido_arquivado,
+    restaurar_pedidos,
+)
+from meu_app.eventos import chave_evento, evento_repetido
+from meu_app.fila import enfileirar_evento, processar_lote
+from meu_app.importacao import ImportadorBraip
+from meu_app.models import Pedido
+
+ANTIGO = datetime(2020, 1, 10, 12)
+
+
+@pytest.fixture
+def arquivados(criar_pedido):
+    """Arquiva os pedidos pagos 'A1' e 'A2'; um pedido recente fica na tabela."""
+
+    for codigo in ('A1', 'A2'):
+        criar_pedido(
+            'Pago', 100.0, braip_trans_code=codigo, cliente=f'Cliente {codigo}', data_venda=ANTIGO, data_pagamento=ANTIGO
+        )
+    criar_pedido('Agendado', 50.0, braip_trans_code='RECENTE')
+    total, _ = arquivar_pedidos(meses=1)
+    assert total == 2
+
+
+def _no_arquivo():
+    db.session.rollback()
+    arquivo_anexado()
+    return set(db.session.execute(select(pedido_arquivado.c.braip_trans_code)).scalars())
+
+
+def test_arquivar_e_restaurar_mantem_os_resumos(arquivados, conferir_resumos):
+    assert [pedido.braip_trans_code for pedido in Pedido.query] == ['RECENTE']
+    conferir_resumos()
+
+    assert restaurar_pedidos(codigos=['A1']) == 1
+    assert _no_arquivo() == {'A2'}
+    conferir_resumos()
+
+
+def test_codigos_arquivados_acompanham_o_arquivo(arquivados):
+    assert codigos_arquivados.codigos() == {'A1', 'A2'}
+
+    restaurar_pedidos(codigos=['A1'])
+
+    assert codigos_arquivados.codigos() == {'A2'}
+
+
+def test_evento_de_pedido_novo_nao_le_o_arquivo(cliente, arquivados, evento_braip, monkeypatch):
+    codigos_arquivados.codigos()
+
+    def sem_arquivo(conexao):
+        raise AssertionError("o arquivo não deveria ser lido")
+
+    monkeypatch.setattr(arquivo, '_anexar', sem_arquivo)
+
+    resposta = cliente.post('/webhooks/braip', json=evento_braip('NOVO', 'Aprovada'))
+    assert resposta.get_json()['status'] == 'sucesso'
+
+
+def test_busca_avisa_dos_pedidos_arquivados(cliente, arquivados):
+    pagina = cliente.get('/pedidos?busca=Cliente A').get_data(as_text=True)
+    sem_busca = cliente.get('/pedidos').get_data(as_text=True)
+
+    assert '2 pedido(s) arquivado(s) também correspondem à busca' in pagina
+    assert 'aviso-arquivados' not in sem_busca
+
+
+def test_webhook_restaura_o_pedido_arquivado(cliente, arquivados, evento_braip, conferir_resumos):
+    estorno = evento_braip('A1', 'Estornado')
+
+    resposta = cliente.post('/webhooks/braip', json=estorno)
+
+    assert resposta.get_json()['status'] == 'sucesso'
+    assert Pedido.query.filter_by(braip_trans_code='A1').one().status == 'Frustrado'
+    assert evento_repetido(chave_evento(estorno))
+    assert _no_arquivo() == {'A2'}
+    conferir_resumos()
+
+
+def test_aprovada_reenviada_nao_duplica_o_arquivado(cliente, arquivados, evento_braip, conferir_resumos):
+    cliente.post('/webhooks/braip', json=evento_braip('A1', 'Aprovada'))
+
+    assert Pedido.query.filter_by(braip_trans_code='A1').one().status == 'Pago'
+    assert 'A1' not in _no_arquivo()
+    conferir_resumos()
+
+
+def test_fila_restaura_o_pedido_arquivado(arquivados, evento_braip, conferir_resumos):
+    enfileirar_evento(evento_braip('A1', 'Estornado'))
+    enfileirar_evento(evento_braip('NOVO', 'Aprovada'))
+
+    assert processar_lote() == 2
+
+    assert Pedido.query.filter_by(braip_trans_code='A1').one().status == 'Frustrado'
+    assert Pedido.query.count() == 3
+    assert _no_arquivo() == {'A2'}
+    conferir_resumos()
+
+
+def test_importacao_inclui_os_arquivados(arquivados, evento_braip, conferir_resumos):
+    importador = ImportadorBraip(tamanho_lote=10)
+    assert importador.arquivados == {'A1', 'A2'}
+
+    importador.importar([evento_braip('A1', 'Aprovada'), evento_braip('A2', 'Estornado')])
+
+    assert importador.total_inseridos == 0
+    assert Pedido.query.filter_by(braip_trans_code='A1').one().status == 'Pago'
+    assert Pedido.query.filter_by(braip_trans_code='A2').one().status == 'Frustrado'
+    assert _no_arquivo() == set()
+    conferir_resumos()
+
+
+def test_arquivamento_exige_arquivo_configurado(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ARQUIVO_PEDIDOS', '')
+
+    with pytest.raises(click.ClickException):
+        arquivar_pedidos()
+    assert restaurar_pedidos(codigos=['A1']) == 0
+
+
+def test_comando_de_restauracao_exige_um_filtro(app):
+    resultado = app.test_cli_runner().invoke(args=['restaurar-pedidos'])
+
+    assert resultado.exit_code == 2
+    assert 'Informe --codigo' in resultado.output
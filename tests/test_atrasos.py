@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from meu_app import db
+from meu_app.atrasos import marcar_atrasados, ultima_execucao
+from meu_app.models import Pedido
+
+
+def test_marca_so_os_vencidos_a_receber(criar_pedido, conferir_resumos):
+    agora = datetime(2024, 6, 10, 12)
+    vencido = criar_pedido('A Receber', 40.0, data_venda=datetime(2024, 5, 1), data_vencimento=agora - timedelta(days=1))
+    no_prazo = criar_pedido('A Receber', 30.0, data_vencimento=agora + timedelta(days=1))
+    agendado = criar_pedido('Agendado', 20.0)
+    agendado.data_vencimento = agora - timedelta(days=5)
+    db.session.commit()
+
+    assert marcar_atrasados(agora) == 1
+
+    db.session.expire_all()
+    atrasado = db.session.get(Pedido, vencido.id)
+    assert (atrasado.status, atrasado.status_grupo) == ('Atrasado', 'atrasado')
+    assert db.session.get(Pedido, no_prazo.id).status == 'A Receber'
+    assert db.session.get(Pedido, agendado.id).status == 'Agendado'
+    assert ultima_execucao().registros_afetados == 1
+    conferir_resumos()
+
+
+def test_segunda_passada_nao_conta_de_novo(criar_pedido, conferir_resumos):
+    agora = datetime(2024, 6, 10, 12)
+    criar_pedido('A Receber', 40.0, data_vencimento=agora - timedelta(days=1))
+
+    assert marcar_atrasados(agora) == 1
+    assert marcar_atrasados(agora) == 0
+    assert ultima_execucao().registros_afetados == 0
+    conferir_resumos()
+
+
+def test_api_e_comando_de_atrasos(app, cliente, criar_pedido):
+    assert cliente.get('/api/atrasos').get_json()['ultima_execucao'] is None
+    criar_pedido('A Receber', 40.0, data_vencimento=datetime.utcnow() - timedelta(days=1))
+
+    resultado = app.test_cli_runner().invoke(args=['marcar-atrasados'])
+
+    assert resultado.output.startswith('1 pedidos marcados como atrasados')
+    assert cliente.get('/api/atrasos').get_json()['registros_afetados'] == 1
@@ -0,0 +1,59 @@
+import importlib.util
+import os
+import random
+from datetime import datetime
+
+import pytest
+
+from meu_app import db
+
+CAMINHO = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'benchmark_dashboard.py')
+
+
+@pytest.fixture(scope='module')
+def benchmark():
+    especificacao = importlib.util.spec_from_file_location('benchmark_dashboard', CAMINHO)
+    modulo = importlib.util.module_from_spec(especificacao)
+    especificacao.loader.exec_module(modulo)
+    return modulo
+
+
+@pytest.mark.parametrize('texto, quantidade', [('10k', 10_000), ('1M', 1_000_000), ('2.5k', 2_500), ('300', 300)])
+def test_interpretar_tamanho(benchmark, texto, quantidade):
+    assert benchmark.interpretar_tamanho(texto) == quantidade
+
+
+def test_gerador_e_deterministico(benchmark):
+    agora = datetime(2024, 1, 1)
+
+    primeiro = list(benchmark.gerar_pedidos(random.Random(7), 50, agora))
+    segundo = list(benchmark.gerar_pedidos(random.Random(7), 50, agora))
+
+    assert primeiro == segundo
+    assert all(pedido['data_pagamento'] is None or pedido['data_pagamento'] <= agora for pedido in primeiro)
+
+
+def test_popular_banco_mantem_os_resumos_consistentes(app, benchmark, conferir_resumos):
+    benchmark.popular_banco(app, db, 200, semente=1)
+
+    pedidos, gastos = conferir_resumos()
+    assert sum(quantidade for quantidade, _ in pedidos.values()) == 200
+    assert sum(quantidade for quantidade, _ in gastos.values()) == 20
+
+
+def test_eventos_sinteticos_sao_aceitos_pelo_webhook(cliente, benchmark, conferir_resumos):
+    for evento in benchmark.eventos_webhook(random.Random(3), 40, 'T'):
+        assert cliente.post('/webhooks/braip', json=evento).status_code == 200
+    conferir_resumos()
+
+
+def test_estatisticas_e_comparacao(benchmark):
+    medida = benchmark.estatisticas([0.002, 0.001, 0.003])
+    assert (medida['min_ms'], medida['mediana_ms']) == (1.0, 2.0)
+
+    anterior = {'dashboard': {'hoje': {'mediana_ms': 4.0}}, 'webhook': {'fila': {'eventos_por_segundo': 100}}}
+    atual = {'dashboard': {'hoje': {'mediana_ms': 2.0}}, 'webhook': {'fila': {'eventos_por_segundo': 150}}}
+    assert benchmark.comparar(atual, anterior) == [
+        'dashboard/hoje: 4.0ms -> 2.0ms (-50.0%)',
+        'webhook/fila: 100 -> 150 eventos/s',
+    ]
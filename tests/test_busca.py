@@ -0,0 +1,51 @@
+import pytest
+
+from meu_app import db
+from meu_app.busca import filtrar_por_busca, fts_disponivel, somente_digitos
+from meu_app.models import Pedido
+
+
+@pytest.fixture
+def clientes(criar_pedido):
+    return {
+        'maria': criar_pedido(cliente='Maria Oliveira', telefone='(11) 98765-4321'),
+        'joao': criar_pedido(cliente='João "Jota" Souza', telefone='(21) 3333-1111'),
+        'ana': criar_pedido(cliente='Ana Maria Lima', telefone='(31) 99999-0000'),
+    }
+
+
+def _ids(query):
+    return {pedido.id for pedido in query}
+
+
+def test_indice_fts_esta_disponivel():
+    assert fts_disponivel()
+
+
+@pytest.mark.parametrize('termo', ['maria', 'MARIA', 'liveir', '98765-4321', '987654321', '"Jota"', 'Ma', '11'])
+def test_indice_e_ilike_encontram_os_mesmos_pedidos(clientes, termo):
+    pelo_indice = _ids(filtrar_por_busca(Pedido.query, termo))
+    pelo_ilike = _ids(filtrar_por_busca(Pedido.query, termo, usar_indice=False))
+
+    assert pelo_indice == pelo_ilike
+
+
+def test_busca_por_nome_e_telefone(clientes):
+    assert _ids(filtrar_por_busca(Pedido.query, 'maria')) == {clientes['maria'].id, clientes['ana'].id}
+    assert _ids(filtrar_por_busca(Pedido.query, '3333 1111')) == {clientes['joao'].id}
+    assert filtrar_por_busca(Pedido.query, '   ').count() == 3
+
+
+def test_indice_acompanha_edicoes_e_exclusoes(clientes):
+    clientes['joao'].cliente = 'Carlos Pereira'
+    db.session.delete(clientes['ana'])
+    db.session.commit()
+
+    assert _ids(filtrar_por_busca(Pedido.query, 'pereira')) == {clientes['joao'].id}
+    assert _ids(filtrar_por_busca(Pedido.query, 'souza')) == set()
+    assert _ids(filtrar_por_busca(Pedido.query, 'maria')) == {clientes['maria'].id}
+
+
+def test_somente_digitos():
+    assert somente_digitos('(11) 98765-4321') == '11987654321'
+    assert somente_digitos(None) == ''
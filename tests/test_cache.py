@@ -0,0 +1,138 @@
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from meu_app.cache import CacheArquivo, CacheDashboard, CacheMemoria, cache_dashboard, obter_resumo
+from meu_app.periodos import hoje_local
+
+
+def _limites(dia):
+    return datetime.combine(dia, datetime.min.time()), datetime.combine(dia, datetime.max.time())
+
+
+class Contador:
+    def __init__(self):
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        return {'chamada': self.chamadas}
+
+
+def test_cache_memoria_lru_e_ttl():
+    memoria = CacheMemoria(max_itens=2)
+    memoria.set('a', 1)
+    memoria.set('b', 2, ttl=0.01)
+    memoria.get('a')
+    memoria.set('c', 3)
+
+    assert memoria.get('a') == 1
+    assert memoria.get('b') is None
+    time.sleep(0.02)
+    memoria.set('d', 4, ttl=0.01)
+    time.sleep(0.02)
+    assert memoria.get('d') is None
+    assert memoria.incr('geracao') == 1 and memoria.incr('geracao') == 2
+
+
+def test_cache_arquivo_expira(tmp_path):
+    arquivo = CacheArquivo(str(tmp_path))
+    arquivo.set('chave', {'x': 1})
+    arquivo.set('curta', 1, ttl=0.01)
+    time.sleep(0.02)
+
+    assert arquivo.get('chave') == {'x': 1}
+    assert arquivo.get('curta') is None
+    assert arquivo.incr('n') == 1
+
+
+def test_escrita_de_hoje_invalida_so_os_periodos_correntes():
+    dashboard = CacheDashboard(CacheMemoria(), ttl_corrente=60, ttl_historico=60)
+    ontem = _limites(hoje_local() - timedelta(days=1))
+    hoje = _limites(hoje_local())
+    historico, corrente = Contador(), Contador()
+
+    dashboard.obter('ontem', *ontem, historico)
+    dashboard.obter('hoje', *hoje, corrente)
+    dashboard.invalidar({hoje_local()})
+    dashboard.obter('ontem', *ontem, historico)
+    dashboard.obter('hoje', *hoje, corrente)
+
+    assert (historico.chamadas, corrente.chamadas) == (1, 2)
+
+    dashboard.invalidar({hoje_local() - timedelta(days=3)})
+    dashboard.obter('ontem', *ontem, historico)
+    assert historico.chamadas == 2
+
+
+@pytest.mark.parametrize(
+    'backend, ttl_esperado',
+    [(CacheMemoria(), 300), ('arquivo', None)],
+    ids=['memoria', 'arquivo'],
+)
+def test_historico_so_fica_sem_expiracao_em_backend_compartilhado(tmp_path, backend, ttl_esperado):
+    if backend == 'arquivo':
+        backend = CacheArquivo(str(tmp_path))
+
+    dashboard = CacheDashboard(backend, ttl_corrente=30, ttl_historico=300)
+
+    assert dashboard.ttl_historico == ttl_esperado
+
+
+def test_historico_em_memoria_expira():
+    dashboard = CacheDashboard(CacheMemoria(), ttl_corrente=60, ttl_historico=0.01)
+    ontem = _limites(hoje_local() - timedelta(days=1))
+    historico = Contador()
+
+    dashboard.obter('ontem', *ontem, historico)
+    time.sleep(0.02)
+    dashboard.obter('ontem', *ontem, historico)
+
+    assert historico.chamadas == 2
+
+
+def test_resumo_em_cache_e_invalidado_pelas_escritas(criar_pedido):
+    inicio, fim = _limites(hoje_local())
+    criar_pedido('Pago', 50.0)
+    assert obter_resumo('hoje', inicio, fim)['faturamento_liquido'] == 50.0
+
+    # A escrita dispara ``dados_alterados`` pelas rotas; aqui a invalidação é direta.
+    criar_pedido('Pago', 25.0)
+    assert obter_resumo('hoje', inicio, fim)['faturamento_liquido'] == 50.0
+    cache_dashboard.invalidar({hoje_local()})
+    assert obter_resumo('hoje', inicio, fim)['faturamento_liquido'] == 75.0
+
+
+def test_api_cache(cliente):
+    dados = cliente.get('/api/cache').get_json()
+
+    assert dados['backend'] == 'memoria'
+    assert {'hits', 'misses', 'taxa_acerto', 'invalidacoes', 'itens'} <= set(dados)
+
+
+def test_contadores_com_varias_threads(app):
+    intervalo = sys.getswitchinterval()
+    # Trocas de thread frequentes para expor incrementos fora do lock.
+    sys.setswitchinterval(1e-6)
+    cache = CacheDashboard(CacheMemoria(10), ttl_corrente=60, ttl_historico=60)
+    inicio, fim = _limites(hoje_local())
+
+    def consultar():
+        with app.app_context():
+            for _ in range(500):
+                cache.obter('hoje', inicio, fim, Contador())
+
+    threads = [threading.Thread(target=consultar) for _ in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(intervalo)
+
+    estatisticas = cache.estatisticas()
+    assert estatisticas['hits'] + estatisticas['misses'] == 8 * 500
@@ -0,0 +1,56 @@
+import gzip
+
+
+def test_pagina_repetida_recebe_304(cliente):
+    primeira = cliente.get('/pedidos')
+    etag = primeira.headers['ETag']
+
+    assert primeira.headers['Cache-Control'] == 'no-cache'
+    repetida = cliente.get('/pedidos', headers={'If-None-Match': etag})
+    assert (repetida.status_code, repetida.data) == (304, b'')
+    assert repetida.headers['ETag'] == etag
+
+    por_data = cliente.get('/pedidos', headers={'If-Modified-Since': primeira.headers['Last-Modified']})
+    assert por_data.status_code == 304
+
+
+def test_escrita_e_argumentos_mudam_o_etag(cliente):
+    etag = cliente.get('/despesas').headers['ETag']
+
+    assert cliente.get('/despesas?categoria=Frete').headers['ETag'] != etag
+
+    cliente.post('/adicionar_gasto', data={'valor_gasto': '10', 'categoria': 'Frete'})
+    resposta = cliente.get('/despesas', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
+
+
+def test_gzip_com_sufixo_no_etag(cliente):
+    simples = cliente.get('/')
+    comprimida = cliente.get('/', headers={'Accept-Encoding': 'gzip'})
+
+    assert comprimida.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in comprimida.headers['Vary']
+    assert gzip.decompress(comprimida.data) == simples.data
+    assert comprimida.headers['ETag'] == simples.headers['ETag'][:-1] + '-gzip"'
+
+    for etag in (comprimida.headers['ETag'], simples.headers['ETag']):
+        resposta = cliente.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert resposta.status_code == 304
+
+
+def test_respostas_pequenas_ou_compressao_desligada(app, cliente, monkeypatch):
+    pequena = cliente.get('/api/atrasos', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in pequena.headers
+
+    monkeypatch.setitem(app.config, 'COMPRESSAO_ATIVA', False)
+    assert 'Content-Encoding' not in cliente.get('/', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+def test_cache_http_desligado(app, cliente, monkeypatch):
+    monkeypatch.setitem(app.config, 'HTTP_CACHE_ATIVO', False)
+
+    resposta = cliente.get('/pedidos', headers={'If-None-Match': '*'})
+
+    assert resposta.status_code == 200
+    assert 'ETag' not in resposta.headers
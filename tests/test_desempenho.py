@@ -0,0 +1,79 @@
+import json
+import logging
+
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from meu_app import db, desempenho
+from meu_app.desempenho import EstatisticasRotas, FormatadorJson
+
+
+@pytest.fixture
+def perf(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'PERF_ATIVO', True)
+    monkeypatch.setattr(desempenho, 'estatisticas_rotas', EstatisticasRotas(10))
+    return desempenho
+
+
+def test_desligado_nao_mede_nada(cliente):
+    resposta = cliente.get('/api/resumo')
+
+    assert 'Server-Timing' not in resposta.headers
+    assert cliente.get('/debug/perf').status_code == 404
+
+
+def test_requisicao_ganha_server_timing(cliente, perf):
+    resposta = cliente.get('/api/resumo')
+
+    assert resposta.headers['Server-Timing'].startswith('db;dur=')
+    (linha,) = perf.estatisticas_rotas.resumo()
+    assert linha['rota'] == '/api/resumo'
+    assert linha['consultas_media'] >= 1
+    assert cliente.get('/debug/perf').status_code == 200
+
+
+def test_consulta_lenta_e_registrada_com_o_plano(app, cliente, perf, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, 'PERF_LENTA_MS', 0)
+
+    with caplog.at_level(logging.WARNING, logger='meu_app.desempenho'):
+        cliente.get('/api/pedidos')
+
+    lentas = list(perf.estatisticas_rotas.consultas_lentas)
+    assert lentas and all(consulta['rota'] == 'api_pedidos' for consulta in lentas)
+    assert any(consulta['plano'] for consulta in lentas if consulta['sql'].lstrip().upper().startswith('SELECT'))
+    assert 'Consulta lenta' in caplog.text
+
+
+def test_consulta_que_falha_nao_deixa_inicio_na_conexao(app, perf):
+    with app.test_request_context('/'):
+        desempenho._iniciar_medicao()
+        with pytest.raises(OperationalError):
+            db.session.execute(text('SELECT * FROM tabela_inexistente'))
+        db.session.rollback()
+        db.session.execute(text('SELECT 1'))
+
+        assert g._perf.consultas == 1
+        assert '_perf_inicio' not in db.session.connection().info
+        db.session.rollback()
+
+
+def test_percentis_por_rota():
+    estatisticas = EstatisticasRotas(amostras=3)
+    for duracao in (10, 20, 30, 40):
+        estatisticas.registrar('/x', duracao, 2, duracao / 2)
+
+    (linha,) = estatisticas.resumo()
+
+    assert linha['requisicoes'] == 3
+    assert (linha['p50_ms'], linha['p95_ms'], linha['max_ms']) == (30, 40, 40)
+
+
+def test_formatador_json_inclui_os_extras():
+    registro = logging.makeLogRecord({'msg': 'oi %s', 'args': ('mundo',), 'levelname': 'INFO', 'rota': '/'})
+
+    dados = json.loads(FormatadorJson().format(registro))
+
+    assert dados['mensagem'] == 'oi mundo'
+    assert dados['rota'] == '/'
@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import pytest
+
+from meu_app.gastos import (
+    categorias_de_gastos,
+    filtrar_gastos,
+    interpretar_data,
+    normalizar_valor,
+    subtotal_gastos,
+    totais_gastos,
+)
+from meu_app.models import Gasto
+from meu_app.resumos import CATEGORIA_PADRAO
+
+
+@pytest.mark.parametrize(
+    'digitado, valor',
+    [
+        ('12,50', 12.5),
+        ('R$ 1.234,56', 1234.56),
+        ('1.234,56', 1234.56),
+        ('1,234.56', 1234.56),
+        ('1.234', 1.234),
+        ('1.234.567', 1234567.0),
+        ('1234.5', 1234.5),
+        (7, 7.0),
+    ],
+)
+def test_normalizar_valor(digitado, valor):
+    assert normalizar_valor(digitado) == valor
+
+
+@pytest.mark.parametrize('digitado', ['abc', 'nan', 'inf', '', '1,234,5', '1.23,45', '1.234,5,6'])
+def test_normalizar_valor_invalido(digitado):
+    with pytest.raises(ValueError):
+        normalizar_valor(digitado)
+
+
+def test_interpretar_data():
+    assert interpretar_data('2024-05-31') == datetime(2024, 5, 31)
+    assert interpretar_data('31/05/2024 14:30') == datetime(2024, 5, 31, 14, 30)
+    with pytest.raises(ValueError, match='data inválida'):
+        interpretar_data('31/05')
+
+
+def test_totais_e_filtros_batem_com_a_tabela(criar_gasto, conferir_resumos):
+    criar_gasto(10.0, 'Anúncios', datetime(2024, 5, 1, 9))
+    criar_gasto(15.0, 'Anúncios', datetime(2024, 5, 2, 9))
+    criar_gasto(7.5, None, datetime(2024, 5, 2, 10))
+    criar_gasto(2.5, CATEGORIA_PADRAO, datetime(2024, 5, 3, 10))
+    inicio, fim = datetime(2024, 5, 2), datetime(2024, 5, 2, 23, 59, 59)
+
+    assert totais_gastos() == (4, 35.0)
+    assert totais_gastos(inicio, fim) == (2, 22.5)
+    # Sem categoria e gravados como 'Sem categoria': a lista e os totais batem.
+    sem_categoria = filtrar_gastos(Gasto.query, categoria=CATEGORIA_PADRAO)
+    assert totais_gastos(categoria=CATEGORIA_PADRAO) == (2, 10.0)
+    assert sem_categoria.count() == 2
+    assert filtrar_gastos(Gasto.query, inicio, fim, 'Anúncios').count() == 1
+    assert subtotal_gastos(Gasto.query.all()) == 35.0
+    assert subtotal_gastos([]) == 0.0
+    assert categorias_de_gastos() == ['Anúncios', CATEGORIA_PADRAO]
+    conferir_resumos()
+
+
+def test_listagem_de_despesas(cliente, criar_gasto):
+    for dia in range(1, 4):
+        criar_gasto(10.0 * dia, 'Anúncios', datetime(2024, 5, dia))
+
+    resposta = cliente.get('/despesas?categoria=Anúncios')
+
+    assert resposta.status_code == 200
+    assert 'Total do filtro: R$ 60.00 (3 despesas)' in resposta.get_data(as_text=True)
+
+
+def test_gasto_pelo_painel_sem_categoria(cliente, conferir_resumos):
+    cliente.post('/adicionar_gasto', data={'valor_gasto': '1,234.56', 'categoria': '  '})
+
+    gasto = Gasto.query.one()
+    assert (gasto.valor, gasto.categoria) == (1234.56, None)
+    conferir_resumos()
+
+
+def test_valor_ambiguo_pelo_painel_nao_grava(cliente):
+    cliente.post('/adicionar_gasto', data={'valor_gasto': '1,234,5'})
+
+    assert Gasto.query.count() == 0
@@ -0,0 +1,81 @@
+import csv
+import io
+from datetime import datetime
+
+import pytest
+
+from meu_app import exportacao
+from meu_app.exportacao import COLUNAS_PEDIDOS, gerar_csv, query_exportacao_pedidos, xlsx_disponivel
+from meu_app.models import Pedido
+
+
+def _ler_csv(resposta):
+    return list(csv.reader(io.StringIO(resposta.get_data(as_text=True).lstrip('\ufeff'))))
+
+
+def test_exporta_pedidos_em_csv(cliente, criar_pedido):
+    criar_pedido('Pago', 10.5, cliente='José Ção', data_venda=datetime(2024, 1, 2, 3, 4, 5))
+    criar_pedido('Agendado', 20.0)
+
+    resposta = cliente.get('/export/pedidos')
+
+    assert resposta.status_code == 200
+    assert resposta.mimetype == 'text/csv'
+    assert 'attachment; filename=pedidos_' in resposta.headers['Content-Disposition']
+    linhas = _ler_csv(resposta)
+    assert linhas[0] == [titulo for _, titulo in COLUNAS_PEDIDOS]
+    assert len(linhas) == 3
+    assert linhas[-1][2:4] == ['2024-01-02 03:04:05', 'José Ção']
+
+
+def test_exportacao_respeita_filtros(cliente, criar_pedido):
+    criar_pedido('Pago', cliente='Maria Oliveira')
+    criar_pedido('Agendado', cliente='Maria Souza')
+    criar_pedido('Pago', cliente='João Lima')
+
+    linhas = _ler_csv(cliente.get('/export/pedidos?status=Pago&busca=maria'))
+
+    assert [linha[3] for linha in linhas[1:]] == ['Maria Oliveira']
+
+
+def test_csv_e_gerado_em_blocos(criar_pedido, monkeypatch):
+    monkeypatch.setattr(exportacao, 'TAMANHO_LOTE_EXPORTACAO', 2)
+    for _ in range(5):
+        criar_pedido()
+
+    blocos = list(gerar_csv(query_exportacao_pedidos(Pedido.query), COLUNAS_PEDIDOS))
+
+    assert len(blocos) == 3
+    assert ''.join(blocos).count('\n') == 6
+
+
+def test_exporta_despesas_por_categoria(cliente, criar_gasto):
+    criar_gasto(10.0, 'Anúncios')
+    criar_gasto(5.0, 'Ferramentas')
+
+    linhas = _ler_csv(cliente.get('/export/despesas?categoria=Ferramentas'))
+
+    assert [linha[3] for linha in linhas[1:]] == ['Ferramentas']
+
+
+def test_formato_invalido(cliente):
+    resposta = cliente.get('/export/pedidos?formato=pdf')
+
+    assert resposta.status_code == 400
+
+
+def test_xlsx_sem_openpyxl_responde_501(cliente):
+    if xlsx_disponivel():
+        pytest.skip('openpyxl instalado')
+
+    assert cliente.get('/export/pedidos?formato=xlsx').status_code == 501
+
+
+def test_exporta_pedidos_em_xlsx(cliente, criar_pedido):
+    openpyxl = pytest.importorskip('openpyxl')
+    criar_pedido('Pago', 10.0)
+
+    resposta = cliente.get('/export/pedidos?formato=xlsx')
+
+    planilha = openpyxl.load_workbook(io.BytesIO(resposta.get_data()))
+    assert planilha['pedidos'].max_row == 2
@@ -0,0 +1,116 @@
+import json
+from datetime import datetime, timedelta
+
+from meu_app import db
+from meu_app.fila import contar_pendentes, enfileirar_evento, processar_lote
+from meu_app.models import FilaWebhook, Pedido
+
+
+def _enfileirar(*eventos):
+    for dados in eventos:
+        enfileirar_evento(dados)
+
+
+def _erros():
+    return [entrada.erro for entrada in FilaWebhook.query.order_by(FilaWebhook.id)]
+
+
+def test_lote_cria_e_avanca_pedidos(evento_braip, conferir_resumos):
+    _enfileirar(
+        evento_braip('A1', 'Aprovada'),
+        evento_braip('A1', 'Pagamento Confirmado', metodo_pagamento='Pix'),
+        evento_braip('A2', 'Aprovada'),
+    )
+
+    assert processar_lote() == 3
+    assert contar_pendentes() == 0
+    pedido = Pedido.query.filter_by(braip_trans_code='A1').one()
+    assert (pedido.status, pedido.metodo_pagamento) == ('Pago', 'Pix')
+    assert Pedido.query.count() == 2
+    conferir_resumos()
+
+
+def test_evento_repetido_no_lote_e_aplicado_uma_vez(evento_braip, conferir_resumos):
+    _enfileirar(evento_braip('R1', 'Aprovada'), evento_braip('R1', 'Aprovada'))
+
+    processar_lote()
+
+    assert Pedido.query.count() == 1
+    assert _erros() == [None, None]
+    conferir_resumos()
+
+
+def test_evento_sem_campos_obrigatorios_nao_derruba_o_lote(evento_braip, conferir_resumos):
+    malformado = evento_braip('M2', 'Aprovada')
+    del malformado['nome_cliente']
+    _enfileirar(evento_braip('M1', 'Aprovada'), malformado, evento_braip('M3', 'Aprovada'))
+
+    assert processar_lote() == 3
+
+    assert contar_pendentes() == 0
+    assert {pedido.braip_trans_code for pedido in Pedido.query} == {'M1', 'M3'}
+    primeiro, meio, ultimo = _erros()
+    assert primeiro is None and ultimo is None
+    assert 'nome_cliente' in meio
+    conferir_resumos()
+
+
+def test_evento_recusado_pelo_banco_so_marca_a_propria_linha(evento_braip, conferir_resumos):
+    # Passa na validação, mas o SQLite não grava um objeto como texto.
+    recusado = evento_braip('B2', 'Aprovada', nome_cliente={'primeiro': 'Ana'})
+    _enfileirar(evento_braip('B1', 'Aprovada'), recusado, evento_braip('B3', 'Aprovada'))
+
+    assert processar_lote() == 3
+
+    assert contar_pendentes() == 0
+    assert {pedido.braip_trans_code for pedido in Pedido.query} == {'B1', 'B3'}
+    primeiro, meio, ultimo = _erros()
+    assert primeiro is None and ultimo is None
+    assert meio.startswith('Evento recusado pelo banco')
+    assert processar_lote() == 0
+    conferir_resumos()
+
+
+def test_payload_invalido_e_marcado(evento_braip):
+    db.session.add(FilaWebhook(payload='{não é json'))
+    db.session.commit()
+    _enfileirar(evento_braip('J1', 'Aprovada'))
+
+    processar_lote()
+
+    assert _erros()[0].startswith('Payload inválido')
+    assert Pedido.query.count() == 1
+
+
+def test_reserva_abandonada_volta_para_a_fila(evento_braip):
+    _enfileirar(evento_braip('E1', 'Aprovada'))
+    entrada = FilaWebhook.query.one()
+    entrada.reservado_por = 'worker-encerrado'
+    entrada.reservado_em = datetime.utcnow()
+    db.session.commit()
+
+    assert processar_lote() == 0
+
+    entrada.reservado_em = datetime.utcnow() - timedelta(minutes=10)
+    db.session.commit()
+    assert processar_lote() == 1
+    assert Pedido.query.count() == 1
+
+
+def test_webhook_no_modo_fila_enfileira(app, cliente, evento_braip, monkeypatch):
+    monkeypatch.setitem(app.config, 'WEBHOOK_MODO', 'fila')
+
+    resposta = cliente.post('/webhooks/braip', json=evento_braip('F1', 'Aprovada'))
+
+    assert resposta.status_code == 202
+    assert json.loads(FilaWebhook.query.one().payload)['codigo_transacao'] == 'F1'
+    assert Pedido.query.count() == 0
+
+
+def test_comando_processar_fila(app, evento_braip):
+    _enfileirar(evento_braip('C1', 'Aprovada'), evento_braip('C2', 'Aprovada'))
+
+    resultado = app.test_cli_runner().invoke(args=['processar-fila', '--lote', '1'])
+
+    assert resultado.exit_code == 0
+    assert resultado.output.startswith('2 eventos processados')
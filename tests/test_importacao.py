@@ -0,0 +1,102 @@
+import json
+from datetime import datetime
+
+from meu_app.importacao import ImportadorBraip, data_do_evento
+from meu_app.models import Pedido
+
+
+def _importar(eventos, tamanho_lote=2):
+    importador = ImportadorBraip(tamanho_lote=tamanho_lote)
+    importador.importar(eventos)
+    return importador
+
+
+def test_data_do_evento_converte_para_utc():
+    padrao = datetime(2000, 1, 1)
+
+    assert data_do_evento({'data_evento': '2024-03-01T21:30:00-03:00'}, padrao) == datetime(2024, 3, 2, 0, 30)
+    assert data_do_evento({'data_evento': '2024-03-01T21:30:00Z'}, padrao) == datetime(2024, 3, 1, 21, 30)
+    assert data_do_evento({'data_evento': '2024-03-01T21:30:00'}, padrao) == datetime(2024, 3, 1, 21, 30)
+    assert data_do_evento({}, padrao) == padrao
+
+
+def test_importacao_aplica_o_ciclo_de_vida(evento_braip, conferir_resumos):
+    importador = _importar(
+        [
+            evento_braip('I1', 'Aprovada', data_evento='2024-03-01T10:00:00-03:00'),
+            evento_braip('I2', 'Aprovada', data_evento='2024-03-01T11:00:00-03:00'),
+            evento_braip('I1', 'Pagamento Confirmado', data_evento='2024-03-01T22:00:00-03:00'),
+            evento_braip('I2', 'Entregue', data_evento='2024-03-02T10:00:00-03:00'),
+            evento_braip('I1', 'Entregue', data_evento='2024-03-03T10:00:00-03:00'),
+        ]
+    )
+
+    assert (importador.total_inseridos, importador.total_ignorados, importador.total_invalidos) == (2, 1, 0)
+    pago = Pedido.query.filter_by(braip_trans_code='I1').one()
+    assert pago.status == 'Pago'
+    assert pago.data_venda == datetime(2024, 3, 1, 13)
+    assert pago.data_pagamento == datetime(2024, 3, 2, 1)
+    assert Pedido.query.filter_by(braip_trans_code='I2').one().status == 'A Receber'
+    conferir_resumos()
+
+
+def test_eventos_invalidos_sao_pulados_e_relatados(evento_braip, conferir_resumos):
+    sem_nome = evento_braip('V2', 'Aprovada')
+    del sem_nome['nome_cliente']
+    importador = _importar(
+        [
+            evento_braip('V1', 'Aprovada'),
+            sem_nome,
+            {'status_compra_descricao': 'Aprovada'},
+            evento_braip('V1', 'Pagamento Confirmado', data_evento='ontem'),
+            evento_braip('V3', 'Aprovada', valor_total=None),
+            evento_braip('V4', 'Aprovada'),
+        ]
+    )
+
+    assert importador.total_invalidos == 4
+    assert len(importador.erros) == 4
+    assert importador.erros[0].startswith('Evento 2:') and 'nome_cliente' in importador.erros[0]
+    assert {pedido.braip_trans_code for pedido in Pedido.query} == {'V1', 'V4'}
+    assert Pedido.query.filter_by(braip_trans_code='V1').one().status == 'Agendado'
+    conferir_resumos()
+
+
+def test_reimportar_nao_duplica_pedidos(evento_braip, conferir_resumos):
+    eventos = [evento_braip('D1', 'Aprovada'), evento_braip('D1', 'Pagamento Confirmado')]
+    _importar(eventos)
+
+    segunda = _importar(eventos)
+
+    assert segunda.total_inseridos == 0
+    assert Pedido.query.count() == 1
+    conferir_resumos()
+
+
+def test_comando_importar_braip(app, tmp_path, evento_braip):
+    arquivo = tmp_path / 'eventos.jsonl'
+    arquivo.write_text(
+        '\n'.join([json.dumps(evento_braip('C1', 'Aprovada')), '{corrompida', json.dumps(evento_braip('C2', 'Aprovada'))])
+    )
+
+    resultado = app.test_cli_runner().invoke(args=['importar-braip', str(arquivo), '--lote', '1'])
+
+    assert resultado.exit_code == 0
+    assert '2 pedidos criados' in resultado.output
+    assert '1 inválidos' in resultado.output
+    assert Pedido.query.count() == 2
+
+
+def test_importacao_de_csv(app, tmp_path):
+    arquivo = tmp_path / 'eventos.csv'
+    arquivo.write_text(
+        'codigo_transacao,status_compra_descricao,nome_cliente,cel_cliente,valor_total,data_evento\n'
+        'CSV1,Aprovada,Ana,(11) 1111-1111,99.90,2024-01-05T10:00:00Z\n'
+        'CSV1,Pagamento Confirmado,,,,2024-01-06T10:00:00Z\n'
+    )
+
+    resultado = app.test_cli_runner().invoke(args=['importar-braip', str(arquivo)])
+
+    assert resultado.exit_code == 0
+    pedido = Pedido.query.one()
+    assert (pedido.valor, pedido.status) == (99.9, 'Pago')
@@ -0,0 +1,93 @@
+import io
+from datetime import datetime
+
+from meu_app.gastos import importar_gastos
+from meu_app.models import Gasto
+
+
+def _csv(texto):
+    return io.StringIO(texto)
+
+
+def test_importa_e_ignora_os_ja_gravados(criar_gasto, conferir_resumos):
+    criar_gasto(10.0, 'Anúncios', datetime(2024, 5, 1, 9))
+    texto = (
+        'data;valor;categoria\n'
+        '2024-05-01 09:00;10,00;Anúncios\n'
+        '02/05/2024;R$ 1.200,00;Ferramentas\n'
+        '02/05/2024;1200;Ferramentas\n'
+        '2024-05-03;5;\n'
+    )
+
+    relatorio = importar_gastos(_csv(texto))
+
+    # Linhas idênticas no mesmo arquivo são lançamentos distintos.
+    assert (relatorio.linhas, relatorio.inseridos, relatorio.duplicados, relatorio.erros) == (4, 3, 1, [])
+    assert Gasto.query.count() == 4
+    assert Gasto.query.filter_by(categoria=None).one().valor == 5.0
+
+    reimportado = importar_gastos(_csv(texto))
+    assert (reimportado.inseridos, reimportado.duplicados) == (0, 4)
+    conferir_resumos()
+
+
+def test_linha_invalida_nao_grava_nada(conferir_resumos):
+    relatorio = importar_gastos(_csv('data,valor\n2024-05-01,10\n2024-13-01,5\n2024-05-02,\n'))
+
+    assert relatorio.erros == ["Linha 3: data inválida: '2024-13-01'", 'Linha 4: valor ausente']
+    assert relatorio.inseridos == 0
+    assert Gasto.query.count() == 0
+    conferir_resumos()
+
+
+def test_cabecalho_sem_colunas_obrigatorias():
+    relatorio = importar_gastos(_csv('dia;quanto\n2024-05-01;10\n'))
+
+    assert relatorio.erros == ['Arquivo inválido: cabeçalho sem as colunas: data, valor']
+
+
+def test_rota_de_importacao(cliente):
+    resposta = cliente.post(
+        '/importar_gastos',
+        data={'arquivo': (io.BytesIO('data;valor\n2024-05-01;10\n'.encode()), 'gastos.csv')},
+        content_type='multipart/form-data',
+    )
+
+    assert resposta.status_code == 200
+    assert resposta.get_json()['inseridos'] == 1
+
+
+def test_rota_de_importacao_com_erros(cliente):
+    sem_arquivo = cliente.post('/importar_gastos', data={}, content_type='multipart/form-data')
+    invalido = cliente.post(
+        '/importar_gastos',
+        data={'arquivo': (io.BytesIO(b'data;valor\nontem;10\n'), 'gastos.csv')},
+        content_type='multipart/form-data',
+    )
+
+    assert sem_arquivo.status_code == 400
+    assert invalido.status_code == 400
+    assert invalido.get_json()['erros'] == ["Linha 2: data inválida: 'ontem'"]
+    assert Gasto.query.count() == 0
+
+
+def test_comando_import_gastos(app, tmp_path):
+    arquivo = tmp_path / 'gastos.csv'
+    arquivo.write_text('data;valor;categoria\n2024-05-01;10;Anúncios\n2024-05-01;10;Anúncios\n', encoding='utf-8')
+
+    resultado = app.test_cli_runner().invoke(args=['import-gastos', str(arquivo)])
+
+    assert resultado.exit_code == 0
+    assert '2 gastos importados, 0 repetidos ignorados' in resultado.output
+    resultado = app.test_cli_runner().invoke(args=['import-gastos', str(arquivo)])
+    assert '0 gastos importados, 2 repetidos ignorados' in resultado.output
+
+
+def test_comando_import_gastos_falha_com_linha_invalida(app, tmp_path):
+    arquivo = tmp_path / 'gastos.csv'
+    arquivo.write_text('data;valor\n2024-05-01;dez\n', encoding='utf-8')
+
+    resultado = app.test_cli_runner().invoke(args=['import-gastos', str(arquivo)])
+
+    assert resultado.exit_code != 0
+    assert Gasto.query.count() == 0
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from meu_app.kpis import calcular_agendado_total, calcular_resumo
+
+
+def _popular(criar_pedido, criar_gasto):
+    criar_pedido('Agendado', 100.0)
+    criar_pedido('A Receber', 50.0)
+    criar_pedido('Pago', 200.0)
+    criar_pedido('Frustrado', 30.0)
+    criar_gasto(40.0)
+
+
+def test_resumo_do_historico(criar_pedido, criar_gasto, conferir_resumos):
+    _popular(criar_pedido, criar_gasto)
+
+    resumo = calcular_resumo()
+
+    assert resumo['faturamento_liquido'] == 200.0
+    assert resumo['gasto'] == 40.0
+    assert resumo['lucro'] == 160.0
+    assert resumo['roi'] == 4.0
+    assert resumo['falta_receber'] == 50.0
+    assert resumo['frutado'] == 30.0
+    assert resumo['quantidade_vendas'] == 1
+    assert resumo['agendado_total'] == 100.0
+    assert resumo['projecao'] == 350.0
+    conferir_resumos()
+
+
+def test_resumo_sem_gasto_tem_roi_zero(criar_pedido):
+    criar_pedido('Pago', 80.0)
+
+    assert calcular_resumo()['roi'] == 0
+
+
+def test_periodo_filtra_tudo_menos_o_agendado(criar_pedido, criar_gasto):
+    antigo = datetime.utcnow() - timedelta(days=30)
+    criar_pedido('Pago', 70.0, data_venda=antigo, data_pagamento=antigo)
+    criar_pedido('Agendado', 25.0, data_venda=antigo)
+    criar_gasto(15.0, data=antigo)
+    criar_pedido('Pago', 10.0)
+
+    inicio = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    resumo = calcular_resumo(inicio, inicio + timedelta(days=1) - timedelta(microseconds=1))
+
+    assert resumo['faturamento_liquido'] == 10.0
+    assert resumo['gasto'] == 0.0
+    assert resumo['agendado_total'] == 25.0 == calcular_agendado_total()
+
+
+def test_painel_e_api_de_resumo(cliente, criar_pedido):
+    criar_pedido('Pago', 200.0)
+
+    assert cliente.get('/').status_code == 200
+    assert cliente.get('/?carregamento=lazy').status_code == 200
+    resposta = cliente.get('/api/resumo?periodo=maximo')
+    assert resposta.status_code == 200
+    assert resposta.get_json()['resumo']['faturamento_liquido'] == 200.0
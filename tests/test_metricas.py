@@ -0,0 +1,68 @@
+import re
+
+from meu_app import db, metricas
+from meu_app.fila import enfileirar_evento
+from meu_app.metricas import Contador, Histograma, _rotulos
+from meu_app.models import Gasto
+
+
+def _amostra(texto, nome):
+    encontrado = re.search(rf'^{re.escape(nome)} (\S+)$', texto, re.MULTILINE)
+    return float(encontrado.group(1)) if encontrado else None
+
+
+def test_histograma_acumula_os_buckets():
+    histograma = Histograma('h', 'teste', ('rota',), buckets=(0.1, 1.0))
+    for valor in (0.05, 0.5, 5.0):
+        histograma.observar(valor, 'x')
+
+    amostras = dict(histograma.amostras())
+
+    assert amostras['h_bucket{rota="x",le="0.1"}'] == 1
+    assert amostras['h_bucket{rota="x",le="1.0"}'] == 2
+    assert amostras['h_bucket{rota="x",le="+Inf"}'] == 3
+    assert amostras['h_count{rota="x"}'] == 3
+    assert amostras['h_sum{rota="x"}'] == 5.55
+
+
+def test_rotulos_escapam_aspas_e_quebras():
+    assert _rotulos(('a',), ['x"y\nz']) == '{a="x\\"y\\nz"}'
+
+    contador = Contador('c_total', 'teste')
+    contador.incrementar(quantidade=3)
+    assert list(contador.amostras()) == [('c_total', 3)]
+
+
+def test_metrics_expoe_requisicoes_webhook_e_fila(cliente, evento_braip):
+    antes = _amostra(cliente.get('/metrics').get_data(as_text=True), 'meu_app_webhook_eventos_total{status="outro"}') or 0
+    cliente.get('/api/resumo')
+    cliente.post('/webhooks/braip', json=evento_braip('MT1', 'Status Inventado'))
+    enfileirar_evento(evento_braip('MT2', 'Aprovada'))
+
+    texto = cliente.get('/metrics').get_data(as_text=True)
+
+    assert '# TYPE meu_app_requisicao_segundos histogram' in texto
+    assert _amostra(texto, 'meu_app_respostas_total{rota="api_resumo",codigo="200"}') >= 1
+    assert _amostra(texto, 'meu_app_webhook_eventos_total{status="outro"}') == antes + 1
+    assert _amostra(texto, 'meu_app_fila_pendentes') == 1
+    assert 'rota="metricas"' not in texto
+
+
+def test_metrics_desligado(app, cliente, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICAS_ATIVO', False)
+
+    assert cliente.get('/metrics').status_code == 404
+
+
+def test_commits_em_andamento_volta_a_zero(criar_pedido):
+    criar_pedido()
+
+    assert dict(metricas.commits_em_andamento.amostras())['meu_app_db_commits_em_andamento'] == 0
+
+
+def test_savepoint_nao_conta_como_commit_em_andamento():
+    with db.session.begin_nested():
+        db.session.add(Gasto(valor=1.0))
+    db.session.commit()
+
+    assert dict(metricas.commits_em_andamento.amostras())['meu_app_db_commits_em_andamento'] == 0
@@ -0,0 +1,60 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import update
+
+from meu_app import db, migracoes
+from meu_app.migracoes import _aplicar, aplicar_migracoes, listar_migracoes, versao_atual
+from meu_app.models import Gasto, Pedido, VersaoEsquema
+
+
+def test_migracoes_em_ordem_e_sem_buracos():
+    versoes = [migracao.versao for migracao in listar_migracoes()]
+
+    assert versoes == list(range(1, len(versoes) + 1))
+
+
+def test_banco_em_dia_nao_aplica_nada(app):
+    ultima = listar_migracoes()[-1]
+
+    assert versao_atual() == ultima.versao
+    assert aplicar_migracoes() == []
+    # Outro processo chegou primeiro: a versão relida sob o lock já está registrada.
+    assert _aplicar(ultima) is False
+
+    resultado = app.test_cli_runner().invoke(args=['db-upgrade'])
+    assert resultado.output == f"Esquema na versão {ultima.versao}.\n"
+
+
+def test_banco_antigo_recebe_as_pendentes(criar_pedido):
+    pedido = criar_pedido('Pago', telefone='(11) 98888-7777')
+    db.session.execute(update(Pedido).values(status_grupo=None, telefone_digitos=None))
+    db.session.query(VersaoEsquema).filter(VersaoEsquema.versao >= 2).delete()
+    db.session.commit()
+
+    aplicadas = aplicar_migracoes()
+
+    assert [migracao.versao for migracao in aplicadas] == [migracao.versao for migracao in listar_migracoes()][1:]
+    db.session.expire_all()
+    pedido = db.session.get(Pedido, pedido.id)
+    assert (pedido.status_grupo, pedido.telefone_digitos) == ('pago', '11988887777')
+    assert versao_atual() == listar_migracoes()[-1].versao
+
+
+def test_migracao_que_falha_nao_fica_registrada(monkeypatch):
+    def aplicar():
+        db.session.add(Gasto(valor=1.0))
+        db.session.flush()
+        raise RuntimeError("falhou no meio")
+
+    falha = SimpleNamespace(versao=9999, nome='falha', modulo='migracao_de_teste_falha')
+    monkeypatch.setitem(sys.modules, falha.modulo, SimpleNamespace(aplicar=aplicar))
+    monkeypatch.setattr(migracoes, 'listar_migracoes', lambda: [falha])
+    anterior = versao_atual()
+
+    with pytest.raises(RuntimeError):
+        aplicar_migracoes()
+
+    assert versao_atual() == anterior
+    assert Gasto.query.count() == 0
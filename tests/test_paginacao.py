@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from meu_app import paginacao
+from meu_app.models import Pedido
+from meu_app.paginacao import codificar_cursor, contar_com_cache, decodificar_cursor, paginar_por_cursor
+
+
+def test_cursor_vai_e_volta():
+    data = datetime(2024, 2, 3, 4, 5, 6, 789)
+
+    assert decodificar_cursor(codificar_cursor(data, 42)) == (data, 42)
+
+
+def test_cursor_invalido_vira_primeira_pagina():
+    assert decodificar_cursor('não-é-base64!') is None
+    assert decodificar_cursor('') is None
+
+
+def test_paginas_seguem_data_e_id_decrescentes(criar_pedido):
+    inicio = datetime(2024, 1, 1)
+    # Dois pedidos por instante, para o desempate pelo id.
+    for i in range(7):
+        criar_pedido(data_venda=inicio + timedelta(hours=i // 2))
+    esperado = [pedido.id for pedido in Pedido.query.order_by(Pedido.data_venda.desc(), Pedido.id.desc())]
+
+    vistos = []
+    pagina = paginar_por_cursor(Pedido.query, Pedido.data_venda, Pedido.id, per_page=3)
+    assert not pagina.has_prev
+    while True:
+        vistos.extend(pedido.id for pedido in pagina.items)
+        if not pagina.has_next:
+            break
+        pagina = paginar_por_cursor(Pedido.query, Pedido.data_venda, Pedido.id, cursor=pagina.next_cursor, per_page=3)
+    assert vistos == esperado
+
+    anterior = paginar_por_cursor(
+        Pedido.query, Pedido.data_venda, Pedido.id, cursor=pagina.prev_cursor, direcao='anterior', per_page=3
+    )
+    assert [pedido.id for pedido in anterior.items] == esperado[3:6]
+    assert anterior.has_prev and anterior.has_next
+
+
+def test_contagem_fica_em_cache_ate_expirar(criar_pedido):
+    criar_pedido()
+    assert contar_com_cache(Pedido.query, 'todos', ttl=60) == 1
+
+    criar_pedido()
+    assert contar_com_cache(Pedido.query, 'todos', ttl=60) == 1
+    assert contar_com_cache(Pedido.query, 'outra', ttl=60) == 2
+    assert contar_com_cache(Pedido.query, 'todos', ttl=0) is None
+
+
+def test_cache_de_contagens_e_limitado(criar_pedido, monkeypatch):
+    monkeypatch.setattr(paginacao, '_contagens', paginacao.CacheMemoria(3))
+    for termo in range(10):
+        contar_com_cache(Pedido.query, ('pedidos', None, str(termo)), ttl=60)
+
+    assert len(paginacao._contagens) == 3
+
+
+def test_lista_de_pedidos_por_cursor(cliente, criar_pedido):
+    for _ in range(20):
+        criar_pedido()
+
+    resposta = cliente.get('/pedidos?paginacao=cursor')
+
+    assert resposta.status_code == 200
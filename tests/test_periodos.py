@@ -0,0 +1,70 @@
+from datetime import date, datetime
+
+import pytest
+
+from meu_app.kpis import calcular_resumo
+from meu_app.models import Gasto
+from meu_app.periodos import Periodo, dia_local, granularidade_padrao, hoje_local, resolver_periodo
+
+HOJE = date(2024, 3, 15)
+
+
+@pytest.fixture
+def fuso(app, monkeypatch):
+    # UTC+14: na maior parte do dia a data local é diferente da data em UTC.
+    monkeypatch.setitem(app.config, 'FUSO_HORARIO', 'Pacific/Kiritimati')
+
+
+@pytest.mark.parametrize(
+    'args, inicio, fim',
+    [
+        ({}, HOJE, HOJE),
+        ({'periodo': 'ontem'}, date(2024, 3, 14), date(2024, 3, 14)),
+        ({'periodo': 'mes_passado'}, date(2024, 2, 1), date(2024, 2, 29)),
+        ({'periodo': 'desconhecido'}, HOJE, HOJE),
+        ({'periodo': 'personalizado', 'data_inicio': '2024-03-10', 'data_fim': '2024-03-01'}, date(2024, 3, 1), date(2024, 3, 10)),
+        ({'periodo': 'personalizado', 'data_inicio': 'ontem'}, HOJE, HOJE),
+    ],
+)
+def test_resolver_periodo(args, inicio, fim):
+    periodo = resolver_periodo(args, hoje=HOJE)
+
+    assert (periodo.inicio, periodo.fim) == (inicio, fim)
+
+
+def test_periodo_anterior():
+    assert resolver_periodo({'periodo': 'maximo'}, hoje=HOJE).anterior() is None
+
+    anterior = resolver_periodo({'periodo': 'mes_atual'}, hoje=HOJE).anterior()
+    assert (anterior.inicio, anterior.fim) == (date(2024, 2, 1), date(2024, 2, 15))
+
+    anterior = Periodo('x', 'x', date(2024, 3, 10), date(2024, 3, 12)).anterior()
+    assert (anterior.inicio, anterior.fim) == (date(2024, 3, 7), date(2024, 3, 9))
+
+
+def test_intervalo_utc_segue_o_fuso(fuso):
+    inicio, fim = Periodo('x', 'x', HOJE, HOJE).intervalo_utc()
+
+    assert inicio == datetime(2024, 3, 14, 10)
+    assert fim == datetime(2024, 3, 15, 9, 59, 59, 999999)
+    assert dia_local(datetime(2024, 3, 14, 10)) == HOJE
+
+
+def test_granularidade_padrao():
+    assert [granularidade_padrao(dias) for dias in (7, 90, 400, None)] == ['dia', 'semana', 'mes', 'mes']
+
+
+def test_serie_rejeita_granularidade_invalida(cliente):
+    assert cliente.get('/api/serie?granularidade=hora').status_code == 400
+    assert cliente.get('/api/serie?granularidade=semana').status_code == 200
+
+
+def test_gasto_lancado_pelo_painel_fica_no_dia_local(cliente, fuso, conferir_resumos):
+    cliente.post('/adicionar_gasto', data={'valor_gasto': '12,50', 'categoria': 'Anúncios'})
+
+    gasto = Gasto.query.one()
+    assert gasto.data.date() == hoje_local()
+    _, gastos = conferir_resumos()
+    assert gastos == {(hoje_local(), 'Anúncios'): (1, 12.5)}
+    hoje = resolver_periodo({})
+    assert calcular_resumo(hoje.data_inicio, hoje.data_fim)['gasto'] == 12.5
@@ -0,0 +1,104 @@
+from datetime import date, datetime
+
+import pytest
+
+from meu_app import db
+from meu_app.models import ExecucaoTarefa, ResumoDiarioPedido
+from meu_app.resumos import (
+    CATEGORIA_PADRAO,
+    METODO_NAO_INFORMADO,
+    aplicar_deltas_resumo,
+    contribuicao_pedido,
+    fuso_dos_resumos,
+    garantir_resumos,
+    reconstruir_resumos,
+    somar_contribuicao,
+)
+from meu_app.status import aplicar_status
+
+
+def _mudar_status(pedido, status, data_pagamento=None):
+    antes = contribuicao_pedido(pedido)
+    aplicar_status(pedido, status)
+    pedido.data_pagamento = data_pagamento
+    deltas = {}
+    somar_contribuicao(deltas, antes, contribuicao_pedido(pedido))
+    aplicar_deltas_resumo(deltas)
+    db.session.commit()
+
+
+def test_contribuicao_pedido(criar_pedido):
+    venda = datetime(2024, 3, 10, 12)
+    pago = criar_pedido('Pago', 90.0, data_venda=venda, data_pagamento=datetime(2024, 3, 12, 9), metodo_pagamento='Pix')
+    agendado = criar_pedido('Agendado', 40.0, data_venda=venda)
+
+    assert contribuicao_pedido(pago) == ((date(2024, 3, 12), 'pago', 'Pix'), 90.0)
+    assert contribuicao_pedido(agendado) == ((date(2024, 3, 10), 'agendado', METODO_NAO_INFORMADO), 40.0)
+
+
+def test_pedido_sem_grupo_ou_pago_sem_data_fica_fora(criar_pedido):
+    assert contribuicao_pedido(criar_pedido('Chargeback')) is None
+    assert contribuicao_pedido(criar_pedido('Pago', data_pagamento=None)) is None
+
+
+def test_somar_contribuicao_cancela_ida_e_volta():
+    chave = (date(2024, 1, 1), 'agendado', METODO_NAO_INFORMADO)
+    deltas = {}
+    somar_contribuicao(deltas, None, (chave, 10.0))
+    somar_contribuicao(deltas, (chave, 10.0), None)
+
+    assert deltas == {chave: [0, 0.0]}
+    aplicar_deltas_resumo(deltas)
+    assert db.session.query(ResumoDiarioPedido).count() == 0
+
+
+def test_transicoes_incrementais_batem_com_a_reconstrucao(criar_pedido, criar_gasto, conferir_resumos):
+    pedidos = [criar_pedido('Agendado', 10.0 * i, data_venda=datetime(2024, 5, i, 15)) for i in range(1, 6)]
+    _mudar_status(pedidos[0], 'Pago', datetime(2024, 5, 20, 8))
+    _mudar_status(pedidos[1], 'Frustrado')
+    _mudar_status(pedidos[2], 'Pago', datetime(2024, 5, 21, 8))
+    _mudar_status(pedidos[2], 'Agendado')
+    criar_gasto(30.0, 'Anúncios', datetime(2024, 5, 2, 10))
+    criar_gasto(5.0, None, datetime(2024, 5, 2, 11))
+
+    pedidos_resumo, gastos_resumo = conferir_resumos()
+
+    assert pedidos_resumo[(date(2024, 5, 20), 'pago', METODO_NAO_INFORMADO)] == (1, 10.0)
+    assert (date(2024, 5, 21), 'pago', METODO_NAO_INFORMADO) not in pedidos_resumo
+    assert gastos_resumo[(date(2024, 5, 2), CATEGORIA_PADRAO)] == (1, 5.0)
+
+
+def test_reconstrucao_em_outro_fuso_agrupa_pelo_dia_local(app, criar_pedido, conferir_resumos, monkeypatch):
+    monkeypatch.setitem(app.config, 'FUSO_HORARIO', 'America/Sao_Paulo')
+    # 01:30 UTC ainda é o dia anterior em São Paulo.
+    criar_pedido('Agendado', 25.0, data_venda=datetime(2024, 6, 2, 1, 30))
+
+    pedidos_resumo, _ = conferir_resumos()
+
+    assert pedidos_resumo == {(date(2024, 6, 1), 'agendado', METODO_NAO_INFORMADO): (1, 25.0)}
+    assert fuso_dos_resumos() == 'America/Sao_Paulo'
+
+
+def test_garantir_resumos_reconstroi_quando_o_fuso_muda(app, criar_pedido, monkeypatch):
+    criar_pedido('Agendado', 25.0, data_venda=datetime(2024, 6, 2, 1, 30))
+    reconstruir_resumos()
+    assert fuso_dos_resumos() == 'UTC'
+
+    monkeypatch.setitem(app.config, 'FUSO_HORARIO', 'America/Sao_Paulo')
+    garantir_resumos()
+
+    assert db.session.query(ResumoDiarioPedido.dia).scalar() == date(2024, 6, 1)
+    assert db.session.query(ExecucaoTarefa.nome).filter(ExecucaoTarefa.nome.like('resumos-fuso:%')).count() == 1
+
+
+@pytest.mark.parametrize('fuso', ['UTC', 'America/Sao_Paulo'])
+def test_comando_reconstruir_resumos(app, criar_pedido, fuso, monkeypatch):
+    monkeypatch.setitem(app.config, 'FUSO_HORARIO', fuso)
+    criar_pedido('Pago', 12.0)
+    db.session.query(ResumoDiarioPedido).delete()
+    db.session.commit()
+
+    resultado = app.test_cli_runner().invoke(args=['reconstruir-resumos'])
+
+    assert resultado.exit_code == 0
+    assert '1 linhas de pedidos' in resultado.output
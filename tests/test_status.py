@@ -0,0 +1,138 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from meu_app import db
+from meu_app.models import Pedido
+from meu_app.status import (
+    atualizar_status_em_lote,
+    classificar_status_grupo,
+    filtrar_por_status,
+    normalizar_status_para_dashboard,
+    preencher_status_grupo,
+)
+
+
+@pytest.mark.parametrize(
+    'status, grupo',
+    [
+        ('Agendado', 'agendado'),
+        ('Aguardando Pagamento', 'agendado'),
+        ('Pago', 'pago'),
+        ('Pagamento Aprovado (Braip)', 'pago'),
+        (' A Receber ', 'a_receber'),
+        ('Atrasado', 'atrasado'),
+        ('Estornado', 'frustrado'),
+        ('Chargeback', None),
+        ('', None),
+        (None, None),
+    ],
+)
+def test_classificar_status_grupo(status, grupo):
+    assert classificar_status_grupo(status) == grupo
+
+
+def test_normalizar_status_para_dashboard():
+    assert normalizar_status_para_dashboard('Pagamento Aprovado') == 'Pago'
+    assert normalizar_status_para_dashboard('Recusado') == 'Frustrado'
+    assert normalizar_status_para_dashboard('Aguardando') is None
+
+
+def test_grupo_padrao_vem_do_status():
+    pedido = Pedido(braip_trans_code='SEM-GRUPO', cliente='Ana', telefone='1', valor=1.0, status='Cancelado')
+    db.session.add(pedido)
+    db.session.commit()
+
+    assert pedido.status_grupo == 'frustrado'
+
+
+def test_filtro_por_rotulo_usa_o_grupo(criar_pedido):
+    pago = criar_pedido('Pagamento Aprovado')
+    criar_pedido('Agendado')
+    avulso = criar_pedido('Chargeback')
+
+    assert filtrar_por_status(Pedido.query, 'Pago').all() == [pago]
+    assert filtrar_por_status(Pedido.query, 'Chargeback').all() == [avulso]
+    assert filtrar_por_status(Pedido.query, None).count() == 3
+
+
+def test_preencher_status_grupo_so_toca_os_nulos(criar_pedido):
+    antigo = criar_pedido('Pago Manual')
+    classificado = criar_pedido('Agendado')
+    db.session.execute(update(Pedido).where(Pedido.id == antigo.id).values(status_grupo=None))
+    db.session.execute(update(Pedido).where(Pedido.id == classificado.id).values(status_grupo='atrasado'))
+
+    assert preencher_status_grupo() == 1
+    db.session.commit()
+    db.session.expire_all()
+
+    assert db.session.get(Pedido, antigo.id).status_grupo == 'pago'
+    assert db.session.get(Pedido, classificado.id).status_grupo == 'atrasado'
+
+
+def test_lote_mantem_a_data_de_quem_ja_estava_pago(criar_pedido, conferir_resumos):
+    pago_antes = datetime(2024, 1, 10, 12)
+    ja_pago = criar_pedido('Pago', 50.0, data_pagamento=pago_antes)
+    agendado = criar_pedido('Agendado', 20.0)
+    agora = datetime(2024, 2, 1, 9)
+
+    estados, _ = atualizar_status_em_lote(Pedido.query, 'Pago', agora=agora)
+    db.session.commit()
+    db.session.expire_all()
+
+    assert len(estados) == 2
+    assert db.session.get(Pedido, ja_pago.id).data_pagamento == pago_antes
+    assert db.session.get(Pedido, agendado.id).data_pagamento == agora
+    conferir_resumos()
+
+
+def test_lote_limpa_a_data_fora_de_pago(criar_pedido, conferir_resumos):
+    pedido = criar_pedido('Pago', 50.0)
+
+    atualizar_status_em_lote(Pedido.query, 'Frustrado')
+    db.session.commit()
+    db.session.expire_all()
+
+    assert db.session.get(Pedido, pedido.id).data_pagamento is None
+    conferir_resumos()
+
+
+def test_rota_de_lote(cliente, criar_pedido, conferir_resumos):
+    pedidos = [criar_pedido('Agendado') for _ in range(3)]
+
+    resposta = cliente.post('/atualizar_status/lote', json={'status': 'Pago', 'ids': [pedidos[0].id, 999999]})
+
+    assert resposta.status_code == 200
+    assert [resultado['resultado'] for resultado in resposta.get_json()['resultados']] == ['atualizado', 'nao_encontrado']
+
+    resposta = cliente.post('/atualizar_status/lote', json={'status': 'Frustrado', 'filtro': {'status': 'Agendado'}})
+    assert resposta.get_json()['atualizados'] == 2
+    conferir_resumos()
+
+
+@pytest.mark.parametrize(
+    'corpo',
+    [
+        {'status': 'Qualquer', 'ids': [1]},
+        {'status': 'Pago'},
+        {'status': 'Pago', 'ids': ['1']},
+        {'status': 'Pago', 'ids': list(range(1001))},
+        {'status': 'Pago', 'filtro': {}},
+    ],
+)
+def test_rota_de_lote_rejeita_corpos_invalidos(cliente, corpo):
+    assert cliente.post('/atualizar_status/lote', json=corpo).status_code == 400
+
+
+def test_rota_individual_mantem_a_data_de_pagamento(cliente, criar_pedido, conferir_resumos):
+    pago_antes = datetime(2024, 1, 10, 12)
+    pedido = criar_pedido('Pago', 50.0, data_pagamento=pago_antes)
+
+    resposta = cliente.post(f'/atualizar_status/{pedido.id}', json={'status': 'Pago'})
+
+    assert resposta.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Pedido, pedido.id).data_pagamento == pago_antes
+    assert cliente.post(f'/atualizar_status/{pedido.id}', json={'status': 'x'}).status_code == 400
+    conferir_resumos()
@@ -0,0 +1,89 @@
+from meu_app import db, routes
+from meu_app.eventos import chave_evento, evento_repetido
+from meu_app.fila import enfileirar_evento, processar_lote
+from meu_app.models import EventoBraip, Pedido
+
+
+def _enviar(cliente, dados):
+    resposta = cliente.post('/webhooks/braip', json=dados)
+    return resposta.status_code, resposta.get_json()['status']
+
+
+def test_ciclo_de_vida_e_reenvios(cliente, evento_braip, conferir_resumos):
+    aprovada = evento_braip('W1', 'Aprovada')
+
+    assert _enviar(cliente, aprovada) == (200, 'sucesso')
+    assert _enviar(cliente, aprovada) == (200, 'duplicado')
+    assert _enviar(cliente, evento_braip('W1', 'Pagamento Confirmado')) == (200, 'sucesso')
+    # Fora de ordem: não faz o pedido voltar para 'A Receber'.
+    assert _enviar(cliente, evento_braip('W1', 'Entregue')) == (200, 'ok')
+    assert _enviar(cliente, evento_braip('W1', 'Estornado')) == (200, 'sucesso')
+
+    pedido = Pedido.query.one()
+    assert (pedido.status, pedido.cliente) == ('Frustrado', 'Maria Oliveira')
+    assert EventoBraip.query.count() == 4
+    conferir_resumos()
+
+
+def test_payloads_invalidos(cliente, evento_braip):
+    assert cliente.post('/webhooks/braip', json={}).status_code == 400
+    assert _enviar(cliente, evento_braip(None, 'Aprovada')) == (400, 'erro')
+
+
+def test_evento_invalido_responde_400_sem_gravar_nada(cliente, evento_braip, conferir_resumos):
+    incompleto = evento_braip('W2', 'Aprovada')
+    del incompleto['nome_cliente']
+
+    assert _enviar(cliente, incompleto) == (400, 'erro')
+    assert _enviar(cliente, evento_braip('W3', 'Aprovada', valor_total='caro')) == (400, 'erro')
+    assert Pedido.query.count() == 0
+    assert EventoBraip.query.count() == 0
+
+    # O mesmo evento corrigido (mesma chave) ainda é aplicado.
+    assert _enviar(cliente, evento_braip('W2', 'Aprovada')) == (200, 'sucesso')
+    conferir_resumos()
+
+
+def test_evento_sem_pedido_nao_entra_no_registro(cliente, evento_braip, conferir_resumos):
+    confirmado = evento_braip('W4', 'Pagamento Confirmado')
+
+    assert _enviar(cliente, confirmado) == (200, 'ok')
+    assert not evento_repetido(chave_evento(confirmado))
+
+    _enviar(cliente, evento_braip('W4', 'Aprovada'))
+    assert _enviar(cliente, confirmado) == (200, 'sucesso')
+    assert Pedido.query.one().status == 'Pago'
+    conferir_resumos()
+
+
+def test_corrida_no_registro_vira_duplicado(cliente, evento_braip, monkeypatch, conferir_resumos):
+    dados = evento_braip('W5', 'Aprovada')
+    # Outro processo registra o evento entre a verificação e o commit deste.
+    db.session.add(EventoBraip(chave=chave_evento(dados), codigo_transacao='W5', status='Aprovada'))
+    db.session.commit()
+    verificacoes = []
+
+    def repetido_depois_da_primeira(chave):
+        verificacoes.append(chave)
+        return len(verificacoes) > 1 and evento_repetido(chave)
+
+    monkeypatch.setattr(routes, 'evento_repetido', repetido_depois_da_primeira)
+
+    assert _enviar(cliente, dados) == (200, 'duplicado')
+    assert len(verificacoes) == 2
+    assert Pedido.query.count() == 0
+    conferir_resumos()
+
+
+def test_fila_tambem_deixa_fora_do_registro_os_eventos_sem_pedido(evento_braip, conferir_resumos):
+    confirmado = evento_braip('W6', 'Pagamento Confirmado')
+    enfileirar_evento(confirmado)
+    processar_lote()
+    assert not evento_repetido(chave_evento(confirmado))
+
+    enfileirar_evento(evento_braip('W6', 'Aprovada'))
+    enfileirar_evento(confirmado)
+    processar_lote()
+
+    assert Pedido.query.one().status == 'Pago'
+    conferir_resumos()